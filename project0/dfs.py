@@ -1,22 +1,6 @@
 from pacman_module.game import Agent
-from pacman_module.pacman import Directions
-
-
-def key(state):
-    """
-    Returns a key that uniquely identifies a Pacman game state.
-
-    Arguments:
-    ----------
-    - `state`: the current game state. See FAQ and class
-               `pacman.GameState`.
-
-    Return:
-    -------
-    - A hashable key object that uniquely identifies a Pacman game state.
-    """
-    
-    return (state.getPacmanPosition(), state.getFood(), tuple(state.getCapsules()))
+from pacman_module.pacman import Directions, GameState
+from pacman_module.foodSearch import FoodSearchProblem, depthFirstSearch
 
 
 class PacmanAgent(Agent):
@@ -60,6 +44,11 @@ class PacmanAgent(Agent):
         Given a pacman game state,
         returns a list of legal moves to solve the search layout.
 
+        The search runs over the compact (cell, capsules, food bitmask)
+        states of `foodSearch.FoodSearchProblem`, and its expansions are
+        credited with `GameState.creditExpanded`, within the expansion
+        budget.
+
         Arguments:
         ----------
         - `state`: the current game state. See FAQ and class
@@ -69,26 +58,11 @@ class PacmanAgent(Agent):
         -------
         - A list of legal moves as defined in `game.Directions`.
         """
-        
-        path = []
-        fringe = [(state, path)]  # Stack: (state, path_to_state)
-        closed = set()
-
-        while fringe:
-            current_state, current_path = fringe.pop()
-
-            if current_state.isWin():
-                return current_path
-
-            current_key = key(current_state)
-
-            if current_key not in closed:
-                closed.add(current_key)
-
-                successors = current_state.generatePacmanSuccessors()
-                if successors:
-                    for next_state, action in successors:
-                        new_path = current_path + [action]
-                        fringe.append((next_state, new_path))
-
-        return [] # Return empty list if no solution is found
+        problem = FoodSearchProblem(
+            state.getLayout(), state.getPacmanPosition(),
+            state.getFood().asList(),
+            GameState.maximumExpanded - GameState.countExpanded,
+            capsules=state.getCapsules())
+        actions = depthFirstSearch(problem)
+        GameState.creditExpanded(problem.expanded)
+        return actions if actions is not None else []
@@ -1,21 +1,6 @@
 from pacman_module.game import Agent
-from pacman_module.pacman import Directions
-
-
-def key(state):
-    """
-    Returns a key that uniquely identifies a Pacman game state.
-
-    Arguments:
-    ----------
-    - `state`: the current game state. See FAQ and class
-               `pacman.GameState`.
-
-    Return:
-    -------
-    - A hashable key object that uniquely identifies a Pacman game state.
-    """
-    return (state.getPacmanPosition(), state.getFood(), tuple(state.getCapsules()))
+from pacman_module.pacman import Directions, GameState
+from pacman_module.foodSearch import FoodSearchProblem, depthFirstSearch
 
 
 class PacmanAgent(Agent):
@@ -59,6 +44,11 @@ class PacmanAgent(Agent):
         Given a pacman game state,
         returns a list of legal moves to solve the search layout.
 
+        The search runs over the compact (cell, capsules, food bitmask)
+        states of `foodSearch.FoodSearchProblem`, and its expansions are
+        credited with `GameState.creditExpanded`, within the expansion
+        budget.
+
         Arguments:
         ----------
         - `state`: the current game state. See FAQ and class
@@ -68,25 +58,11 @@ class PacmanAgent(Agent):
         -------
         - A list of legal moves as defined in `game.Directions`.
         """
-        path = []
-        fringe = [(state, path)]
-        closed = set()
-
-        while True:
-            if len(fringe) == 0:
-                return []  # failure
-
-            current, path = fringe.pop()
-
-            if current.isWin():
-                return path
-
-            current_key = key(current)
-
-            if current_key not in closed:
-                closed.add(current_key)
-
-                for next_state, action in current.generatePacmanSuccessors():
-                    fringe.append((next_state, path + [action]))
-
-        return path
+        problem = FoodSearchProblem(
+            state.getLayout(), state.getPacmanPosition(),
+            state.getFood().asList(),
+            GameState.maximumExpanded - GameState.countExpanded,
+            capsules=state.getCapsules())
+        actions = depthFirstSearch(problem)
+        GameState.creditExpanded(problem.expanded)
+        return actions if actions is not None else []
@@ -0,0 +1,129 @@
+import time
+
+from pacman_module.game import Agent
+from pacman_module.pacman import Directions, GameState
+from pacman_module.searchNodes import Plan
+from pacman_module import foodSearch
+from heuristics import HEURISTICS, DEFAULT_HEURISTIC
+
+ALGORITHMS = ("bfs", "dfs", "ucs", "astar", "greedy", "wastar", "anytime")
+# Algorithms whose plans are shortest when their budget lasts, given a
+# consistent heuristic
+OPTIMAL_ALGORITHMS = ("bfs", "ucs", "astar", "anytime")
+UNINFORMED_ALGORITHMS = ("bfs", "dfs", "ucs")
+
+
+def key(state):
+    """Part of a state the search distinguishes."""
+    return (state.getPacmanPosition(), state.getFood())
+
+
+def solve(problem, algorithm, heuristic=None, weight=2.0, partial=False):
+    """
+    Runs a search algorithm on a `foodSearch.FoodSearchProblem`.
+
+    Arguments:
+    ----------
+    - `problem`: the problem to solve.
+    - `algorithm`: one of `ALGORITHMS`.
+    - `heuristic`: function of the states of `problem`, required by the
+      algorithms not in `UNINFORMED_ALGORITHMS`.
+    - `weight`: heuristic weight of weighted A*.
+    - `partial`: whether to return a partial plan when the budget of
+      `problem` runs out before a goal is found: the path to the state
+      closest to a goal by the heuristic, or else one move toward the
+      nearest food (see `foodSearch.greedyStep`).
+
+    Return:
+    -------
+    - The list of moves found, or None if the algorithm found none.
+    """
+    if algorithm == "bfs":
+        actions = foodSearch.breadthFirstSearch(problem)
+    elif algorithm == "dfs":
+        actions = foodSearch.depthFirstSearch(problem)
+    elif algorithm == "ucs":
+        actions = foodSearch.uniformCostSearch(problem, partial)
+    elif algorithm == "astar":
+        actions = foodSearch.aStarSearch(problem, heuristic, partial)
+    elif algorithm == "greedy":
+        actions = foodSearch.greedySearch(problem, heuristic, partial)
+    elif algorithm == "wastar":
+        actions = foodSearch.weightedAStarSearch(
+            problem, heuristic, weight, partial)
+    elif algorithm == "anytime":
+        actions = foodSearch.anytimeWeightedAStarSearch(problem, heuristic)
+    else:
+        raise Exception("Unknown search algorithm " + algorithm)
+    if actions is None and partial and problem.exhausted:
+        actions = foodSearch.greedyStep(problem)
+    return actions
+
+
+class PacmanAgent(Agent):
+    """
+    Pacman agent planning over the compact (cell, food bitmask) states of
+    `foodSearch.FoodSearchProblem` instead of `GameState` objects, which
+    only drive the real game.
+
+    After each search, `budget_exhausted` tells whether it was cut short
+    by the node expansion budget of `GameState` or by the per-move time
+    budget, in which case the plan may be suboptimal or partial (see
+    `solve`), so that Pacman keeps moving. Only the searches caused by
+    the game diverging from the plan count in `replans`, not those which
+    continue a partial plan.
+    """
+
+    def __init__(self, args):
+        super().__init__()
+        self.args = args
+        self.algorithm = getattr(args, "algorithm", "astar")
+        self.weight = getattr(args, "weight", 2.0)
+        self.time_budget = getattr(args, "timebudget", None)
+        self.heuristic_name = getattr(args, "heuristic", DEFAULT_HEURISTIC)
+        self.heuristics = {}  # One memoizing instance per layout
+        self.plan = None
+        self.replans = 0
+        self.budget_exhausted = False
+
+    def get_action(self, state):
+        """
+        Returns the next action of the plan, searching again when the
+        game diverges from it or when it is over.
+        """
+        action = None
+        if self.plan is not None:
+            action = self.plan.getAction(state)
+        if action is None:
+            # A plan which is over, e.g. the partial plan of a search out
+            # of budget, is continued rather than replanned
+            if self.plan is not None and not self.plan.isOver():
+                self.replans += 1
+            self.plan = Plan(state, self.search(state), key)
+            action = self.plan.getAction(state)
+        return action if action is not None else Directions.STOP
+
+    def search(self, state):
+        """
+        Returns the list of moves found by the selected algorithm, or an
+        empty list if it found none. Its expansions are credited with
+        `GameState.creditExpanded`, within `GameState.maximumExpanded`.
+        """
+        layout = state.getLayout()
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.perf_counter() + self.time_budget
+        problem = foodSearch.FoodSearchProblem(
+            layout, state.getPacmanPosition(), state.getFood().asList(),
+            GameState.maximumExpanded - GameState.countExpanded, deadline)
+        heuristic = None
+        if self.algorithm not in UNINFORMED_ALGORITHMS:
+            if layout not in self.heuristics:
+                self.heuristics[layout] = HEURISTICS[self.heuristic_name](
+                    layout)
+            heuristic = self.heuristics[layout].for_problem(problem)
+        actions = solve(problem, self.algorithm, heuristic, self.weight,
+                        partial=True)
+        GameState.creditExpanded(problem.expanded)
+        self.budget_exhausted = problem.exhausted
+        return actions if actions is not None else []
@@ -0,0 +1,78 @@
+from pacman_module.game import Agent
+from pacman_module.pacman import Directions, GameState
+from pacman_module.searchNodes import Plan
+import astar
+from tsp import food_tour, held_karp_states
+
+# Largest number of food dots solved exactly, beyond which the agent
+# falls back to A* search
+MAX_EXACT_FOOD = 12
+
+
+def key(state):
+    """
+    Returns the part of a state the plan predicts:
+    (pacman_position, food_grid).
+    """
+    return (state.getPacmanPosition(), state.getFood())
+
+
+class PacmanAgent(Agent):
+    """
+    A Pacman agent eating all food along an optimal tour, computed
+    exactly by Held-Karp dynamic programming over the food dots. The
+    states of the dynamic program count as expanded nodes.
+    """
+
+    def __init__(self, args):
+        """
+        Arguments:
+        ----------
+        - `args`: Namespace of arguments from command-line prompt.
+        """
+        super().__init__()
+        self.args = args
+        self.max_food = getattr(args, "maxexactfood", MAX_EXACT_FOOD)
+        self.plan = None
+        self.replans = 0
+        self.fallback = astar.PacmanAgent(args)
+
+    def get_action(self, state):
+        """
+        Given a pacman game state, returns a legal move.
+
+        The plan is replayed as long as the game follows it, and computed
+        again when the state diverges (see `search`).
+
+        Arguments:
+        ----------
+        - `state`: the current game state. See FAQ and class
+                   `pacman.GameState`.
+
+        Return:
+        -------
+        - A legal move as defined in `game.Directions`.
+        """
+        action = None
+        if self.plan is not None:
+            action = self.plan.getAction(state)
+        if action is None:
+            if self.plan is not None and not self.plan.isOver():
+                self.replans += 1
+            self.plan = Plan(state, self.search(state), key)
+            action = self.plan.getAction(state)
+        return action if action is not None else Directions.STOP
+
+    def search(self, state):
+        """
+        Returns the optimal tour of the remaining food, or the plan of the
+        A* agent when there are more than `max_food` food dots left or
+        the dynamic program does not fit in the expansion budget.
+        """
+        food = state.getFood().asList()
+        states = held_karp_states(len(food))
+        budget = GameState.maximumExpanded - GameState.countExpanded
+        if len(food) > self.max_food or states > budget:
+            return self.fallback.astar(state)
+        GameState.creditExpanded(states)
+        return food_tour(state.getLayout(), state.getPacmanPosition(), food)
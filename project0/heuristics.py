@@ -0,0 +1,237 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from pacman_module.util import manhattanDistance
+
+
+# Largest number of distances, free cells times food dots, computed by
+# breadth-first search on a layout without a distance table: beyond it,
+# Manhattan distances stand in for maze distances
+MAZE_DISTANCE_MAX_ENTRIES = 1 << 23
+
+
+class FoodHeuristic:
+    """
+    Base class of the heuristics of the food search problem, estimating
+    the number of moves left to eat all food.
+
+    Distances are exact maze distances, computed from each food cell on
+    first use (see `layout.Layout.getDistanceRow`), so that their cost
+    grows with the size of the maze times the number of food dots. When
+    that product exceeds `MAZE_DISTANCE_MAX_ENTRIES` and the layout has
+    no distance table, Manhattan distances are used instead: they never
+    exceed maze distances, so the heuristics stay admissible.
+
+    Everything which only depends on the remaining food is computed once
+    per food bitset and memoized. Heuristics evaluate game states when
+    called, and the compact states of a `foodSearch.FoodSearchProblem`
+    through `for_problem`.
+    """
+
+    def __init__(self, layout):
+        """
+        Arguments:
+        ----------
+        - `layout`: the `layout.Layout` of the game.
+        """
+        self.layout = layout
+        self.cells = layout.getFreeCells()
+        self.indices = layout.getCellIndices()
+        self.memo = {}
+        self.maze_distances = (
+            layout.hasDistanceTable() or
+            len(self.cells) * layout.totalFood <= MAZE_DISTANCE_MAX_ENTRIES)
+        self.coordinates = None
+        if not self.maze_distances:
+            self.coordinates = np.array(self.cells)
+        # Row self.rows[cell] of from_food holds the distances from the
+        # food at the free cell index cell to every free cell
+        self.rows = {}
+        self.from_food = None
+
+    def food_rows(self, cells):
+        """
+        Returns the indices of the rows of `from_food` holding the
+        distances from the food at the free cell indices `cells`,
+        computing the missing ones.
+        """
+        rows = np.empty(len(cells), dtype=int)
+        for i, cell in enumerate(cells):
+            row = self.rows.get(cell)
+            if row is None:
+                row = self.rows[cell] = len(self.rows)
+                if self.from_food is None:
+                    self.from_food = np.empty((16, len(self.cells)),
+                                              dtype=np.int32)
+                elif row == len(self.from_food):
+                    self.from_food = np.concatenate(
+                        [self.from_food, np.empty_like(self.from_food)])
+                self.from_food[row] = self.distances_from(cell)
+            rows[i] = row
+        return rows
+
+    def distances_from(self, cell):
+        """
+        Returns the distances from the free cell index `cell` to every
+        free cell, -1 for unreachable ones.
+        """
+        if self.maze_distances:
+            return self.layout.getDistanceRow(cell)
+        return np.abs(self.coordinates - self.coordinates[cell]).sum(axis=1)
+
+    def food_data(self, food):
+        """
+        Returns the memoized data of a food grid, computed by `prepare`.
+        """
+        bits = food.getBits()
+        data = self.memo.get(bits)
+        if data is None:
+            cells = np.array([self.indices[f] for f in food.asList()],
+                             dtype=int)
+            data = self.memo[bits] = self.prepare(cells)
+        return data
+
+    def prepare(self, cells):
+        """
+        Returns what the heuristic needs to know about the food at the
+        free cell indices `cells`.
+        """
+        return cells
+
+    def food_distances(self, pacman, rows):
+        """
+        Returns the distances from the free cell index `pacman` to the
+        food of the `rows` returned by `food_rows`, with inf for
+        unreachable ones.
+        """
+        distances = self.from_food[rows, pacman].astype(float)
+        distances[distances < 0] = np.inf
+        return distances
+
+    def evaluate(self, pacman, data):
+        """
+        Returns the estimate for Pacman at free cell index `pacman`, with
+        the remaining food described by `data`, as returned by `prepare`.
+        The base class returns 0, which is admissible but guides nothing.
+        """
+        return 0
+
+    def __call__(self, state):
+        return self.evaluate(self.indices[state.getPacmanPosition()],
+                             self.food_data(state.getFood()))
+
+    def for_problem(self, problem, memo_size=None):
+        """
+        Returns this heuristic as a function of the compact states of
+        `problem`, memoized per food mask. With a `memo_size`, only that
+        many masks are remembered, the least recently used ones being
+        evicted first.
+        """
+        memo = OrderedDict()
+
+        def heuristic(state):
+            pacman, mask = problem.decode(state)
+            data = memo.get(mask)
+            if data is None:
+                cells = np.array(problem.getFoodCells(mask), dtype=int)
+                data = memo[mask] = self.prepare(cells)
+                if memo_size is not None and len(memo) > memo_size:
+                    memo.popitem(last=False)
+            elif memo_size is not None:
+                memo.move_to_end(mask)
+            return self.evaluate(pacman, data)
+        return heuristic
+
+
+class ManhattanHeuristic(FoodHeuristic):
+    """
+    Manhattan distance to the farthest food.
+    """
+
+    def evaluate(self, pacman, cells):
+        position = self.cells[pacman]
+        return max([manhattanDistance(position, self.cells[f])
+                    for f in cells], default=0)
+
+
+class FarthestFoodHeuristic(FoodHeuristic):
+    """
+    Maze distance to the farthest food.
+    """
+
+    def prepare(self, cells):
+        return self.food_rows(cells)
+
+    def evaluate(self, pacman, rows):
+        if len(rows) == 0:
+            return 0
+        return float(self.food_distances(pacman, rows).max())
+
+
+class MSTHeuristic(FoodHeuristic):
+    """
+    Maze distance to the nearest food plus the weight of a minimum
+    spanning tree of the food, under maze distances: any path eating
+    all food reaches a first one, then spans all of them.
+    """
+
+    def prepare(self, cells):
+        rows = self.food_rows(cells)
+        n = len(cells)
+        if n <= 1:
+            return rows, 0
+        weights = self.from_food[np.ix_(rows, cells)].astype(float)
+        weights[weights < 0] = np.inf
+        # Prim's algorithm on the dense graph of the food
+        in_tree = np.zeros(n, dtype=bool)
+        in_tree[0] = True
+        cost = weights[0].copy()
+        total = 0
+        for _ in range(n - 1):
+            cost[in_tree] = np.inf
+            nearest = int(np.argmin(cost))
+            total += cost[nearest]
+            in_tree[nearest] = True
+            cost = np.minimum(cost, weights[nearest])
+        return rows, total
+
+    def evaluate(self, pacman, data):
+        rows, total = data
+        if len(rows) == 0:
+            return 0
+        return float(self.food_distances(pacman, rows).min() + total)
+
+
+class PairwiseHeuristic(FoodHeuristic):
+    """
+    Over all pairs of food (a, b), including a = b, the maze distance to
+    the nearer of the two plus the distance between them: both have to
+    be eaten, one after the other.
+    """
+
+    def prepare(self, cells):
+        rows = self.food_rows(cells)
+        first, second = np.triu_indices(len(cells))
+        if len(cells) == 0:
+            return rows, first, second, np.empty(0)
+        between = self.from_food[rows[first], cells[second]].astype(float)
+        between[between < 0] = np.inf
+        return rows, first, second, between
+
+    def evaluate(self, pacman, data):
+        rows, first, second, between = data
+        if len(rows) == 0:
+            return 0
+        distances = self.food_distances(pacman, rows)
+        return float((np.minimum(distances[first], distances[second]) +
+                      between).max())
+
+
+DEFAULT_HEURISTIC = "mst"
+HEURISTICS = {
+    "manhattan": ManhattanHeuristic,
+    "farthest": FarthestFoodHeuristic,
+    "mst": MSTHeuristic,
+    "pairwise": PairwiseHeuristic,
+}
@@ -0,0 +1,152 @@
+from collections import OrderedDict
+
+from pacman_module.game import Agent
+from pacman_module.pacman import Directions, GameState
+from pacman_module.searchNodes import Plan
+from pacman_module.foodSearch import FoodSearchProblem, greedyStep
+from heuristics import HEURISTICS, DEFAULT_HEURISTIC
+
+# Number of states whose best depth is remembered within an iteration,
+# the least recently seen ones being evicted first
+TRANSPOSITION_CACHE_SIZE = 50000
+# Number of food masks whose heuristic data is remembered within a
+# search, the least recently used ones being evicted first
+HEURISTIC_CACHE_SIZE = 50000
+
+
+def key(state):
+    """Part of a state the search distinguishes."""
+    return (state.getPacmanPosition(), state.getFood())
+
+
+class PacmanAgent(Agent):
+    """
+    Pacman agent using Iterative Deepening A*: depth-first searches
+    bounded by increasing values of f = g + h over the compact states of
+    `foodSearch.FoodSearchProblem`, keeping only the current path in
+    memory besides a bounded transposition cache and heuristic memo.
+    """
+
+    def __init__(self, args):
+        super().__init__()
+        self.args = args
+        self.plan = None
+        self.replans = 0
+        self.heuristic_name = getattr(args, "heuristic", DEFAULT_HEURISTIC)
+        self.heuristics = {}  # One instance per layout
+
+    def get_action(self, state):
+        """
+        Returns the next action of the plan found by IDA* search,
+        searching again only when the game diverges from it.
+        """
+        action = None
+        if self.plan is not None:
+            action = self.plan.getAction(state)
+        if action is None:
+            if self.plan is not None and not self.plan.isOver():
+                self.replans += 1
+            self.plan = Plan(state, self.idastar(state), key)
+            action = self.plan.getAction(state)
+        return action if action is not None else Directions.STOP
+
+    def idastar(self, state):
+        """
+        Returns a shortest list of moves to a win state, or an empty list
+        if there is none. If the expansion budget of `GameState` runs out
+        first, returns the prefix of the paths searched whose last state
+        has the lowest heuristic value, the deepest one on ties, provided
+        it is lower than that of the start: otherwise, following prefixes
+        from replan to replan could cycle, and the agent takes one step
+        toward the nearest food instead (see `foodSearch.greedyStep`).
+        """
+        layout = state.getLayout()
+        if layout not in self.heuristics:
+            self.heuristics[layout] = HEURISTICS[self.heuristic_name](layout)
+        problem = FoodSearchProblem(
+            layout, state.getPacmanPosition(), state.getFood().asList(),
+            GameState.maximumExpanded - GameState.countExpanded)
+        heuristic = self.heuristics[layout].for_problem(
+            problem, HEURISTIC_CACHE_SIZE)
+
+        bound = heuristic(problem.getStartState())
+        # Heuristic value, depth and moves of the best prefix so far: only
+        # prefixes ending below the heuristic value of the start count
+        best = [bound, float("inf"), []]
+        while True:
+            actions, bound, exhausted = self.bounded_search(
+                problem, heuristic, bound, best)
+            if actions is not None or exhausted or bound == float("inf"):
+                break
+        GameState.creditExpanded(problem.expanded)
+        if actions is not None:
+            return actions
+        if exhausted:
+            return best[2] or greedyStep(problem) or []
+        return []
+
+    def bounded_search(self, problem, heuristic, bound, best):
+        """
+        Depth-first search of the paths whose f does not exceed `bound`,
+        updating `best` with the best prefix pushed (see `idastar`).
+
+        Returns the moves to the first win state found and the bound, or
+        None and the smallest f which exceeded the bound (inf if the
+        search cannot go further), and whether the expansion budget ran
+        out.
+        """
+        next_bound = float("inf")
+        # Depth reached by the cheapest path to each recently seen state:
+        # reaching it again no shallower cannot find anything new
+        cache = OrderedDict()
+        root = problem.getStartState()
+        on_path = {root}
+        actions = []
+        # Each frame: [state, g, h, remaining successors or None], the
+        # successors being expanded only when the frame is first reached
+        frames = [[root, 0, heuristic(root), None]]
+
+        while frames:
+            frame = frames[-1]
+            current, g, h, children = frame
+
+            if children is None:
+                if g + h > bound:
+                    next_bound = min(next_bound, g + h)
+                    children = []
+                elif problem.isGoalState(current):
+                    return actions, bound, False
+                else:
+                    successors = problem.expand(current)
+                    if successors is None:  # Expansion budget exhausted
+                        return None, float("inf"), True
+                    children = sorted(
+                        ((heuristic(s), i, s, a)
+                         for i, (a, s) in enumerate(successors)),
+                        reverse=True)
+                frame[3] = children
+
+            while children:
+                child_h, _, child, action = children.pop()
+                if child in on_path:
+                    continue
+                depth = cache.get(child)
+                if depth is not None and depth <= g + 1:
+                    continue
+                cache[child] = g + 1
+                cache.move_to_end(child)
+                if len(cache) > TRANSPOSITION_CACHE_SIZE:
+                    cache.popitem(last=False)
+                on_path.add(child)
+                actions.append(action)
+                if (child_h, -(g + 1)) < (best[0], -best[1]):
+                    best[:] = child_h, g + 1, list(actions)
+                frames.append([child, g + 1, child_h, None])
+                break
+            else:
+                frames.pop()
+                on_path.discard(current)
+                if actions:
+                    actions.pop()
+
+        return None, next_bound, False
@@ -0,0 +1,233 @@
+# batchState.py
+# -------------
+# Struct-of-arrays storage of many game states, advanced in lockstep.
+
+import numpy as np
+
+from .game import Actions, Directions
+from .layout import bitGridToArray
+from .pacman import ClassicChaseRules, PacmanRules, GhostRules
+from .pacman import SCARED_TIME, COLLISION_TOLERANCE, TIME_PENALTY
+
+DIRECTIONS = tuple(direction for direction, _ in Actions._directionsAsList)
+DIRECTION_INDEX = dict((d, i) for i, d in enumerate(DIRECTIONS))
+STOP_INDEX = DIRECTION_INDEX[Directions.STOP]
+VECTORS = np.array([vector for _, vector in Actions._directionsAsList])
+
+BATCH_TABLE_CACHE = {}
+
+
+def getBatchTables(layout):
+    """
+    Returns the legal move masks of a layout as arrays:
+    pacman[x, y, action] and ghost[x, y, heading, action], where
+    directions are indices into DIRECTIONS.
+    """
+    table = layout.getMoveTable()
+    if table not in BATCH_TABLE_CACHE:
+        n = len(DIRECTIONS)
+        pacman = np.zeros((layout.width, layout.height, n), dtype=bool)
+        ghost = np.zeros((layout.width, layout.height, n, n), dtype=bool)
+        for (x, y), mask in table.neighborMask.items():
+            for i in range(n):
+                pacman[x, y, i] = (mask >> i) & 1
+        for ((x, y), heading), actions in table.ghostActions.items():
+            for action in actions:
+                ghost[x, y, DIRECTION_INDEX[heading],
+                      DIRECTION_INDEX[action]] = True
+        BATCH_TABLE_CACHE[table] = (pacman, ghost)
+    return BATCH_TABLE_CACHE[table]
+
+
+class BatchState:
+    """
+    N game states of one layout stored as arrays, one row per state:
+
+      pacmanPositions (N, 2) int, pacmanDirections (N,) int
+      ghostPositions (N, G, 2) float, ghostDirections (N, G) int
+      scaredTimers (N, G) float
+      food (N, width, height) bool, numFood (N,) int
+      capsules (N, C) bool, one column per capsule of the layout
+      scores (N,) float, wins (N,) bool, loses (N,) bool
+
+    Directions are indices into DIRECTIONS. Only the classic chase rules
+    are supported; step() follows GameState.generateSuccessor exactly.
+    """
+
+    def __init__(self, states):
+        states = list(states)
+        if not states:
+            raise Exception("A BatchState needs at least one state")
+        first = states[0].data
+        layout = first.layout
+        ghostIndices = first._ghostIndices
+        if len(first.agentStates) != len(ghostIndices) + 1:
+            raise Exception("BatchState only supports Pacman and ghosts")
+        n, g = len(states), len(ghostIndices)
+        width, height = layout.width, layout.height
+
+        self.layout = layout
+        self.numGhosts = g
+        self.walls = layout.getWallArray()
+        self._pacmanLegal, self._ghostLegal = getBatchTables(layout)
+        self._capsuleIndex = np.full((width, height), -1, dtype=int)
+        for i, (x, y) in enumerate(layout.capsules):
+            self._capsuleIndex[x, y] = i
+        self._ghostStarts = np.array(
+            [first.agentStates[i].start.pos for i in ghostIndices],
+            dtype=float).reshape(g, 2)
+        self._ghostStartDirections = np.array(
+            [DIRECTION_INDEX[first.agentStates[i].start.direction]
+             for i in ghostIndices], dtype=int)
+
+        self.pacmanPositions = np.zeros((n, 2), dtype=int)
+        self.pacmanDirections = np.zeros(n, dtype=int)
+        self.ghostPositions = np.zeros((n, g, 2), dtype=float)
+        self.ghostDirections = np.zeros((n, g), dtype=int)
+        self.scaredTimers = np.zeros((n, g), dtype=float)
+        self.food = np.zeros((n, width, height), dtype=bool)
+        self.capsules = np.zeros((n, len(layout.capsules)), dtype=bool)
+        self.scores = np.zeros(n, dtype=float)
+        self.wins = np.zeros(n, dtype=bool)
+        self.loses = np.zeros(n, dtype=bool)
+
+        foodArrays = {}
+        for row, state in enumerate(states):
+            data = state.data
+            if data.variant is not ClassicChaseRules:
+                raise Exception("BatchState only supports the classic rules")
+            if data.layout is not layout:
+                raise Exception("All states of a batch share one layout")
+            pacman = data.agentStates[0].configuration
+            self.pacmanPositions[row] = pacman.pos
+            self.pacmanDirections[row] = DIRECTION_INDEX[pacman.direction]
+            for j, index in enumerate(ghostIndices):
+                ghostState = data.agentStates[index]
+                self.ghostPositions[row, j] = ghostState.configuration.pos
+                self.ghostDirections[row, j] = DIRECTION_INDEX[
+                    ghostState.configuration.direction]
+                self.scaredTimers[row, j] = ghostState.scaredTimer
+            # Successors share their food grid until one is eaten
+            if id(data.food) not in foodArrays:
+                foodArrays[id(data.food)] = bitGridToArray(data.food)
+            self.food[row] = foodArrays[id(data.food)]
+            for capsule in data.capsules:
+                self.capsules[row, self._capsuleIndex[capsule]] = True
+            self.scores[row] = data.score
+            self.wins[row] = data._win
+            self.loses[row] = data._lose
+        self.numFood = self.food.sum(axis=(1, 2))
+
+    def __len__(self):
+        return len(self.scores)
+
+    def getActiveRows(self):
+        """
+        Returns the indices of the states which are not over yet.
+        """
+        return np.flatnonzero(~(self.wins | self.loses))
+
+    def getLegalMask(self, agentIndex):
+        """
+        Returns a (N, len(DIRECTIONS)) boolean array of the legal actions
+        of agentIndex in every state.
+        """
+        if agentIndex == 0:
+            x, y = self.pacmanPositions.T
+            return self._pacmanLegal[x, y]
+        g = agentIndex - 1
+        positions = self.ghostPositions[:, g]
+        cells = np.floor(positions + 0.5).astype(int)
+        headings = self.ghostDirections[:, g]
+        mask = self._ghostLegal[cells[:, 0], cells[:, 1], headings]
+        # In between grid points, ghosts must continue straight
+        between = np.abs(positions - cells).sum(axis=1) > Actions.TOLERANCE
+        mask[between] = False
+        mask[between, headings[between]] = True
+        return mask
+
+    def step(self, agentIndex, actions):
+        """
+        Applies actions[i] for agentIndex to the i-th state, as
+        GameState.generateSuccessor would. Actions are directions or
+        indices into DIRECTIONS. States which are over are left as is.
+        """
+        if not (isinstance(actions, np.ndarray) and actions.dtype.kind == 'i'):
+            actions = np.array([DIRECTION_INDEX.get(action, action)
+                                for action in actions], dtype=int)
+        if len(actions) != len(self):
+            raise Exception("Expected %d actions, got %d"
+                            % (len(self), len(actions)))
+        rows = self.getActiveRows()
+        actions = actions[rows]
+        legal = self.getLegalMask(agentIndex)[rows, actions]
+        if not legal.all():
+            raise Exception("Illegal action " +
+                            str(DIRECTIONS[actions[~legal][0]]))
+        scoreChange = np.zeros(len(rows))
+        if agentIndex == 0:
+            self._applyPacmanActions(rows, actions, scoreChange)
+            scoreChange -= TIME_PENALTY
+            for g in range(self.numGhosts):
+                self._checkDeath(rows, g, scoreChange)
+        else:
+            g = agentIndex - 1
+            self._applyGhostActions(rows, g, actions)
+            self._decrementTimers(rows, g)
+            self._checkDeath(rows, g, scoreChange)
+        self.scores[rows] += scoreChange
+
+    def _applyPacmanActions(self, rows, actions, scoreChange):
+        positions = self.pacmanPositions[rows] + \
+            VECTORS[actions] * PacmanRules.PACMAN_SPEED
+        self.pacmanPositions[rows] = positions
+        moved = actions != STOP_INDEX
+        self.pacmanDirections[rows[moved]] = actions[moved]
+        x, y = positions.T
+
+        # Eat food
+        ate = self.food[rows, x, y]
+        self.food[rows[ate], x[ate], y[ate]] = False
+        self.numFood[rows[ate]] -= 1
+        scoreChange[ate] += 10
+        won = ate & (self.numFood[rows] == 0)
+        scoreChange[won] += 500
+        self.wins[rows[won]] = True
+
+        # Eat capsule
+        capsules = self._capsuleIndex[x, y]
+        onCapsule = np.flatnonzero(capsules >= 0)
+        eaten = onCapsule[self.capsules[rows[onCapsule],
+                                        capsules[onCapsule]]]
+        self.capsules[rows[eaten], capsules[eaten]] = False
+        scoreChange[eaten] -= 5
+        self.scaredTimers[rows[eaten]] = SCARED_TIME
+
+    def _applyGhostActions(self, rows, g, actions):
+        speed = np.where(self.scaredTimers[rows, g] > 0,
+                         GhostRules.GHOST_SPEED / 2.0, GhostRules.GHOST_SPEED)
+        self.ghostPositions[rows, g] += VECTORS[actions] * speed[:, None]
+        moved = actions != STOP_INDEX
+        self.ghostDirections[rows[moved], g] = actions[moved]
+
+    def _decrementTimers(self, rows, g):
+        timers = self.scaredTimers[rows, g]
+        ending = rows[timers == 1]
+        self.ghostPositions[ending, g] = np.floor(
+            self.ghostPositions[ending, g] + 0.5)
+        self.scaredTimers[rows, g] = np.maximum(0, timers - 1)
+
+    def _checkDeath(self, rows, g, scoreChange):
+        distances = np.abs(
+            self.pacmanPositions[rows] - self.ghostPositions[rows, g]).sum(
+            axis=1)
+        close = distances <= COLLISION_TOLERANCE
+        scared = close & (self.scaredTimers[rows, g] > 0)
+        eaten = rows[scared]
+        scoreChange[scared] += 200
+        self.ghostPositions[eaten, g] = self._ghostStarts[g]
+        self.ghostDirections[eaten, g] = self._ghostStartDirections[g]
+        self.scaredTimers[eaten, g] = 0
+        caught = close & ~scared & ~self.wins[rows]
+        scoreChange[caught] -= 500
+        self.loses[rows[caught]] = True
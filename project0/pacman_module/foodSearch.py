@@ -0,0 +1,296 @@
+# foodSearch.py
+# -------------
+# Search over compact integer states of the food collection problem.
+
+import heapq
+import time
+from collections import deque
+
+import numpy as np
+
+from .searchNodes import NodeStore
+
+
+class FoodSearchProblem:
+    """
+    The problem of eating all food of a layout, over compact states: an
+    int holding the index of Pacman's cell among layout.getFreeCells()
+    in its low bits and the bitmask of the remaining food above them.
+
+    Bit i of the mask stands for foodCells[i], the food at the start of
+    the search. When capsules are given, the bitmask of those left sits
+    between the cell and the food, so that eating one leads to a new
+    state, as it does for game states. Successors come from the move
+    table of the layout, and expansions are counted in expanded. Once
+    maxExpanded states have been expanded or time.perf_counter() reaches
+    deadline, expand refuses to go on and exhausted is set.
+    """
+
+    def __init__(self, layout, start, food, maxExpanded=float('inf'),
+                 deadline=None, capsules=()):
+        cells = layout.getFreeCells()
+        indices = layout.getCellIndices()
+        successors = layout.getMoveTable().successors
+        self.layout = layout
+        self.cellBits = max(1, (len(cells) - 1).bit_length())
+        self.cellMask = (1 << self.cellBits) - 1
+        self.foodCells = tuple(food)
+        self.capsuleCells = tuple(capsules)
+        self.foodShift = self.cellBits + len(self.capsuleCells)
+        # States below goalBound have no food left
+        self.goalBound = 1 << self.foodShift
+        # Moving onto a cell ANDs the capsule and food masks with
+        # keep[cell]
+        keep = [-1] * len(cells)
+        for i, cell in enumerate(self.capsuleCells + self.foodCells):
+            keep[indices[cell]] = ~(1 << i)
+        self._successors = [
+            tuple((action, indices[nextCell], keep[indices[nextCell]])
+                  for action, nextCell in successors[cell])
+            for cell in cells]
+        self.startState = self.encode(indices[start],
+                                      (1 << len(self.foodCells)) - 1,
+                                      (1 << len(self.capsuleCells)) - 1)
+        self.expanded = 0
+        self.maxExpanded = maxExpanded
+        self.deadline = deadline
+        self.exhausted = False
+
+    def encode(self, cell, mask, capsules=0):
+        return (mask << self.foodShift) | (capsules << self.cellBits) | cell
+
+    def decode(self, state):
+        """
+        Returns the (cell index, food mask) of a state.
+        """
+        return state & self.cellMask, state >> self.foodShift
+
+    def getFoodCells(self, mask):
+        """
+        Returns the free cell indices of the food in mask.
+        """
+        indices = self.layout.getCellIndices()
+        return [indices[cell] for i, cell in enumerate(self.foodCells)
+                if mask >> i & 1]
+
+    def getStartState(self):
+        return self.startState
+
+    def isGoalState(self, state):
+        return state < self.goalBound
+
+    def expand(self, state):
+        """
+        Returns the (action, successor) pairs of state, or None once the
+        budget is exhausted.
+        """
+        if self.expanded >= self.maxExpanded or (
+                self.deadline is not None and
+                time.perf_counter() >= self.deadline):
+            self.exhausted = True
+            return None
+        self.expanded += 1
+        return self.getSuccessors(state)
+
+    def getSuccessors(self, state):
+        """
+        Returns the (action, successor) pairs of state, without counting
+        an expansion.
+        """
+        cell, mask = state & self.cellMask, state >> self.cellBits
+        bits = self.cellBits
+        return [(action, ((mask & keep) << bits) | nextCell)
+                for action, nextCell, keep in self._successors[cell]]
+
+
+def nullHeuristic(state):
+    return 0
+
+
+def breadthFirstSearch(problem):
+    """
+    Returns a shortest list of actions to a goal, or None if there is
+    none or the expansion budget runs out.
+    """
+    start = problem.getStartState()
+    if problem.isGoalState(start):
+        return []
+    nodes = NodeStore()
+    frontier = deque([(start, nodes.addRoot())])
+    seen = {start}
+    while frontier:
+        state, node = frontier.popleft()
+        successors = problem.expand(state)
+        if successors is None:
+            return None
+        for action, nextState in successors:
+            if nextState in seen:
+                continue
+            child = nodes.add(node, action)
+            if problem.isGoalState(nextState):
+                return nodes.getPath(child)
+            seen.add(nextState)
+            frontier.append((nextState, child))
+    return None
+
+
+def depthFirstSearch(problem):
+    """
+    Returns a list of actions to a goal found depth first, or None.
+    """
+    nodes = NodeStore()
+    frontier = [(problem.getStartState(), nodes.addRoot())]
+    closed = set()
+    while frontier:
+        state, node = frontier.pop()
+        if problem.isGoalState(state):
+            return nodes.getPath(node)
+        if state in closed:
+            continue
+        closed.add(state)
+        successors = problem.expand(state)
+        if successors is None:
+            return None
+        for action, nextState in successors:
+            if nextState not in closed:
+                frontier.append((nextState, nodes.add(node, action)))
+    return None
+
+
+def bestFirstSearch(problem, priority, heuristic=nullHeuristic,
+                    partial=False):
+    """
+    Returns a list of actions to a goal, expanding states by increasing
+    priority(g, h), or None. Only paths improving on the best known cost
+    of a state are pushed, and superseded entries are skipped lazily.
+
+    If partial is set and the budget runs out first, returns the path to
+    the expanded state closest to a goal by the heuristic instead, as
+    anytimeWeightedAStarSearch does.
+    """
+    path, closest = _bestFirstSearch(problem, priority, heuristic)
+    if path is None and partial and problem.exhausted:
+        return closest
+    return path
+
+
+def _bestFirstSearch(problem, priority, heuristic, bound=float('inf')):
+    """
+    bestFirstSearch, skipping the paths whose g + h reaches bound. Also
+    returns the path to the expanded state of lowest heuristic, or None
+    if none is lower than that of the start, so that following it from
+    replan to replan always makes progress.
+    """
+    nodes = NodeStore()
+    start = problem.getStartState()
+    node = nodes.improve(start, -1, None, 0)
+    h = heuristic(start)
+    frontier = [(priority(0, h), 0, state, node, h)
+                for state in [start] if h < bound]
+    closed = set()
+    closest, closestH = None, h
+    count = 1
+    while frontier:
+        _, _, state, node, h = heapq.heappop(frontier)
+        if state in closed or nodes.isStale(state, node):
+            continue
+        if problem.isGoalState(state):
+            return nodes.getPath(node), nodes.getPath(node)
+        closed.add(state)
+        if h < closestH:
+            closest, closestH = node, h
+        successors = problem.expand(state)
+        if successors is None:
+            break
+        cost = nodes.costs[node] + 1
+        for action, nextState in successors:
+            if nextState in closed:
+                continue
+            h = heuristic(nextState)
+            if cost + h >= bound:
+                continue
+            child = nodes.improve(nextState, node, action, cost)
+            if child is not None:
+                heapq.heappush(frontier, (
+                    priority(cost, h), count, nextState, child, h))
+                count += 1
+    return None, None if closest is None else nodes.getPath(closest)
+
+
+def uniformCostSearch(problem, partial=False):
+    return bestFirstSearch(problem, lambda g, h: g, partial=partial)
+
+
+def aStarSearch(problem, heuristic=nullHeuristic, partial=False):
+    return bestFirstSearch(problem, lambda g, h: g + h, heuristic, partial)
+
+
+def greedySearch(problem, heuristic=nullHeuristic, partial=False):
+    return bestFirstSearch(problem, lambda g, h: h, heuristic, partial)
+
+
+def weightedAStarSearch(problem, heuristic=nullHeuristic, weight=2.0,
+                        partial=False):
+    """
+    A* with the heuristic inflated by weight: paths found cost at most
+    weight times the optimum when the heuristic is admissible.
+    """
+    return bestFirstSearch(problem, lambda g, h: g + weight * h, heuristic,
+                           partial)
+
+
+ANYTIME_WEIGHTS = (5.0, 3.0, 2.0, 1.5, 1.0)
+
+
+def anytimeWeightedAStarSearch(problem, heuristic=nullHeuristic,
+                               weights=ANYTIME_WEIGHTS):
+    """
+    Runs weighted A* with each of the decreasing weights in turn, every
+    run pruning the paths which cannot beat the best plan so far under
+    the admissible heuristic, until the budget of problem runs out, which
+    problem.exhausted tells. With a last weight of 1 and a consistent
+    heuristic, the plan is optimal if the budget lasts.
+
+    Returns the best plan found or, when the budget ran out before the
+    first one, the path to the expanded state closest to a goal by the
+    heuristic, so that the agent still makes progress. Returns None if
+    there is neither.
+    """
+    best = closest = None
+    for weight in weights:
+        bound = float('inf') if best is None else len(best)
+        path, reached = _bestFirstSearch(
+            problem, lambda g, h: g + weight * h, heuristic, bound)
+        if path is not None:
+            best = path
+        elif closest is None:
+            closest = reached
+        if problem.exhausted:
+            break
+    if best is None and problem.exhausted:
+        return closest
+    return best
+
+
+def greedyStep(problem):
+    """
+    Returns the one move from the start state toward the nearest food by
+    maze distance, looked up in the distance rows of the start cell and
+    of that food without expanding any state, or None if no food is
+    reachable.
+    """
+    start = problem.getStartState()
+    cell, mask = problem.decode(start)
+    food = problem.getFoodCells(mask)
+    if not food:
+        return None
+    distances = problem.layout.getDistanceRow(cell)[food].astype(float)
+    distances[distances < 0] = np.inf
+    nearest = int(np.argmin(distances))
+    if distances[nearest] == np.inf:
+        return None
+    toFood = problem.layout.getDistanceRow(food[nearest])
+    for action, nextState in problem.getSuccessors(start):
+        if toFood[problem.decode(nextState)[0]] == distances[nearest] - 1:
+            return [action]
+    return None
@@ -0,0 +1,254 @@
+# mazeGenerator.py
+# ----------------
+# Procedurally generated layouts, for running agents on mazes of any size.
+
+import random
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+from .layout import Layout
+
+MAZE_STYLES = ('maze', 'cave', 'open')
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+# Food dots of the mazes of a sweep, few enough for search agents to
+# scale with the size of the maze rather than with the food
+SWEEP_NUM_FOOD = 10
+
+
+def carveMaze(width, height, rng, loops=0.0):
+    """
+    Returns the walls, as a (height, width) boolean array in text order,
+    of a maze of one cell wide corridors carved by a randomized depth
+    first search. A fraction loops of the walls separating two corridors
+    is then knocked down, loops=0 giving a perfect maze.
+
+    The search carves odd dimensions; an even width or height is reached
+    by doubling a random line of walls between corridors (see
+    stretchMaze).
+    """
+    walls = np.ones((height - 1 + height % 2, width - 1 + width % 2),
+                    dtype=bool)
+    rows, cols = (height - 1) // 2, (width - 1) // 2
+    visited = np.zeros((rows, cols), dtype=bool)
+    start = (int(rng.integers(rows)), int(rng.integers(cols)))
+    visited[start] = True
+    walls[2 * start[0] + 1, 2 * start[1] + 1] = False
+    stack = [start]
+    while stack:
+        r, c = stack[-1]
+        options = [(r + dr, c + dc) for dr, dc in NEIGHBOURS
+                   if 0 <= r + dr < rows and 0 <= c + dc < cols and
+                   not visited[r + dr, c + dc]]
+        if not options:
+            stack.pop()
+            continue
+        nr, nc = options[rng.integers(len(options))]
+        visited[nr, nc] = True
+        walls[r + nr + 1, c + nc + 1] = False
+        walls[2 * nr + 1, 2 * nc + 1] = False
+        stack.append((nr, nc))
+    walls = stretchMaze(walls, height, 0, rng)
+    walls = stretchMaze(walls, width, 1, rng)
+    if loops > 0:
+        core = walls[1:-1, 1:-1]
+        vertical = ~walls[:-2, 1:-1] & ~walls[2:, 1:-1]
+        horizontal = ~walls[1:-1, :-2] & ~walls[1:-1, 2:]
+        knocked = core & (vertical | horizontal) & (
+            rng.random(core.shape) < loops)
+        walls[1:-1, 1:-1] = core & ~knocked
+    return walls
+
+
+def stretchMaze(walls, size, axis, rng):
+    """
+    Returns the walls of a carved maze with one more line along axis,
+    when it is one short of size: a random inner line of walls between
+    corridors is doubled, which lengthens the corridors crossing it, or
+    the line of corridors when the maze is too small to have one.
+    """
+    length = walls.shape[axis]
+    if length == size:
+        return walls
+    lines = range(2, length - 2, 2)
+    line = lines[rng.integers(len(lines))] if lines else 1
+    return np.insert(walls, line, walls.take(line, axis=axis), axis=axis)
+
+
+def carveCave(width, height, rng, wallDensity=0.3):
+    """
+    Returns the walls of a bordered maze whose inner cells are walls
+    independently with probability wallDensity.
+    """
+    walls = rng.random((height, width)) < wallDensity
+    walls[[0, -1], :] = True
+    walls[:, [0, -1]] = True
+    return walls
+
+
+def carveOpen(width, height):
+    """
+    Returns the walls of an empty bordered room.
+    """
+    walls = np.zeros((height, width), dtype=bool)
+    walls[[0, -1], :] = True
+    walls[:, [0, -1]] = True
+    return walls
+
+
+def keepLargestRegion(walls):
+    """
+    Fills with walls every free cell which is not connected to the
+    largest region of free cells, so that the whole maze is reachable.
+    """
+    height, width = walls.shape
+    labels = np.full(walls.shape, -1, dtype=int)
+    sizes = []
+    for start in zip(*np.nonzero(~walls)):
+        if labels[start] >= 0:
+            continue
+        label = len(sizes)
+        labels[start] = label
+        queue = deque([start])
+        size = 0
+        while queue:
+            r, c = queue.popleft()
+            size += 1
+            for dr, dc in NEIGHBOURS:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < height and 0 <= nc < width and \
+                        not walls[nr, nc] and labels[nr, nc] < 0:
+                    labels[nr, nc] = label
+                    queue.append((nr, nc))
+        sizes.append(size)
+    if not sizes:
+        raise Exception("The generated maze has no free cell")
+    return walls | (labels != int(np.argmax(sizes)))
+
+
+def generateMaze(width, height, style='maze', wallDensity=0.3, loops=0.0,
+                 numFood=None, numCapsules=0, numGhosts=1, seed=None,
+                 path=None):
+    """
+    Returns a random width x height Layout of the given style:
+
+      'maze'  corridors of a randomized depth first search, with a
+              fraction loops of their separating walls removed
+      'cave'  inner walls drawn with probability wallDensity
+      'open'  a single room
+
+    Only the largest connected region is kept. Pacman, numGhosts ghosts,
+    numCapsules capsules and numFood food dots (every remaining cell by
+    default) are placed on distinct free cells. The layout is also
+    written to path as a .lay file when one is given.
+    """
+    if width < 3 or height < 3:
+        raise Exception("Mazes are at least 3x3, not %dx%d"
+                        % (width, height))
+    rng = np.random.default_rng(seed)
+    if style == 'maze':
+        walls = carveMaze(width, height, rng, loops)
+    elif style == 'cave':
+        walls = carveCave(width, height, rng, wallDensity)
+    elif style == 'open':
+        walls = carveOpen(width, height)
+    else:
+        raise Exception("Unknown maze style " + str(style))
+    walls = keepLargestRegion(walls)
+
+    free = np.argwhere(~walls)
+    pieces = ['P'] + ['G'] * numGhosts + ['o'] * numCapsules
+    if numFood is None:
+        numFood = len(free) - len(pieces)
+    pieces += ['.'] * numFood
+    if len(pieces) > len(free):
+        raise Exception("Cannot place %d items on %d free cells"
+                        % (len(pieces), len(free)))
+    chars = np.where(walls, '%', ' ')
+    cells = free[rng.permutation(len(free))[:len(pieces)]]
+    chars[cells[:, 0], cells[:, 1]] = pieces
+
+    layout = Layout([''.join(row) for row in chars])
+    if path is not None:
+        saveLayout(layout, path)
+    return layout
+
+
+def saveLayout(layout, path):
+    """
+    Writes layout to path in the .lay format.
+    """
+    with open(path, 'w') as f:
+        f.write(str(layout) + '\n')
+
+
+def precompute(layout):
+    """
+    Builds the tables of layout which agents share, so that a sweep does
+    not time their one-time construction: the move table, the cell
+    indices and, when the layout is small enough for one, the distance
+    table.
+    """
+    layout.getMoveTable()
+    layout.getCellIndices()
+    if layout.hasDistanceTable():
+        layout.getDistanceTable()
+
+
+def sweep(sizes, play, memory=True, **options):
+    """
+    Plays one game on a generated size x size maze for every size, where
+    play(layout) runs the game and returns its score, computation time
+    and expanded nodes, and options are passed to generateMaze.
+
+    Yields one dict per size with these results and the wall clock time
+    of the game, played after precompute(layout). When memory is set,
+    the game is then replayed from the same random state under
+    tracemalloc, which slows it down, to measure its peak memory (None
+    otherwise).
+    """
+    for size in sizes:
+        layout = generateMaze(size, size, **options)
+        precompute(layout)
+        randomStates = random.getstate(), np.random.get_state()
+        start = time.perf_counter()
+        score, computationTime, expandedNodes = play(layout)
+        wallTime = time.perf_counter() - start
+        peakMemory = None
+        if memory:
+            random.setstate(randomStates[0])
+            np.random.set_state(randomStates[1])
+            tracemalloc.start()
+            try:
+                play(layout)
+                peakMemory = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        yield {
+            'size': size,
+            'freeCells': len(layout.getFreeCells()),
+            'food': layout.food.count(),
+            'score': score,
+            'computationTime': computationTime,
+            'wallTime': wallTime,
+            'expandedNodes': expandedNodes,
+            'peakMemory': peakMemory,
+        }
+
+
+def printSweep(rows):
+    """
+    Prints the rows of sweep as a table, as soon as each one is known.
+    """
+    print("%6s %8s %8s %10s %12s %12s %14s %12s" % (
+        'size', 'cells', 'food', 'score', 'compute (s)', 'wall (s)',
+        'expanded', 'peak (MiB)'), flush=True)
+    for row in rows:
+        peakMemory = '-' if row['peakMemory'] is None else \
+            '%.2f' % (row['peakMemory'] / 2.0 ** 20)
+        print("%6d %8d %8d %10.1f %12.3f %12.3f %14d %12s" % (
+            row['size'], row['freeCells'], row['food'], row['score'],
+            row['computationTime'], row['wallTime'], row['expandedNodes'],
+            peakMemory), flush=True)
@@ -0,0 +1,124 @@
+# searchNodes.py
+# --------------
+# Search tree nodes stored in flat arrays, and the plans agents replay.
+
+from array import array
+
+from .game import Actions
+
+ACTIONS = tuple(direction for direction, _ in Actions._directionsAsList)
+ACTION_CODES = dict((action, i) for i, action in enumerate(ACTIONS))
+
+
+class NodeStore:
+    """
+    The nodes of a search tree, stored as parallel arrays indexed by node
+    id: node i was reached from node parents[i] (-1 for a root) by the
+    action ACTIONS[actions[i]], with path cost costs[i]. That is 13 bytes
+    per node, and a path is only rebuilt, from the parent pointers, once
+    a goal is found.
+
+    best maps state keys to the lowest path cost found so far. A*-style
+    searches use it to only add paths which improve on it, and to lazily
+    skip the frontier entries which have been superseded since.
+    """
+
+    def __init__(self):
+        self.parents = array('i')
+        self.actions = array('b')
+        self.costs = array('d')
+        self.best = {}
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add(self, parent, action, cost=0):
+        """
+        Returns the id of a new node reached from node parent by action.
+        A root has parent -1 and action None.
+        """
+        self.parents.append(parent)
+        self.actions.append(-1 if action is None else ACTION_CODES[action])
+        self.costs.append(cost)
+        return len(self.parents) - 1
+
+    def addRoot(self, cost=0):
+        return self.add(-1, None, cost)
+
+    def improve(self, key, parent, action, cost):
+        """
+        Adds the node reached from node parent by action if it is the
+        cheapest path found so far to the state identified by key, and
+        returns its id. Returns None otherwise.
+        """
+        if cost >= self.best.get(key, float('inf')):
+            return None
+        self.best[key] = cost
+        return self.add(parent, action, cost)
+
+    def isStale(self, key, node):
+        """
+        Tells whether a cheaper path to the state identified by key than
+        node has been added since node was.
+        """
+        return self.costs[node] > self.best.get(key, self.costs[node])
+
+    def getPath(self, node):
+        """
+        Returns the list of actions leading from the root to node.
+        """
+        path = []
+        while self.parents[node] >= 0:
+            path.append(ACTIONS[self.actions[node]])
+            node = self.parents[node]
+        path.reverse()
+        return path
+
+    def getFirstAction(self, node):
+        """
+        Returns the first action of the path to node, or None for a root.
+        """
+        action = None
+        while self.parents[node] >= 0:
+            action = ACTIONS[self.actions[node]]
+            node = self.parents[node]
+        return action
+
+
+class Plan:
+    """
+    A list of actions found by a search, along with the state keys they
+    are expected to lead to, so that an agent can replay it instead of
+    searching again at every move. key(state) identifies the states the
+    search distinguishes. A plan ends at the first terminal state it
+    leads to, which searches ignoring the ghosts may walk into.
+    """
+
+    def __init__(self, state, actions, key):
+        self.key = key
+        self.expected = [key(state)]
+        for action in actions:
+            if state.isWin() or state.isLose():
+                break
+            state = state.generateSuccessor(0, action)
+            self.expected.append(key(state))
+        self.actions = actions[:len(self.expected) - 1]
+        self.step = 0
+
+    def isOver(self):
+        """
+        Tells whether every action of the plan has been replayed, as
+        happens to the partial plans of searches which ran out of budget.
+        """
+        return self.step >= len(self.actions)
+
+    def getAction(self, state):
+        """
+        Returns the next action of the plan, or None when it is over or
+        state is not the one it predicted.
+        """
+        if self.step >= len(self.actions) or \
+                self.key(state) != self.expected[self.step]:
+            return None
+        self.step += 1
+        return self.actions[self.step - 1]
@@ -0,0 +1,253 @@
+import math
+import multiprocessing
+import os
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from pacman_module.game import Agent, BitGrid
+from pacman_module.pacman import Directions, GameState
+from pacman_module.searchNodes import Plan
+from pacman_module import foodSearch
+from fastsearch import key, solve, OPTIMAL_ALGORITHMS, UNINFORMED_ALGORITHMS
+from heuristics import HEURISTICS, DEFAULT_HEURISTIC
+
+DEFAULT_STRATEGIES = ("astar", "greedy", "dfs")
+
+# Number of expansions between two checks of the cancellation flag by a
+# worker
+CANCEL_CHECK_INTERVAL = 1024
+
+# Set in each worker process by `_init_worker`
+_cancel = None
+# One memoizing heuristic instance per (layout, name) in each worker
+_heuristics = {}
+
+
+def _init_worker(cancel):
+    global _cancel
+    _cancel = cancel
+
+
+def _shutdown(executor, cancel, futures):
+    """
+    Cancels the pending `futures` of an agent, tells its running
+    strategies to stop and shuts its `executor` down without waiting.
+    """
+    cancel.set()
+    for future in futures:
+        future.cancel()
+    executor.shutdown(wait=False)
+
+
+class CancellableProblem(foodSearch.FoodSearchProblem):
+    """
+    A `foodSearch.FoodSearchProblem` which also stops expanding, as if
+    its budget were exhausted, once the portfolio cancels the search.
+    """
+
+    def expand(self, state):
+        if (self.expanded % CANCEL_CHECK_INTERVAL == 0 and
+                _cancel is not None and _cancel.is_set()):
+            self.exhausted = True
+            return None
+        return super().expand(state)
+
+
+def run_strategy(layout, start, food_bits, algorithm, heuristic_name,
+                 weight, max_expanded, time_budget):
+    """
+    Runs one strategy of the portfolio, in a worker process.
+
+    Arguments:
+    ----------
+    - `layout`: the `layout.Layout` of the game, which is pickled as its
+      text and interned again in the worker.
+    - `start`: the cell of Pacman.
+    - `food_bits`: the bits of the `game.BitGrid` of the remaining food.
+    - `algorithm`: one of `fastsearch.ALGORITHMS`.
+    - `heuristic_name`: a key of `heuristics.HEURISTICS`.
+    - `weight`: heuristic weight of weighted A*.
+    - `max_expanded`: expansion budget of this strategy.
+    - `time_budget`: seconds this strategy may search, or None.
+
+    Return:
+    -------
+    - The moves found (None if none), whether they eat all food or are
+      only the partial plan of an exhausted search (see
+      `fastsearch.solve`), the number of expanded nodes, and whether the
+      budget ran out or the search was cancelled.
+    """
+    food = BitGrid(layout.width, layout.height, bits=food_bits).asList()
+    deadline = None
+    if time_budget is not None:
+        deadline = time.perf_counter() + time_budget
+    problem = CancellableProblem(layout, start, food, max_expanded, deadline)
+    heuristic = None
+    if algorithm not in UNINFORMED_ALGORITHMS:
+        if (layout, heuristic_name) not in _heuristics:
+            _heuristics[layout, heuristic_name] = HEURISTICS[heuristic_name](
+                layout)
+        heuristic = _heuristics[layout, heuristic_name].for_problem(problem)
+    actions = solve(problem, algorithm, heuristic, weight, partial=True)
+    return (actions, actions is not None and reaches_goal(problem, actions),
+            problem.expanded, problem.exhausted)
+
+
+def reaches_goal(problem, actions):
+    """
+    Returns whether following `actions` from the start state of `problem`
+    eats all food.
+    """
+    state = problem.getStartState()
+    for action in actions:
+        state = dict(problem.getSuccessors(state))[action]
+    return problem.isGoalState(state)
+
+
+class PacmanAgent(Agent):
+    """
+    Pacman agent racing a portfolio of search strategies on the same
+    state, in a pool of worker processes.
+
+    The first plan which is good enough wins and the other strategies are
+    cancelled: a plan is good enough when its strategy is optimal and its
+    budget lasted, or when it is at most `tolerance` times longer than
+    the heuristic lower bound. Otherwise the shortest plan found is used,
+    once all strategies are over or the per-move time budget runs out,
+    or a partial plan when no strategy could eat all food within its
+    budget, so that Pacman keeps moving.
+    """
+
+    def __init__(self, args):
+        super().__init__()
+        self.args = args
+        self.strategies = tuple(
+            getattr(args, "strategies", None) or DEFAULT_STRATEGIES)
+        self.tolerance = getattr(args, "tolerance", 1.0)
+        self.weight = getattr(args, "weight", 2.0)
+        self.time_budget = getattr(args, "timebudget", None)
+        self.heuristic_name = getattr(args, "heuristic", DEFAULT_HEURISTIC)
+        self.heuristics = {}  # One memoizing instance per layout
+        self.plan = None
+        self.replans = 0
+        # Expanded nodes and wins of each strategy over the game
+        self.expanded = dict.fromkeys(self.strategies, 0)
+        self.wins = dict.fromkeys(self.strategies, 0)
+        self.executor = None
+        self.cancel = None
+        self.futures = set()  # Those of the search in progress
+
+    def get_action(self, state):
+        """
+        Returns the next action of the plan, searching again only when
+        the game diverges from it.
+        """
+        action = None
+        if self.plan is not None:
+            action = self.plan.getAction(state)
+        if action is None:
+            if self.plan is not None and not self.plan.isOver():
+                self.replans += 1
+            self.plan = Plan(state, self.search(state), key)
+            action = self.plan.getAction(state)
+        return action if action is not None else Directions.STOP
+
+    def start_workers(self):
+        """
+        Starts one worker process per strategy, up to the number of cores.
+        They are shut down when the agent is garbage collected.
+        """
+        self.cancel = multiprocessing.Event()
+        self.executor = ProcessPoolExecutor(
+            max_workers=min(len(self.strategies), os.cpu_count() or 1),
+            initializer=_init_worker, initargs=(self.cancel,))
+        weakref.finalize(self, _shutdown, self.executor, self.cancel,
+                         self.futures)
+
+    def lower_bound(self, state):
+        layout = state.getLayout()
+        if layout not in self.heuristics:
+            self.heuristics[layout] = HEURISTICS[self.heuristic_name](layout)
+        return self.heuristics[layout](state)
+
+    def search(self, state):
+        """
+        Returns the plan chosen among those of the strategies, or an empty
+        list if none found one. The expansion budget of `GameState` is
+        split evenly between the strategies, and their expansions are
+        credited with `GameState.creditExpanded`.
+        """
+        if self.executor is None:
+            self.start_workers()
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.perf_counter() + self.time_budget
+        budget = GameState.maximumExpanded - GameState.countExpanded
+        if not math.isinf(budget):
+            budget = int(budget) // len(self.strategies)
+        good_enough = self.tolerance * self.lower_bound(state)
+        layout = state.getLayout()
+        futures = {}
+        for algorithm in self.strategies:
+            future = self.executor.submit(
+                run_strategy, layout, state.getPacmanPosition(),
+                state.getFood().getBits(), algorithm, self.heuristic_name,
+                self.weight, budget, self.time_budget)
+            futures[future] = algorithm
+        self.futures.update(futures)
+
+        best = best_algorithm = None
+        partial = partial_algorithm = None
+        accepted = False
+        pending = set(futures)
+        while pending and not accepted:
+            timeout = None
+            if deadline is not None:
+                timeout = max(0, deadline - time.perf_counter())
+            done, pending = wait(pending, timeout, FIRST_COMPLETED)
+            if not done:  # Time budget exhausted
+                break
+            for future in done:
+                algorithm = futures[future]
+                actions, complete, expanded, exhausted = future.result()
+                self.account(algorithm, expanded)
+                if actions is None:
+                    continue
+                if not complete:
+                    if partial is None:
+                        partial, partial_algorithm = actions, algorithm
+                    continue
+                if best is None or len(actions) < len(best):
+                    best, best_algorithm = actions, algorithm
+                if ((algorithm in OPTIMAL_ALGORITHMS and not exhausted) or
+                        len(actions) <= good_enough):
+                    accepted = True
+
+        if pending:
+            self.cancel_strategies(pending, futures)
+        self.futures.clear()
+        if best is None:
+            best, best_algorithm = partial, partial_algorithm
+        if best is None:
+            return []
+        self.wins[best_algorithm] += 1
+        return best
+
+    def account(self, algorithm, expanded):
+        self.expanded[algorithm] += expanded
+        GameState.creditExpanded(expanded)
+
+    def cancel_strategies(self, pending, futures):
+        """
+        Cancels the strategies of the pending futures and waits for them
+        to stop, still accounting for their expansions.
+        """
+        self.cancel.set()
+        for future in pending:
+            future.cancel()
+        wait(pending)
+        for future in pending:
+            if not future.cancelled():
+                self.account(futures[future], future.result()[2])
+        self.cancel.clear()
@@ -2,7 +2,15 @@ import importlib
 import os
 from argparse import ArgumentParser, ArgumentTypeError
 
-from pacman_module.pacman import runGame
+import numpy as np
+
+from pacman_module.pacman import runGame, GameState, EXPLORED_MODES
+from pacman_module.layout import getLayout
+from pacman_module.mazeGenerator import MAZE_STYLES, SWEEP_NUM_FOOD, \
+    sweep, printSweep
+from heuristics import HEURISTICS, DEFAULT_HEURISTIC
+from fastsearch import ALGORITHMS
+from portfolio import DEFAULT_STRATEGIES
 from pacman_module.ghostAgents import\
     GreedyGhost, SmartyGhost, DumbyGhost, EastRandyGhost
 
@@ -21,30 +29,6 @@ def positive_integer(x):
     return x
 
 
-def layout_thin_borders(layout, thickness):
-    if thickness <= 1:
-        return layout
-    w = thickness-1
-    lay = layout.replace(".lay", "")
-    with open("pacman_module/layouts/" + lay + ".lay") as f:
-        list_lines = f.readlines()
-    for _ in range(w * 2):
-        list_lines[0] = '%' + list_lines[0]
-        list_lines[-1] = '%' + list_lines[-1]
-    for _ in range(w):
-        list_lines.insert(0, list_lines[0])
-        list_lines.append(list_lines[0])
-    for i in range(w+1, len(list_lines) - w-1):
-        list_lines[i] = list_lines[i].replace("\n", "")
-        for _ in range(w):
-            list_lines[i] += '%'
-            list_lines[i] = '%' + list_lines[i]
-        list_lines[i] += "\n"
-    with open("pacman_module/layouts/" + lay + "_thicker.lay", "w+") as f:
-        f.writelines(list_lines)
-    return lay + "_thicker.lay"
-
-
 def load_agent_from_file(filepath, class_module):
     class_mod = None
     expected_class = class_module
@@ -92,8 +76,9 @@ if __name__ == '__main__':
         default="small")
     parser.add_argument(
         '--nghosts',
-        help='Maximum number of ghosts in a maze.',
-        type=int, default=1)
+        help='Maximum number of ghosts in a maze (default: 1, or 0 with '
+             '--sweep).',
+        type=int, default=None)
     parser.add_argument(
         '--hiddenghosts',
         help='Whether the ghost is graphically hidden or not.',
@@ -107,6 +92,12 @@ if __name__ == '__main__':
         '--bsagentfile',
         help='Python file containing a `BeliefStateAgent` class.',
         default=None)
+    parser.add_argument(
+        '--samplestarts',
+        help='Draw the random ghost starts of belief state games with '
+             'layout.sampleFreeCells, from a numpy Generator seeded by '
+             '--seed, instead of the legacy rejection sampling.',
+        action="store_true")
     parser.add_argument(
         '--w',
         help='Parameter w as specified in instructions for Project Part 3.',
@@ -115,37 +106,136 @@ if __name__ == '__main__':
         '--p',
         help='Parameter p as specified in instructions for Project Part 3.',
         type=float, default=0.5)
+    parser.add_argument(
+        '--explored',
+        help='Tracking of the states explored by the agents: '
+             'off, count only, or a bounded sample of recent states.',
+        choices=EXPLORED_MODES, default="off")
+    parser.add_argument(
+        '--heuristic',
+        help='Heuristic of the A* agent, from the `heuristics` module.',
+        choices=sorted(HEURISTICS), default=DEFAULT_HEURISTIC)
+    parser.add_argument(
+        '--algorithm',
+        help='Search algorithm of the fastsearch agent.',
+        choices=ALGORITHMS, default="astar")
+    parser.add_argument(
+        '--weight',
+        help='Heuristic weight of weighted A* (wastar).',
+        type=float, default=2.0)
+    parser.add_argument(
+        '--strategies',
+        help='Search algorithms raced by the portfolio agent.',
+        choices=ALGORITHMS, nargs='+', default=list(DEFAULT_STRATEGIES))
+    parser.add_argument(
+        '--tolerance',
+        help='The portfolio agent accepts the first plan at most this '
+             'many times longer than the heuristic lower bound.',
+        type=float, default=1.0)
+    parser.add_argument(
+        '--expansionbudget',
+        help='Maximum number of nodes the agent may expand per move '
+             '(0: unlimited).',
+        type=int, default=0)
+    parser.add_argument(
+        '--timebudget',
+        help='Seconds the fastsearch and portfolio agents may search '
+             'per move (default: unlimited).',
+        type=float, default=None)
+    parser.add_argument(
+        '--maxexactfood',
+        help='Largest food count the Held-Karp agent solves exactly, '
+             'falling back to A* above it.',
+        type=int, default=12)
+    parser.add_argument(
+        '--sweep',
+        help='Play on generated square mazes of the given sizes instead, '
+             'reporting time, expanded nodes and peak memory per size.',
+        type=int, nargs='+', default=None)
+    parser.add_argument(
+        '--nomemory',
+        help='Skip the second, memory-traced game of each --sweep size.',
+        action="store_true")
+    parser.add_argument(
+        '--mazestyle',
+        help='Style of the mazes generated for --sweep.',
+        choices=MAZE_STYLES, default="maze")
+    parser.add_argument(
+        '--walldensity',
+        help='Probability of an inner wall in generated cave mazes.',
+        type=float, default=0.3)
+    parser.add_argument(
+        '--loops',
+        help='Fraction of the inner walls removed from generated mazes.',
+        type=float, default=0.0)
+    parser.add_argument(
+        '--nfood',
+        help='Number of food dots in generated mazes.',
+        type=int, default=SWEEP_NUM_FOOD)
+    parser.add_argument(
+        '--ncapsules',
+        help='Number of capsules in generated mazes.',
+        type=int, default=0)
 
     args = parser.parse_args()
 
-    if (args.agentfile == "humanagent.py" and args.silentdisplay):
+    if (args.agentfile == "humanagent.py" and
+            (args.silentdisplay or args.sweep is not None)):
         print("Human agent cannot play without graphical display")
         exit()
     agent = load_agent_from_file(args.agentfile, "PacmanAgent")(args)
 
     gagt = ghosts[args.ghostagent]
     nghosts = args.nghosts
+    if nghosts is None:
+        nghosts = 0 if args.sweep is not None else 1
     if (nghosts > 0):
         gagts = [gagt(i + 1, args) for i in range(nghosts)]
     else:
         gagts = []
-    layout = layout_thin_borders(args.layout, args.w)
+    if args.sweep is not None:
+        def play(layout):
+            agent = load_agent_from_file(args.agentfile, "PacmanAgent")(args)
+            gagts = [gagt(i + 1, args) for i in range(nghosts)]
+            return runGame(layout, agent, gagts, None, False,
+                           expout=args.expansionbudget)
+        with GameState.trackExplored(args.explored):
+            printSweep(sweep(
+                args.sweep, play, memory=not args.nomemory,
+                style=args.mazestyle,
+                wallDensity=args.walldensity, loops=args.loops,
+                numFood=args.nfood, numCapsules=args.ncapsules,
+                numGhosts=max(nghosts, 0), seed=args.seed))
+        exit()
+    layout = getLayout(args.layout)
+    if layout is None:
+        print("Layout " + args.layout + " cannot be found")
+        exit()
+    layout = layout.thickenBorders(args.w)
     bsagt = None
     if args.bsagentfile is not None:
         bsagt = load_agent_from_file(
             args.bsagentfile, "BeliefStateAgent")(args)
+    rng = np.random.default_rng(args.seed) if args.samplestarts else None
 
-    # Change directory to pacman_module, so that layout files can be found
-    os.chdir('pacman_module')
-
-    total_score, total_computation_time, total_expanded_nodes = runGame(
-        layout, agent, gagts, bsagt, not args.silentdisplay,
-        expout=0, hiddenGhosts=args.hiddenghosts)
+    with GameState.trackExplored(args.explored):
+        total_score, total_computation_time, total_expanded_nodes = runGame(
+            layout, agent, gagts, bsagt, not args.silentdisplay,
+            expout=args.expansionbudget, hiddenGhosts=args.hiddenghosts,
+            rng=rng)
 
     print("Total score : " + str(total_score))
     print("Total computation time (seconds) : " + str(total_computation_time))
     print("Total expanded nodes : " + str(total_expanded_nodes))
-    f = open("temp", "w+")
+    if hasattr(agent, "replans"):
+        print("Total replans : " + str(agent.replans))
+    if hasattr(agent, "wins"):
+        print("Plans per strategy : " + str(agent.wins))
+        print("Expanded nodes per strategy : " + str(agent.expanded))
+    if args.explored != "off":
+        print("Total explored states : " + str(GameState.getExploredCount()))
+    f = open(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          "pacman_module", "temp"), "w+")
     s, c, e = total_score, total_computation_time, total_expanded_nodes
     f.write(str(s) + ";" + str(c) + ";" + str(e))
     f.close()
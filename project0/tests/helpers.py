@@ -0,0 +1,115 @@
+"""
+Layouts, reference solutions and game loops shared by the tests of the
+search agents, and the base test case of the tests loading layouts.
+"""
+import tempfile
+import unittest
+from collections import deque
+from unittest import mock
+
+from pacman_module import layout as layoutModule
+from pacman_module.foodSearch import FoodSearchProblem
+from pacman_module.layout import getLayout
+from pacman_module.mazeGenerator import generateMaze
+from pacman_module.pacman import GameState
+
+LAYOUTS = ("small", "medium", "large")
+MAX_MOVES = 1000
+
+
+class LayoutCacheTestCase(unittest.TestCase):
+    """
+    Test case keeping the compiled layouts and distance tables its tests
+    save in a temporary CACHE_DIRECTORY, rather than in that of the user.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(layoutModule, 'CACHE_DIRECTORY',
+                                    directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(directory.cleanup)
+
+
+def sampleLayouts(maxFood=None):
+    """
+    Returns the layouts the search tests play on: the LAYOUTS, with half
+    their food when they have more than maxFood dots, and small generated
+    mazes with loops.
+    """
+    layouts = []
+    for name in LAYOUTS:
+        layout = getLayout(name)
+        if maxFood is not None and layout.food.count() > maxFood:
+            layout = layout.thinFood(0.5, seed=0)
+        layouts.append(layout)
+    for seed in range(3):
+        layouts.append(generateMaze(15, 9, loops=0.3, numFood=5,
+                                    seed=seed))
+    return layouts
+
+
+def shortestSolution(layout):
+    """
+    Returns the number of moves of a shortest path eating all food, by
+    breadth-first search over (cell, remaining food) pairs.
+    """
+    successors = layout.getMoveTable().successors
+    start = (layout.pacPos, frozenset(layout.food.asList()) -
+             {layout.pacPos})
+    depth = {start: 0}
+    pending = deque([start])
+    while pending:
+        cell, food = pending.popleft()
+        if not food:
+            return depth[cell, food]
+        for _, nextCell in successors[cell]:
+            nextState = (nextCell, food - {nextCell})
+            if nextState not in depth:
+                depth[nextState] = depth[cell, food] + 1
+                pending.append(nextState)
+    return None
+
+
+def newProblem(layout, maxExpanded=float('inf'), deadline=None):
+    """
+    Returns the FoodSearchProblem of the start of a layout.
+    """
+    return FoodSearchProblem(layout, layout.pacPos, layout.food.asList(),
+                             maxExpanded, deadline)
+
+
+def solves(problem, actions):
+    """
+    Tells whether actions lead from the start of problem to a goal.
+    """
+    state = problem.getStartState()
+    for action in actions:
+        state = dict(problem.getSuccessors(state))[action]
+    return problem.isGoalState(state)
+
+
+def newGame(layout):
+    """
+    Returns the start state of a game without ghosts.
+    """
+    state = GameState()
+    state.initialize(layout, 0)
+    return state
+
+
+def play(agent, layout):
+    """
+    Plays a game without ghosts, returning the final state, the actions
+    played and the number of expansions credited at each move.
+    """
+    state = newGame(layout)
+    actions, expanded = [], []
+    while not state.isWin() and len(actions) < MAX_MOVES:
+        GameState.resetNodeExpansionCounter()
+        action = agent.get_action(state.snapshot())
+        actions.append(action)
+        expanded.append(GameState.countExpanded)
+        state = state.generateSuccessor(0, action)
+    return state, actions, expanded
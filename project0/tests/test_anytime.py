@@ -0,0 +1,114 @@
+import time
+import unittest
+from argparse import Namespace
+
+import numpy as np
+
+import fastsearch
+from heuristics import HEURISTICS
+from pacman_module.foodSearch import (ANYTIME_WEIGHTS,
+                                      anytimeWeightedAStarSearch)
+from helpers import (LAYOUTS, LayoutCacheTestCase, newGame, newProblem,
+                     play, shortestSolution, solves)
+from pacman_module.layout import getLayout
+from pacman_module.mazeGenerator import generateMaze
+from pacman_module.pacman import GameState
+
+
+def search(layout, maxExpanded=float('inf'), deadline=None):
+    problem = newProblem(layout, maxExpanded, deadline)
+    heuristic = HEURISTICS["mst"](layout).for_problem(problem)
+    return problem, anytimeWeightedAStarSearch(problem, heuristic)
+
+
+class AnytimeSearchTest(LayoutCacheTestCase):
+    """
+    Checks that anytime weighted A* stops within its budget with the best
+    plan found so far, and that the plan is optimal when it does not.
+    """
+
+    def test_optimal(self):
+        layouts = [getLayout(name) for name in LAYOUTS]
+        layouts.append(generateMaze(21, 11, loops=0.3, numFood=8, seed=0))
+        for layout in layouts:
+            problem, actions = search(layout)
+            self.assertFalse(problem.exhausted)
+            self.assertEqual(len(actions), shortestSolution(layout))
+
+    def test_expansion_budget(self):
+        layout = generateMaze(21, 11, loops=0.3, numFood=8, seed=0)
+        shortest = shortestSolution(layout)
+        full, _ = search(layout)
+        lengths = []
+        for budget in range(1, full.expanded + 1, 7):
+            problem, actions = search(layout, budget)
+            self.assertLessEqual(problem.expanded, budget)
+            self.assertTrue(problem.exhausted)
+            self.assertGreater(len(actions), 0)
+            if solves(problem, actions):
+                lengths.append(len(actions))
+        # Plans only get shorter as the budget grows
+        self.assertEqual(lengths, sorted(lengths, reverse=True))
+        self.assertGreater(lengths[0], shortest)
+        self.assertEqual(lengths[-1], shortest)
+
+    def test_first_plan(self):
+        # The first weight finds a plan whatever the budget left for the
+        # others
+        layout = getLayout(LAYOUTS[1])
+        problem = newProblem(layout)
+        heuristic = HEURISTICS["mst"](layout).for_problem(problem)
+        actions = anytimeWeightedAStarSearch(problem, heuristic,
+                                             ANYTIME_WEIGHTS[:1])
+        problem, anytime = search(layout, problem.expanded)
+        self.assertLessEqual(len(anytime), len(actions))
+
+    def test_deadline(self):
+        layout = getLayout(LAYOUTS[1])
+        problem, actions = search(layout, deadline=time.perf_counter())
+        self.assertTrue(problem.exhausted)
+        self.assertEqual(problem.expanded, 0)
+        self.assertIsNone(actions)
+        problem = newProblem(layout, deadline=time.perf_counter())
+        self.assertEqual(len(fastsearch.solve(
+            problem, "anytime", lambda state: 0, partial=True)), 1)
+
+
+class AnytimeAgentTest(LayoutCacheTestCase):
+    """
+    Plays the anytime agent within expansion and time budgets.
+    """
+
+    def tearDown(self):
+        GameState.setMaximumExpanded(np.inf)
+        GameState.resetNodeExpansionCounter()
+
+    def test_budgets(self):
+        layout = getLayout(LAYOUTS[1])
+        for args, budget in ((Namespace(algorithm="anytime"), 20),
+                             (Namespace(algorithm="anytime",
+                                        timebudget=0.0), np.inf)):
+            GameState.setMaximumExpanded(budget)
+            agent = fastsearch.PacmanAgent(args)
+            start = newGame(layout)
+            GameState.resetNodeExpansionCounter()
+            agent.get_action(start.snapshot())
+            self.assertTrue(agent.budget_exhausted)
+            # Partial plans keep Pacman moving until all food is eaten
+            agent = fastsearch.PacmanAgent(args)
+            state, actions, expanded = play(agent, layout)
+            self.assertTrue(state.isWin())
+            self.assertLessEqual(max(expanded), budget)
+            self.assertEqual(agent.replans, 0)
+
+    def test_unlimited(self):
+        layout = getLayout(LAYOUTS[1])
+        agent = fastsearch.PacmanAgent(Namespace(algorithm="anytime"))
+        state, actions, _ = play(agent, layout)
+        self.assertTrue(state.isWin())
+        self.assertFalse(agent.budget_exhausted)
+        self.assertEqual(len(actions), shortestSolution(layout))
+
+
+if __name__ == '__main__':
+    unittest.main()
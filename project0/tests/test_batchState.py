@@ -0,0 +1,70 @@
+import random
+import unittest
+
+import numpy as np
+
+from helpers import LayoutCacheTestCase
+from pacman_module.batchState import BatchState
+from pacman_module.game import Directions
+from pacman_module.layout import getLayout
+from pacman_module.pacman import GameState
+
+LAYOUTS = ("small", "medium", "large")
+ROLLOUTS = 16
+MAX_TURNS = 150
+
+
+class BatchStateTest(LayoutCacheTestCase):
+    """
+    Plays random rollouts with GameState.generateSuccessor and the same
+    actions with BatchState.step, comparing the states after every move.
+    """
+
+    def assertRowMatches(self, batch, row, state, context):
+        ghosts = [state.getGhostPosition(i)
+                  for i in range(1, state.getNumAgents())]
+        timers = [state.data.agentStates[i].scaredTimer
+                  for i in range(1, state.getNumAgents())]
+        food = np.array(state.getFood().data, dtype=bool)
+        self.assertEqual(tuple(batch.pacmanPositions[row]),
+                         state.getPacmanPosition(), context)
+        np.testing.assert_allclose(
+            batch.ghostPositions[row], np.reshape(ghosts, (-1, 2)),
+            err_msg=context)
+        np.testing.assert_array_equal(batch.scaredTimers[row], timers,
+                                      err_msg=context)
+        np.testing.assert_array_equal(batch.food[row], food, err_msg=context)
+        self.assertEqual(batch.scores[row], state.getScore(), context)
+        self.assertEqual(batch.wins[row], state.isWin(), context)
+        self.assertEqual(batch.loses[row], state.isLose(), context)
+
+    def test_rollouts_match_generate_successor(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            start = GameState()
+            start.initialize(layout, layout.getNumGhosts())
+            states = [start] * ROLLOUTS
+            batch = BatchState(states)
+            rng = random.Random(name)
+            numAgents = start.getNumAgents()
+            for turn in range(MAX_TURNS):
+                agent = turn % numAgents
+                actions = []
+                for row, state in enumerate(states):
+                    if state.isWin() or state.isLose():
+                        actions.append(Directions.STOP)
+                        continue
+                    action = rng.choice(state.getLegalActions(agent))
+                    actions.append(action)
+                    states[row] = state.generateSuccessor(agent, action)
+                batch.step(agent, actions)
+                for row, state in enumerate(states):
+                    self.assertRowMatches(
+                        batch, row, state,
+                        "%s, rollout %d, turn %d" % (name, row, turn))
+                if all(s.isWin() or s.isLose() for s in states):
+                    break
+
+
+if __name__ == '__main__':
+    unittest.main()
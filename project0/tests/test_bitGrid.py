@@ -0,0 +1,94 @@
+import random
+import unittest
+
+from pacman_module.game import BitGrid, Grid, ReadOnlyBitGrid
+
+SIZES = ((1, 1), (7, 5), (20, 11), (31, 17))
+GRIDS = 20
+
+
+def randomGrid(rng, width, height):
+    grid = Grid(width, height)
+    for x in range(width):
+        for y in range(height):
+            grid[x][y] = rng.random() < 0.4
+    return grid
+
+
+class BitGridTest(unittest.TestCase):
+    """
+    Compares BitGrids with the list-backed Grids holding the same content.
+    """
+
+    def assertSameGrid(self, bitGrid, grid):
+        for x in range(grid.width):
+            for y in range(grid.height):
+                self.assertEqual(bitGrid[x][y], grid[x][y], (x, y))
+        self.assertEqual(bitGrid, grid)
+        self.assertEqual(hash(bitGrid), hash(grid))
+        self.assertEqual(bitGrid.count(), grid.count())
+        self.assertEqual(bitGrid.count(False), grid.count(False))
+        self.assertEqual(sorted(bitGrid.asList()), grid.asList())
+        self.assertEqual(sorted(bitGrid.asList(False)), grid.asList(False))
+        self.assertEqual(str(bitGrid), str(grid))
+
+    def test_matches_grid(self):
+        rng = random.Random(0)
+        for width, height in SIZES:
+            for _ in range(GRIDS):
+                grid = randomGrid(rng, width, height)
+                self.assertSameGrid(BitGrid.fromGrid(grid), grid)
+
+    def test_assignments_match_grid(self):
+        rng = random.Random(1)
+        for width, height in SIZES:
+            grid = randomGrid(rng, width, height)
+            bitGrid = BitGrid.fromGrid(grid)
+            # Fill the caches, which assignments must invalidate
+            hash(bitGrid), bitGrid.count(), bitGrid.asList()
+            for _ in range(3 * width * height):
+                x, y = rng.randrange(width), rng.randrange(height)
+                value = rng.random() < 0.5
+                grid[x][y] = value
+                bitGrid[x][y] = value
+                self.assertEqual(bitGrid.count(), grid.count())
+            self.assertSameGrid(bitGrid, grid)
+
+    def test_initial_value(self):
+        for value in (False, True):
+            self.assertSameGrid(BitGrid(7, 5, value), Grid(7, 5, value))
+        self.assertRaises(Exception, BitGrid, 7, 5, 1.5)
+
+    def test_indexing(self):
+        grid = BitGrid(4, 3)
+        grid[-1][-1] = True
+        self.assertTrue(grid[3][2])
+        self.assertEqual(len(grid[0]), 3)
+        self.assertRaises(IndexError, lambda: grid[4])
+        self.assertRaises(IndexError, lambda: grid[0][3])
+
+    def test_copies_are_independent(self):
+        grid = randomGrid(random.Random(2), 20, 11)
+        bitGrid = BitGrid.fromGrid(grid)
+        for copy in (bitGrid.copy(), bitGrid.deepCopy(),
+                     bitGrid.shallowCopy()):
+            copy[0][0] = not copy[0][0]
+            self.assertNotEqual(copy, bitGrid)
+        self.assertSameGrid(bitGrid, grid)
+
+    def test_read_only_grid(self):
+        grid = randomGrid(random.Random(3), 20, 11)
+        bitGrid = BitGrid.fromGrid(grid)
+        readOnly = ReadOnlyBitGrid(bitGrid)
+        self.assertSameGrid(readOnly, grid)
+
+        def assign():
+            readOnly[0][0] = not readOnly[0][0]
+        self.assertRaises(TypeError, assign)
+        copy = readOnly.copy()
+        copy[0][0] = not copy[0][0]
+        self.assertSameGrid(readOnly, grid)
+
+
+if __name__ == '__main__':
+    unittest.main()
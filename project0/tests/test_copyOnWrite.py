@@ -0,0 +1,78 @@
+import unittest
+
+from pacman_module.game import AgentState, Configuration, Directions
+from pacman_module.layout import Layout
+from pacman_module.pacman import GameState
+
+LAYOUT = ("%%%%%%%%%",
+          "%Po    G%",
+          "% %%.%% %",
+          "%G  .   %",
+          "%%%%%%%%%")
+
+
+class CopyOnWriteTest(unittest.TestCase):
+    """
+    Checks that successors share the agent states they do not modify with
+    their predecessor, and never modify shared ones.
+    """
+
+    def setUp(self):
+        self.state = GameState()
+        self.state.initialize(Layout(LAYOUT), 2)
+
+    def test_successors_share_unmoved_agents(self):
+        # Pacman eats the capsule first, so that no ghost can kill it
+        parent = self.state.generateSuccessor(0, Directions.EAST)
+        for agent in (1, 2, 0):
+            action = parent.getLegalActions(agent)[0]
+            successor = parent.generateSuccessor(agent, action)
+            for i in range(parent.getNumAgents()):
+                same = (successor.data.agentStates[i] is
+                        parent.data.agentStates[i])
+                self.assertEqual(same, i != agent, (agent, i))
+            parent = successor
+
+    def test_rules_copy_shared_agents(self):
+        before = [(s.configuration, s.scaredTimer)
+                  for s in self.state.data.agentStates]
+        # Eating the capsule scares every ghost
+        successor = self.state.generateSuccessor(0, Directions.EAST)
+        self.assertEqual(successor.getCapsules(), [])
+        for i in range(1, successor.getNumAgents()):
+            self.assertTrue(successor.getGhostState(i).scaredTimer > 0)
+            self.assertIsNot(successor.data.agentStates[i],
+                             self.state.data.agentStates[i])
+        self.assertEqual([(s.configuration, s.scaredTimer)
+                          for s in self.state.data.agentStates], before)
+
+    def test_successors_of_successors_keep_parents_intact(self):
+        first = self.state.generateSuccessor(0, Directions.EAST)
+        timers = [first.getGhostState(i).scaredTimer for i in (1, 2)]
+        # Both siblings decrement the timer of the same ghost
+        for action in first.getLegalActions(1):
+            first.generateSuccessor(1, action)
+        self.assertEqual([first.getGhostState(i).scaredTimer
+                          for i in (1, 2)], timers)
+
+    def test_ghost_states_view(self):
+        ghostStates = self.state.getGhostStates()
+        self.assertIs(self.state.getGhostStates(), ghostStates)
+        self.assertEqual(len(ghostStates), 2)
+        self.assertEqual(list(ghostStates), self.state.data.agentStates[1:])
+        self.assertEqual(ghostStates[:1], self.state.data.agentStates[1:2])
+        # The view follows the agent states replaced by the rules
+        state = self.state
+        state.apply(0, Directions.EAST)
+        self.assertIs(ghostStates[0], state.data.agentStates[1])
+        self.assertTrue(ghostStates[0].scaredTimer > 0)
+
+    def test_slots(self):
+        configuration = Configuration((1, 1), Directions.STOP)
+        for obj in (configuration, AgentState(configuration, 1),
+                    self.state.data):
+            self.assertFalse(hasattr(obj, '__dict__'), type(obj))
+
+
+if __name__ == '__main__':
+    unittest.main()
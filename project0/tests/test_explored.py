@@ -0,0 +1,80 @@
+import unittest
+
+from helpers import LayoutCacheTestCase
+from pacman_module.layout import getLayout
+from pacman_module.pacman import (EXPLORED_COUNT, EXPLORED_OFF,
+                                  EXPLORED_SAMPLE, GameState)
+
+LAYOUT = "small"
+
+
+class ExploredTrackingTest(LayoutCacheTestCase):
+    """
+    Checks the states recorded by generateSuccessor in each exploration
+    tracking mode.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.tearDown()
+        layout = getLayout(LAYOUT)
+        self.start = GameState()
+        self.start.initialize(layout, 0)
+
+    def tearDown(self):
+        GameState.setExploredTracking(EXPLORED_OFF)
+        GameState.getAndResetExplored()
+
+    def walk(self, moves):
+        """
+        Generates the successors of `moves` successive states, returning
+        them in order.
+        """
+        states = []
+        state = self.start
+        for _ in range(moves):
+            state = state.generateSuccessor(
+                0, state.getLegalActions(0)[0])
+            states.append(state)
+        return states
+
+    def test_off_records_nothing(self):
+        self.walk(10)
+        self.assertEqual(GameState.getExploredCount(), 0)
+        self.assertEqual(GameState.getAndResetExplored(), set())
+
+    def test_count_keeps_no_state(self):
+        GameState.setExploredTracking(EXPLORED_COUNT)
+        self.walk(10)
+        self.assertEqual(GameState.getExploredCount(), 20)
+        self.assertEqual(GameState.getAndResetExplored(), set())
+        self.assertEqual(GameState.getExploredCount(), 0)
+
+    def test_sample_evicts_oldest_states(self):
+        GameState.setExploredTracking(EXPLORED_SAMPLE, limit=5)
+        states = self.walk(10)
+        self.assertEqual(GameState.getExploredCount(), 20)
+        self.assertEqual(GameState.getAndResetExplored(), set(states[-5:]))
+
+    def test_lowering_the_limit_evicts(self):
+        GameState.setExploredTracking(EXPLORED_SAMPLE)
+        states = self.walk(10)
+        GameState.setExploredTracking(EXPLORED_SAMPLE, limit=3)
+        self.assertEqual(GameState.getAndResetExplored(), set(states[-3:]))
+
+    def test_context_manager(self):
+        GameState.setExploredTracking(EXPLORED_COUNT)
+        self.walk(3)
+        with GameState.trackExplored(limit=4):
+            self.assertEqual(GameState.getExploredCount(), 0)
+            states = self.walk(10)
+        self.assertEqual(GameState.exploredMode, EXPLORED_COUNT)
+        self.assertEqual(GameState.getExploredCount(), 20)
+        self.assertEqual(GameState.getAndResetExplored(), set(states[-4:]))
+
+    def test_unknown_mode(self):
+        self.assertRaises(Exception, GameState.setExploredTracking, 'all')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+from fastsearch import ALGORITHMS, OPTIMAL_ALGORITHMS, solve
+from heuristics import HEURISTICS
+from pacman_module.foodSearch import FoodSearchProblem
+from pacman_module.game import Actions, Directions
+from helpers import (LAYOUTS, LayoutCacheTestCase, newGame, newProblem,
+                     sampleLayouts, shortestSolution)
+from pacman_module.layout import Layout, getLayout
+
+# Food behind a wall
+WALLED = ("%%%%%%",
+          "%P %.%",
+          "%%%%%%")
+
+
+class FoodSearchProblemTest(LayoutCacheTestCase):
+    """
+    Compares the compact states of FoodSearchProblem with game states.
+    """
+
+    def test_successors(self):
+        for layout in sampleLayouts():
+            problem = newProblem(layout)
+            cells = layout.getFreeCells()
+            pending = [(problem.getStartState(), newGame(layout))]
+            seen = set()
+            while pending and len(seen) < 500:
+                state, gameState = pending.pop()
+                if state in seen:
+                    continue
+                seen.add(state)
+                cell, mask = problem.decode(state)
+                self.assertEqual(cells[cell], gameState.getPacmanPosition())
+                self.assertEqual(
+                    sorted(cells[f] for f in problem.getFoodCells(mask)),
+                    sorted(gameState.getFood().asList()))
+                self.assertEqual(problem.isGoalState(state),
+                                 gameState.isWin())
+                if gameState.isWin():
+                    continue
+                successors = problem.getSuccessors(state)
+                self.assertEqual(
+                    sorted(action for action, _ in successors),
+                    sorted(action for action
+                           in gameState.getLegalPacmanActions()
+                           if action != Directions.STOP))
+                for action, nextState in successors:
+                    pending.append((nextState, gameState.generateSuccessor(
+                        0, action)))
+
+    def test_expansions(self):
+        problem = newProblem(getLayout(LAYOUTS[1]), 3)
+        start = problem.getStartState()
+        for _ in range(3):
+            self.assertEqual(problem.expand(start),
+                             problem.getSuccessors(start))
+        self.assertFalse(problem.exhausted)
+        self.assertIsNone(problem.expand(start))
+        self.assertTrue(problem.exhausted)
+        self.assertEqual(problem.expanded, 3)
+
+    def test_capsules(self):
+        layout = getLayout(LAYOUTS[1])
+        capsule = layout.capsules[0]
+        problem = FoodSearchProblem(layout, layout.pacPos,
+                                    layout.food.asList(),
+                                    capsules=layout.capsules)
+        plain = newProblem(layout)
+        indices = layout.getCellIndices()
+        # Eating a capsule changes the state, but not its food mask
+        left = problem.encode(indices[capsule], 1, 1)
+        eaten = problem.encode(indices[capsule], 1, 0)
+        self.assertNotEqual(left, eaten)
+        self.assertEqual(problem.decode(left), problem.decode(eaten))
+        self.assertEqual(problem.decode(left), plain.decode(
+            plain.encode(indices[capsule], 1)))
+        self.assertTrue(problem.isGoalState(
+            problem.encode(indices[capsule], 0, 1)))
+        for neighbor in [c for _, c in
+                         layout.getMoveTable().successors[capsule]]:
+            state = problem.encode(indices[neighbor], 1, 1)
+            self.assertIn(eaten, [s for _, s in
+                                  problem.getSuccessors(state)])
+
+
+class SolveTest(LayoutCacheTestCase):
+    """
+    Runs every algorithm on the layouts, checking that its plans eat all
+    food, and that those of the optimal ones are as short as possible.
+    """
+
+    def assertSolves(self, layout, actions, context):
+        cell = layout.pacPos
+        food = set(layout.food.asList())
+        walls = layout.walls
+        for action in actions:
+            self.assertTrue(food, context)
+            x, y = Actions.getSuccessor(cell, action)
+            self.assertFalse(walls[int(x)][int(y)], context)
+            cell = (int(x), int(y))
+            food.discard(cell)
+        self.assertEqual(food, set(), context)
+
+    def test_plans(self):
+        for layout in sampleLayouts():
+            shortest = shortestSolution(layout)
+            heuristic = HEURISTICS["mst"](layout)
+            for algorithm in ALGORITHMS:
+                problem = newProblem(layout)
+                actions = solve(problem, algorithm,
+                                heuristic.for_problem(problem))
+                context = (algorithm, str(layout))
+                self.assertSolves(layout, actions, context)
+                self.assertFalse(problem.exhausted, context)
+                if algorithm in OPTIMAL_ALGORITHMS:
+                    self.assertEqual(len(actions), shortest, context)
+                elif algorithm == "wastar":
+                    self.assertLessEqual(len(actions), 2 * shortest,
+                                         context)
+
+    def test_no_solution(self):
+        layout = Layout(WALLED)
+        heuristic = HEURISTICS["mst"](layout)
+        for algorithm in ALGORITHMS:
+            problem = newProblem(layout)
+            self.assertIsNone(solve(problem, algorithm,
+                                    heuristic.for_problem(problem)),
+                              algorithm)
+
+    def test_no_food(self):
+        layout = getLayout(LAYOUTS[0]).thinFood(0.0)
+        for algorithm in ALGORITHMS:
+            self.assertEqual(solve(newProblem(layout), algorithm,
+                                   lambda state: 0), [], algorithm)
+
+    def test_budget(self):
+        layout = getLayout(LAYOUTS[1])
+        heuristic = HEURISTICS["mst"](layout)
+        for algorithm in ALGORITHMS:
+            problem = newProblem(layout, 5)
+            actions = solve(problem, algorithm,
+                            heuristic.for_problem(problem))
+            # Anytime search always returns its best partial plan
+            if algorithm != "anytime":
+                self.assertIsNone(actions, algorithm)
+            self.assertTrue(problem.exhausted, algorithm)
+            self.assertEqual(problem.expanded, 5, algorithm)
+            # Partial plans make progress toward the food
+            problem = newProblem(layout, 5)
+            actions = solve(problem, algorithm,
+                            heuristic.for_problem(problem), partial=True)
+            if algorithm in ("bfs", "dfs"):
+                self.assertEqual(len(actions), 1, algorithm)
+            self.assertGreater(len(actions), 0, algorithm)
+
+    def test_unknown_algorithm(self):
+        problem = newProblem(getLayout(LAYOUTS[0]))
+        self.assertRaises(Exception, solve, problem, "beam")
+
+
+if __name__ == '__main__':
+    unittest.main()
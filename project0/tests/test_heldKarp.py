@@ -0,0 +1,131 @@
+import itertools
+import unittest
+from argparse import Namespace
+from unittest import mock
+
+import numpy as np
+
+import heldkarp
+from helpers import (LAYOUTS, LayoutCacheTestCase, newGame, play,
+                     sampleLayouts)
+from pacman_module.layout import getLayout
+from pacman_module.mazeGenerator import generateMaze
+from pacman_module.pacman import GameState
+from tsp import food_tour, held_karp, held_karp_states
+
+# Largest number of food dots of the games compared with every tour
+MAX_TOUR_FOOD = 7
+
+
+def bruteForceTour(start_distances, distances):
+    """
+    Returns the cost of the shortest open tour, over every order of the
+    points.
+    """
+    n = len(start_distances)
+    if n == 0:
+        return 0
+    return min(tourCost(start_distances, distances, order)
+               for order in itertools.permutations(range(n)))
+
+
+def tourCost(start_distances, distances, order):
+    return start_distances[order[0]] + sum(
+        distances[a][b] for a, b in zip(order, order[1:]))
+
+
+def shortestFoodTour(layout):
+    food = layout.food.asList()
+    start = [layout.mazeDistance(layout.pacPos, f) for f in food]
+    between = [[layout.mazeDistance(a, b) for b in food] for a in food]
+    return bruteForceTour(start, between)
+
+
+class HeldKarpTest(LayoutCacheTestCase):
+    """
+    Compares held_karp with the tours of every order of the points.
+    """
+
+    def test_random_distances(self):
+        rng = np.random.default_rng(0)
+        for n in range(7):
+            for _ in range(10):
+                start = rng.integers(1, 20, n)
+                between = rng.integers(1, 20, (n, n))
+                cost, order = held_karp(start, between)
+                self.assertEqual(sorted(order), list(range(n)))
+                self.assertEqual(cost, bruteForceTour(start, between))
+                if n:
+                    self.assertEqual(tourCost(start, between, order), cost)
+
+    def test_unreachable(self):
+        start = [1, np.inf, 2]
+        between = np.full((3, 3), np.inf)
+        self.assertEqual(held_karp(start, between)[0], np.inf)
+        between[0, 2] = between[2, 1] = 1
+        self.assertEqual(held_karp(start, between), (3, [0, 2, 1]))
+
+    def test_states(self):
+        for n in range(1, 10):
+            self.assertEqual(held_karp_states(n),
+                             n * 2 ** (n - 1))
+        self.assertEqual(held_karp_states(0), 0)
+
+    def test_food_tour(self):
+        for seed in range(3):
+            layout = generateMaze(15, 9, loops=0.3, numFood=6, seed=seed)
+            moves = food_tour(layout, layout.pacPos, layout.food.asList())
+            self.assertEqual(len(moves), shortestFoodTour(layout))
+            state = newGame(layout)
+            for action in moves:
+                state = state.generateSuccessor(0, action)
+            self.assertTrue(state.isWin())
+
+
+class HeldKarpAgentTest(LayoutCacheTestCase):
+    """
+    Plays the Held-Karp agent, exactly and through its A* fallback.
+    """
+
+    def tearDown(self):
+        GameState.setMaximumExpanded(np.inf)
+        GameState.resetNodeExpansionCounter()
+
+    def test_optimal_games(self):
+        for layout in sampleLayouts(MAX_TOUR_FOOD):
+            agent = heldkarp.PacmanAgent(Namespace())
+            state, actions, _ = play(agent, layout)
+            self.assertTrue(state.isWin())
+            self.assertEqual(len(actions), shortestFoodTour(layout))
+            self.assertEqual(agent.replans, 0)
+
+    def test_expansions(self):
+        layout = sampleLayouts(MAX_TOUR_FOOD)[1]
+        state = newGame(layout)
+        GameState.resetNodeExpansionCounter()
+        heldkarp.PacmanAgent(Namespace()).get_action(state.snapshot())
+        self.assertEqual(GameState.countExpanded,
+                         held_karp_states(layout.food.count()))
+
+    def test_fallback(self):
+        layout = getLayout(LAYOUTS[1])
+        for args, budget in ((Namespace(maxexactfood=3), np.inf),
+                             (Namespace(), 100)):
+            GameState.setMaximumExpanded(budget)
+            agent = heldkarp.PacmanAgent(args)
+            with mock.patch.object(heldkarp, 'food_tour',
+                                   side_effect=AssertionError), \
+                    mock.patch.object(agent.fallback, 'astar',
+                                      wraps=agent.fallback.astar) as astar:
+                state = newGame(layout)
+                GameState.resetNodeExpansionCounter()
+                agent.get_action(state.snapshot())
+                self.assertEqual(astar.call_count, 1)
+            self.assertLessEqual(GameState.countExpanded, budget)
+        GameState.setMaximumExpanded(np.inf)
+        self.assertTrue(play(heldkarp.PacmanAgent(Namespace(maxexactfood=3)),
+                             layout)[0].isWin())
+
+
+if __name__ == '__main__':
+    unittest.main()
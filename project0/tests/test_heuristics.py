@@ -0,0 +1,137 @@
+import unittest
+from collections import deque
+from unittest import mock
+
+import heuristics
+from heuristics import HEURISTICS
+from helpers import (LAYOUTS, LayoutCacheTestCase, newGame, newProblem,
+                     sampleLayouts)
+from pacman_module import layout as layoutModule
+from pacman_module.foodSearch import FoodSearchProblem
+from pacman_module.layout import getLayout
+from pacman_module.mazeGenerator import generateMaze
+
+# Largest number of food dots of the layouts whose every state is checked
+MAX_FOOD = 7
+
+
+def exactCosts(problem):
+    """
+    Returns the number of moves left to a goal from every state reachable
+    from the start of problem, by breadth-first search backwards from the
+    goal states.
+    """
+    predecessors = {problem.getStartState(): []}
+    pending = deque(predecessors)
+    while pending:
+        state = pending.popleft()
+        if problem.isGoalState(state):
+            continue
+        for _, nextState in problem.getSuccessors(state):
+            if nextState not in predecessors:
+                predecessors[nextState] = []
+                pending.append(nextState)
+            predecessors[nextState].append(state)
+    costs = dict((state, 0) for state in predecessors
+                 if problem.isGoalState(state))
+    pending = deque(costs)
+    while pending:
+        state = pending.popleft()
+        for previous in predecessors[state]:
+            if previous not in costs:
+                costs[previous] = costs[state] + 1
+                pending.append(previous)
+    return costs
+
+
+class HeuristicTest(LayoutCacheTestCase):
+    """
+    Compares the heuristics with the exact number of moves left, from
+    every reachable state of small layouts.
+    """
+
+    def assertAdmissibleAndConsistent(self, layout, name):
+        problem = newProblem(layout)
+        heuristic = HEURISTICS[name](layout).for_problem(problem)
+        for state, cost in exactCosts(problem).items():
+            h = heuristic(state)
+            context = (name, problem.decode(state))
+            self.assertLessEqual(h, cost, context)
+            if problem.isGoalState(state):
+                self.assertEqual(h, 0, context)
+                continue
+            for _, nextState in problem.getSuccessors(state):
+                self.assertLessEqual(h, heuristic(nextState) + 1, context)
+
+    def test_admissible_and_consistent(self):
+        for layout in sampleLayouts(MAX_FOOD):
+            for name in HEURISTICS:
+                self.assertAdmissibleAndConsistent(layout, name)
+
+    def test_base_class(self):
+        layout = getLayout(LAYOUTS[0])
+        problem = newProblem(layout)
+        heuristic = heuristics.FoodHeuristic(layout).for_problem(problem)
+        self.assertEqual(heuristic(problem.getStartState()), 0)
+        self.assertEqual(heuristics.FoodHeuristic(layout)(newGame(layout)),
+                         0)
+
+    def test_game_states(self):
+        # Heuristics give the same value to a game state and to the
+        # compact state of a problem it starts
+        for layout in sampleLayouts(MAX_FOOD):
+            state = newGame(layout)
+            for name, cls in HEURISTICS.items():
+                heuristic = cls(layout)
+                for successor in [state] + [
+                        state.generateSuccessor(0, action)
+                        for action in state.getLegalPacmanActions()]:
+                    problem = FoodSearchProblem(
+                        layout, successor.getPacmanPosition(),
+                        successor.getFood().asList())
+                    self.assertEqual(
+                        heuristic(successor),
+                        heuristic.for_problem(problem)(
+                            problem.getStartState()), name)
+
+    def test_memo(self):
+        layout = getLayout(LAYOUTS[1])
+        problem = newProblem(layout)
+        instance = HEURISTICS["mst"](layout)
+        heuristic = instance.for_problem(problem, memo_size=2)
+        states = list(exactCosts(problem))[:200]
+        values = [heuristic(state) for state in states]
+        with mock.patch.object(instance, 'prepare',
+                               side_effect=AssertionError):
+            # The two most recent food masks are remembered
+            heuristic(states[-1])
+        self.assertEqual([heuristic(state) for state in states], values)
+        self.assertEqual(
+            [instance.for_problem(problem)(state) for state in states],
+            values)
+
+
+class ManhattanFallbackTest(LayoutCacheTestCase):
+    """
+    Checks that layouts too large for maze distances fall back to
+    Manhattan distances instead of computing them.
+    """
+
+    def test_fallback(self):
+        layout = generateMaze(15, 9, loops=0.3, numFood=5, seed=7)
+        with mock.patch.object(heuristics, 'MAZE_DISTANCE_MAX_ENTRIES', 0), \
+                mock.patch.object(layoutModule, 'DISTANCE_TABLE_MAX_CELLS',
+                                  0), \
+                mock.patch.object(type(layout), 'getDistanceRow',
+                                  side_effect=AssertionError):
+            for name in HEURISTICS:
+                self.assertFalse(HEURISTICS[name](layout).maze_distances)
+                self.assertAdmissibleAndConsistent(layout, name)
+        self.assertTrue(HEURISTICS["mst"](layout).maze_distances)
+
+    assertAdmissibleAndConsistent = \
+        HeuristicTest.assertAdmissibleAndConsistent
+
+
+if __name__ == '__main__':
+    unittest.main()
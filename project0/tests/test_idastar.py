@@ -0,0 +1,66 @@
+import unittest
+from argparse import Namespace
+from collections import OrderedDict
+from unittest import mock
+
+import numpy as np
+
+import idastar
+from helpers import (LAYOUTS, LayoutCacheTestCase, play, sampleLayouts,
+                     shortestSolution)
+from pacman_module.layout import getLayout
+from pacman_module.pacman import GameState
+
+
+class IDAStarTest(LayoutCacheTestCase):
+    """
+    Plays the IDA* agent, checking that its games are as short as
+    possible, within its memory bounds and expansion budget.
+    """
+
+    def tearDown(self):
+        GameState.setMaximumExpanded(np.inf)
+        GameState.resetNodeExpansionCounter()
+
+    def test_optimal_games(self):
+        for layout in sampleLayouts():
+            agent = idastar.PacmanAgent(Namespace())
+            state, actions, expanded = play(agent, layout)
+            self.assertTrue(state.isWin())
+            self.assertEqual(len(actions), shortestSolution(layout))
+            self.assertGreater(expanded[0], 0)
+            self.assertEqual(sum(expanded[1:]), 0)
+            self.assertEqual(agent.replans, 0)
+
+    def test_bounded_caches(self):
+        sizes = []
+
+        class BoundedDict(OrderedDict):
+            def __setitem__(self, key, value):
+                super().__setitem__(key, value)
+                sizes.append(len(self))
+
+        layout = getLayout(LAYOUTS[1])
+        with mock.patch.object(idastar, 'TRANSPOSITION_CACHE_SIZE', 20), \
+                mock.patch.object(idastar, 'OrderedDict', BoundedDict):
+            agent = idastar.PacmanAgent(Namespace())
+            state, actions, _ = play(agent, layout)
+        self.assertTrue(state.isWin())
+        self.assertEqual(len(actions), shortestSolution(layout))
+        # One entry over the size, evicted right away
+        self.assertEqual(max(sizes), 21)
+
+    def test_budget(self):
+        layout = getLayout(LAYOUTS[1])
+        GameState.setMaximumExpanded(10)
+        agent = idastar.PacmanAgent(Namespace())
+        state, _, expanded = play(agent, layout)
+        # Partial plans keep Pacman moving until all food is eaten
+        self.assertTrue(state.isWin())
+        self.assertLessEqual(max(expanded), 10)
+        self.assertEqual(expanded[0], 10)
+        self.assertEqual(agent.replans, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import copy
+import pickle
+import unittest
+
+from helpers import LayoutCacheTestCase
+from pacman_module.layout import Layout, getLayout
+from pacman_module.pacman import GameState
+
+LAYOUT = ("%%%%%%%",
+          "%P  .o%",
+          "% %%% %",
+          "%.  G %",
+          "%%%%%%%")
+
+
+class LayoutTest(LayoutCacheTestCase):
+    """
+    Checks that layouts are immutable and shared by everything built from
+    the same text.
+    """
+
+    def test_layouts_are_interned(self):
+        layout = Layout(LAYOUT)
+        self.assertIs(Layout(list(LAYOUT)), layout)
+        self.assertIsNot(Layout(LAYOUT[::-1]), layout)
+        self.assertIs(layout.deepCopy(), layout)
+        self.assertIs(copy.copy(layout), layout)
+        self.assertIs(copy.deepcopy(layout), layout)
+        self.assertIs(pickle.loads(pickle.dumps(layout)), layout)
+
+    def test_layouts_are_immutable(self):
+        layout = Layout(LAYOUT)
+
+        def assignWidth():
+            layout.width = 3
+
+        def assignFood():
+            layout.food[4][3] = False
+        self.assertRaises(AttributeError, assignWidth)
+        self.assertRaises(TypeError, assignFood)
+        self.assertEqual(layout.width, 7)
+        self.assertTrue(layout.food[4][3])
+
+    def test_content(self):
+        layout = Layout(LAYOUT)
+        self.assertEqual((layout.width, layout.height), (7, 5))
+        self.assertEqual(sorted(layout.food.asList()), [(1, 1), (4, 3)])
+        self.assertEqual(list(layout.capsules), [(5, 3)])
+        self.assertEqual(sorted(layout.agentPositions),
+                         [(0, (1, 3)), (1, (4, 1))])
+        self.assertEqual(layout.getNumGhosts(), 1)
+        self.assertTrue(layout.isWall((0, 0)))
+        self.assertFalse(layout.isWall((1, 1)))
+        self.assertEqual(str(layout), "\n".join(LAYOUT))
+
+    def test_states_share_the_layout(self):
+        layout = getLayout("small")
+        self.assertIs(getLayout("small"), layout)
+        state = GameState()
+        state.initialize(layout, 0)
+        successor = state.generateSuccessor(0, state.getLegalActions(0)[0])
+        for other in (successor, state.deepCopy(), state.snapshot(),
+                      successor.deepCopy()):
+            self.assertIs(other.data.layout, layout)
+
+    def test_derived_data_is_computed_once(self):
+        layout = Layout(LAYOUT)
+        calls = []
+
+        def factory(layout):
+            calls.append(layout)
+            return len(calls)
+        self.assertEqual(layout.getDerived('test', factory), 1)
+        self.assertEqual(layout.getDerived('test', factory), 1)
+        self.assertEqual(calls, [layout])
+        self.assertIs(layout.getWallArray(), layout.getWallArray())
+        self.assertFalse(layout.getWallArray().flags.writeable)
+
+
+if __name__ == '__main__':
+    unittest.main()
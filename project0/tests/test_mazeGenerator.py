@@ -0,0 +1,136 @@
+import os
+import random
+import tempfile
+import tracemalloc
+import unittest
+
+import numpy as np
+
+from helpers import LayoutCacheTestCase
+from pacman_module.layout import tryToLoad
+from pacman_module.mazeGenerator import MAZE_STYLES, generateMaze, sweep
+
+SIZES = ((3, 3), (4, 7), (10, 10), (31, 17), (40, 25))
+
+
+class MazeGeneratorTest(LayoutCacheTestCase):
+    """
+    Checks the size, connectivity and content of generated mazes.
+    """
+
+    def assertConnected(self, layout):
+        cells = set(layout.getFreeCells())
+        successors = layout.getMoveTable().successors
+        start = next(iter(cells))
+        seen = {start}
+        pending = [start]
+        while pending:
+            for _, cell in successors[pending.pop()]:
+                if cell not in seen:
+                    seen.add(cell)
+                    pending.append(cell)
+        self.assertEqual(seen, cells)
+
+    def test_mazes(self):
+        for style in MAZE_STYLES:
+            for width, height in SIZES:
+                for seed in range(3):
+                    layout = generateMaze(width, height, style, numFood=0,
+                                          numGhosts=0, seed=seed)
+                    context = (style, width, height, seed)
+                    self.assertEqual((layout.width, layout.height),
+                                     (width, height), context)
+                    walls = layout.getWallArray()
+                    self.assertTrue(walls[[0, -1], :].all(), context)
+                    self.assertTrue(walls[:, [0, -1]].all(), context)
+                    self.assertConnected(layout)
+
+    def test_content(self):
+        layout = generateMaze(21, 15, numFood=7, numCapsules=2,
+                              numGhosts=3, seed=0)
+        text = str(layout)
+        for char, count in (('P', 1), ('G', 3), ('o', 2), ('.', 7)):
+            self.assertEqual(text.count(char), count, char)
+        self.assertEqual(layout.getNumGhosts(), 3)
+        full = generateMaze(21, 15, numGhosts=0, seed=0)
+        self.assertEqual(full.food.count() + 1, len(full.getFreeCells()))
+
+    def test_perfect_mazes(self):
+        # Without loops, odd sized mazes are trees: one fewer corridor
+        # than cells
+        for width, height in ((5, 5), (21, 15), (41, 41)):
+            layout = generateMaze(width, height, seed=1)
+            successors = layout.getMoveTable().successors
+            edges = sum(len(s) for s in successors.values()) // 2
+            self.assertEqual(edges, len(layout.getFreeCells()) - 1)
+        looped = generateMaze(41, 41, loops=0.5, seed=1)
+        successors = looped.getMoveTable().successors
+        self.assertGreater(sum(len(s) for s in successors.values()) // 2,
+                           len(looped.getFreeCells()) - 1)
+
+    def test_seeds(self):
+        for style in MAZE_STYLES:
+            self.assertIs(generateMaze(30, 20, style, seed=5),
+                          generateMaze(30, 20, style, seed=5))
+        self.assertIsNot(generateMaze(30, 20, seed=5),
+                         generateMaze(30, 20, seed=6))
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'maze.lay')
+            layout = generateMaze(25, 12, 'cave', seed=2, path=path)
+            self.assertIs(tryToLoad(path), layout)
+
+    def test_errors(self):
+        self.assertRaises(Exception, generateMaze, 2, 10)
+        self.assertRaises(Exception, generateMaze, 10, 10, 'spiral')
+        self.assertRaises(Exception, generateMaze, 5, 5, numFood=100)
+
+
+class SweepTest(LayoutCacheTestCase):
+    """
+    Checks how sweep plays its games.
+    """
+
+    def test_sweep(self):
+        calls = []
+
+        def play(layout):
+            calls.append((layout, tracemalloc.is_tracing(),
+                          'moveTable' in layout._derived,
+                          random.random(), np.random.random()))
+            return 10, 0.5, len(calls)
+
+        rows = list(sweep((5, 9), play, numFood=3, seed=0))
+        self.assertEqual([row['size'] for row in rows], [5, 9])
+        self.assertEqual(len(calls), 4)
+        for row, timed, traced in zip(rows, calls[::2], calls[1::2]):
+            # The tables are built before the timed game, which runs
+            # without tracing, and is replayed with the same draws
+            self.assertEqual(timed[1:3], (False, True))
+            self.assertIs(traced[0], timed[0])
+            self.assertTrue(traced[1])
+            self.assertEqual(traced[3:], timed[3:])
+            self.assertEqual(row['food'], 3)
+            self.assertEqual(row['freeCells'],
+                             len(timed[0].getFreeCells()))
+            self.assertEqual((row['score'], row['computationTime']),
+                             (10, 0.5))
+            self.assertGreater(row['peakMemory'], 0)
+            self.assertGreaterEqual(row['wallTime'], 0)
+        self.assertEqual([row['expandedNodes'] for row in rows], [1, 3])
+
+    def test_sweep_without_memory(self):
+        calls = []
+
+        def play(layout):
+            calls.append(tracemalloc.is_tracing())
+            return 0, 0.0, 0
+
+        rows = list(sweep((5, 7), play, memory=False, seed=0))
+        self.assertEqual(calls, [False, False])
+        self.assertEqual([row['peakMemory'] for row in rows], [None, None])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+from helpers import LayoutCacheTestCase
+from pacman_module.game import Actions, Configuration, Directions
+from pacman_module.layout import getLayout
+from pacman_module.pacman import GameState, PacmanRules
+
+LAYOUTS = ("small", "medium", "large")
+HEADINGS = (Directions.NORTH, Directions.SOUTH, Directions.EAST,
+            Directions.WEST, Directions.STOP)
+
+
+class MoveTableTest(LayoutCacheTestCase):
+    """
+    Compares the precomputed move tables with the moves Actions computes
+    from the walls.
+    """
+
+    def test_tables_match_actions(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            table = layout.getMoveTable()
+            self.assertIs(layout.getMoveTable(), table)
+            walls = layout.walls
+            for x in range(layout.width):
+                for y in range(layout.height):
+                    cell = (x, y)
+                    if walls[x][y]:
+                        self.assertNotIn(cell, table.legalActions)
+                        continue
+                    legal = Actions.getPossibleActions(
+                        Configuration(cell, Directions.STOP), walls)
+                    self.assertEqual(list(table.legalActions[cell]), legal)
+                    self.assertEqual(
+                        [next for _, next in table.successors[cell]],
+                        [next for next in
+                         Actions.getLegalNeighbors(cell, walls)
+                         if next != cell])
+                    for action, next in table.successors[cell]:
+                        self.assertEqual(
+                            Actions.getSuccessor(cell, action), next)
+                    for i, (direction, _) in enumerate(
+                            Actions._directionsAsList):
+                        self.assertEqual(
+                            (table.neighborMask[cell] >> i) & 1 == 1,
+                            direction in legal)
+
+    def test_ghost_actions(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            table = layout.getMoveTable()
+            for cell, legal in table.legalActions.items():
+                moves = [a for a in legal if a != Directions.STOP]
+                for heading in HEADINGS:
+                    expected = list(moves)
+                    reverse = Actions.reverseDirection(heading)
+                    if reverse in expected and len(expected) > 1:
+                        expected.remove(reverse)
+                    self.assertEqual(list(table.ghostActions[cell, heading]),
+                                     expected, (name, cell, heading))
+
+    def test_pacman_rules_use_table(self):
+        layout = getLayout(LAYOUTS[0])
+        state = GameState()
+        state.initialize(layout, 0)
+        configuration = state.getPacmanState().configuration
+        self.assertEqual(
+            PacmanRules.getLegalActions(state),
+            Actions.getPossibleActions(configuration, layout.walls))
+        # Between cells, the rules fall back to Actions
+        x, y = configuration.pos
+        state.data.agentStates[0].configuration = Configuration(
+            (x + 0.5, y), Directions.EAST)
+        self.assertEqual(PacmanRules.getLegalActions(state),
+                         [Directions.EAST])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import gc
+import multiprocessing
+import unittest
+from argparse import Namespace
+from unittest import mock
+
+import numpy as np
+
+import portfolio
+from helpers import (LAYOUTS, LayoutCacheTestCase, newProblem, play,
+                     shortestSolution)
+from pacman_module.layout import getLayout
+from pacman_module.pacman import GameState
+
+
+def runStrategy(layout, algorithm, maxExpanded=float('inf')):
+    return portfolio.run_strategy(
+        layout, layout.pacPos, layout.food.getBits(), algorithm, "mst", 2.0,
+        maxExpanded, None)
+
+
+class StrategyTest(LayoutCacheTestCase):
+    """
+    Runs the strategies of the portfolio in this process.
+    """
+
+    def test_strategies(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            for algorithm in portfolio.DEFAULT_STRATEGIES:
+                actions, complete, expanded, exhausted = runStrategy(
+                    layout, algorithm)
+                problem = newProblem(layout)
+                self.assertTrue(complete, (name, algorithm))
+                self.assertTrue(portfolio.reaches_goal(problem, actions))
+                self.assertGreater(expanded, 0)
+                self.assertFalse(exhausted)
+                if algorithm == "astar":
+                    self.assertEqual(len(actions), shortestSolution(layout))
+
+    def test_budget(self):
+        layout = getLayout(LAYOUTS[1])
+        for algorithm in portfolio.DEFAULT_STRATEGIES:
+            actions, complete, expanded, exhausted = runStrategy(
+                layout, algorithm, 5)
+            self.assertFalse(complete, algorithm)
+            self.assertGreater(len(actions), 0, algorithm)
+            self.assertEqual(expanded, 5, algorithm)
+            self.assertTrue(exhausted, algorithm)
+
+    def test_cancel(self):
+        cancel = multiprocessing.Event()
+        cancel.set()
+        with mock.patch.object(portfolio, '_cancel', cancel):
+            actions, complete, expanded, exhausted = runStrategy(
+                getLayout(LAYOUTS[1]), "astar")
+        self.assertFalse(complete)
+        self.assertEqual(expanded, 0)
+        self.assertTrue(exhausted)
+
+
+class PortfolioAgentTest(LayoutCacheTestCase):
+    """
+    Plays the portfolio agent, its strategies running in worker
+    processes.
+    """
+
+    def tearDown(self):
+        GameState.setMaximumExpanded(np.inf)
+        GameState.resetNodeExpansionCounter()
+
+    def newAgent(self, **kwargs):
+        agent = portfolio.PacmanAgent(Namespace(**kwargs))
+        self.addCleanup(lambda: agent.executor and agent.executor.shutdown())
+        return agent
+
+    def test_optimal_games(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            agent = self.newAgent()
+            state, actions, expanded = play(agent, layout)
+            self.assertTrue(state.isWin(), name)
+            self.assertEqual(len(actions), shortestSolution(layout), name)
+            # Every expansion of every strategy is credited
+            self.assertEqual(sum(agent.expanded.values()), sum(expanded))
+            self.assertEqual(sum(agent.wins.values()), 1)
+            self.assertEqual(agent.replans, 0)
+
+    def test_budget(self):
+        layout = getLayout(LAYOUTS[1])
+        GameState.setMaximumExpanded(30)
+        agent = self.newAgent()
+        state, _, expanded = play(agent, layout)
+        # Partial plans keep Pacman moving until all food is eaten
+        self.assertTrue(state.isWin())
+        self.assertLessEqual(max(expanded), 30)
+        self.assertEqual(agent.replans, 0)
+
+    def test_strategies(self):
+        layout = getLayout(LAYOUTS[1])
+        agent = self.newAgent(strategies=["dfs"], tolerance=10.0)
+        state, _, _ = play(agent, layout)
+        self.assertTrue(state.isWin())
+        self.assertEqual(list(agent.wins), ["dfs"])
+        self.assertGreater(agent.wins["dfs"], 0)
+
+    def test_shutdown(self):
+        agent = portfolio.PacmanAgent(Namespace())
+        agent.start_workers()
+        executor, cancel = agent.executor, agent.cancel
+        layout = getLayout(LAYOUTS[0])
+        future = executor.submit(
+            portfolio.run_strategy, layout, layout.pacPos,
+            layout.food.getBits(), "dfs", "mst", 2.0, float('inf'), None)
+        agent.futures.add(future)
+        del agent
+        gc.collect()
+        # The pool refuses new work and stops what it had
+        self.assertTrue(cancel.is_set())
+        self.assertRaises(RuntimeError, executor.submit, print)
+        self.assertTrue(future.cancelled() or future.result()[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
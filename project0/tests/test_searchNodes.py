@@ -0,0 +1,163 @@
+import unittest
+from argparse import Namespace
+import numpy as np
+
+import astar
+import bfs
+import dfs
+import dfs_sol
+from fastsearch import key
+from helpers import (LAYOUTS, LayoutCacheTestCase, newGame, play,
+                     shortestSolution)
+from pacman_module.game import Directions
+from pacman_module.layout import Layout, getLayout
+from pacman_module.pacman import GameState
+from pacman_module.searchNodes import ACTIONS, NodeStore, Plan
+
+AGENTS = (bfs, astar, dfs, dfs_sol)
+# Food at each end of a corridor
+CORRIDOR = ("%%%%%%%",
+            "%. P .%",
+            "%%%%%%%")
+
+
+class NodeStoreTest(LayoutCacheTestCase):
+    """
+    Checks the paths rebuilt from the parent pointers of a NodeStore.
+    """
+
+    def test_paths(self):
+        nodes = NodeStore()
+        root = nodes.addRoot()
+        self.assertEqual(nodes.getPath(root), [])
+        self.assertIsNone(nodes.getFirstAction(root))
+        branches = {}
+        for first in ACTIONS:
+            node = nodes.add(root, first)
+            for action in ACTIONS:
+                branches[nodes.add(node, action)] = [first, action]
+        self.assertEqual(len(nodes), 1 + len(ACTIONS) * (1 + len(ACTIONS)))
+        for node, path in branches.items():
+            self.assertEqual(nodes.getPath(node), path)
+            self.assertEqual(nodes.getFirstAction(node), path[0])
+
+    def test_improve(self):
+        nodes = NodeStore()
+        root = nodes.improve('start', -1, None, 0)
+        first = nodes.improve('goal', root, Directions.EAST, 5)
+        self.assertIsNone(nodes.improve('goal', root, Directions.WEST, 5))
+        self.assertIsNone(nodes.improve('goal', root, Directions.WEST, 6))
+        self.assertFalse(nodes.isStale('goal', first))
+        second = nodes.improve('goal', root, Directions.NORTH, 3)
+        self.assertEqual(nodes.costs[second], 3)
+        self.assertTrue(nodes.isStale('goal', first))
+        self.assertFalse(nodes.isStale('goal', second))
+        self.assertFalse(nodes.isStale('start', root))
+        self.assertEqual(nodes.getPath(second), [Directions.NORTH])
+
+
+class SearchAgentTest(LayoutCacheTestCase):
+    """
+    Plays the search agents on the layouts, checking that they win, that
+    breadth-first search and A* do so in as few moves as possible, and
+    that their expansions are credited within the budget.
+    """
+
+    def tearDown(self):
+        GameState.setMaximumExpanded(np.inf)
+        GameState.resetNodeExpansionCounter()
+
+    def test_agents_win(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            shortest = shortestSolution(layout)
+            for module in AGENTS:
+                agent = module.PacmanAgent(Namespace())
+                state, actions, expanded = play(agent, layout)
+                context = (name, module.__name__)
+                self.assertTrue(state.isWin(), context)
+                # The first search plans the whole game
+                self.assertGreater(expanded[0], 0, context)
+                self.assertEqual(sum(expanded[1:]), 0, context)
+                if module in (bfs, astar):
+                    self.assertEqual(len(actions), shortest, context)
+
+    def test_budget(self):
+        layout = getLayout(LAYOUTS[1])
+        GameState.setMaximumExpanded(5)
+        for module in (bfs, astar):
+            agent = module.PacmanAgent(Namespace())
+            start = newGame(layout)
+            GameState.resetNodeExpansionCounter()
+            self.assertNotEqual(agent.get_action(start.snapshot()),
+                                Directions.STOP, module.__name__)
+            self.assertTrue(agent.budget_exhausted, module.__name__)
+            # Partial plans keep Pacman moving until all food is eaten
+            state, _, expanded = play(module.PacmanAgent(Namespace()),
+                                      layout)
+            self.assertTrue(state.isWin(), module.__name__)
+            self.assertLessEqual(max(expanded), 5, module.__name__)
+        for module in (dfs, dfs_sol):
+            agent = module.PacmanAgent(Namespace())
+            state = newGame(layout)
+            GameState.resetNodeExpansionCounter()
+            self.assertEqual(agent.get_action(state.snapshot()),
+                             Directions.STOP, module.__name__)
+            self.assertEqual(GameState.countExpanded, 5, module.__name__)
+
+
+class PlanTest(LayoutCacheTestCase):
+    """
+    Checks how plans are replayed, and when the agents replan.
+    """
+
+    def test_replay(self):
+        state = newGame(Layout(CORRIDOR))
+        actions = [Directions.WEST, Directions.WEST, Directions.EAST]
+        plan = Plan(state, actions, key)
+        for action in actions:
+            self.assertFalse(plan.isOver())
+            self.assertEqual(plan.getAction(state), action)
+            state = state.generateSuccessor(0, action)
+        self.assertTrue(plan.isOver())
+        self.assertIsNone(plan.getAction(state))
+
+    def test_plans_end_at_terminal_states(self):
+        state = newGame(Layout(CORRIDOR))
+        actions = [Directions.WEST] * 2 + [Directions.EAST] * 4 + \
+            [Directions.WEST] * 2
+        plan = Plan(state, actions, key)
+        self.assertEqual(plan.actions, actions[:6])
+
+    def test_divergence(self):
+        state = newGame(Layout(CORRIDOR))
+        plan = Plan(state, [Directions.WEST, Directions.WEST], key)
+        east = state.generateSuccessor(0, Directions.EAST)
+        self.assertIsNone(plan.getAction(east))
+        self.assertFalse(plan.isOver())
+        self.assertEqual(plan.getAction(state), Directions.WEST)
+
+    def test_replans(self):
+        layout = getLayout(LAYOUTS[1])
+        agent = bfs.PacmanAgent(Namespace())
+        state = newGame(layout)
+        action = agent.get_action(state.snapshot())
+        other = [a for a in state.getLegalPacmanActions()
+                 if a not in (action, Directions.STOP)][0]
+        agent.get_action(state.generateSuccessor(0, other).snapshot())
+        self.assertEqual(agent.replans, 1)
+
+    def test_partial_plans_are_not_replans(self):
+        GameState.setMaximumExpanded(5)
+        try:
+            for module in (bfs, astar):
+                agent = module.PacmanAgent(Namespace())
+                state, _, _ = play(agent, getLayout(LAYOUTS[1]))
+                self.assertTrue(state.isWin(), module.__name__)
+                self.assertEqual(agent.replans, 0, module.__name__)
+        finally:
+            GameState.setMaximumExpanded(np.inf)
+
+
+if __name__ == '__main__':
+    unittest.main()
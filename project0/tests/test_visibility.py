@@ -0,0 +1,92 @@
+import unittest
+
+import numpy as np
+
+from helpers import LayoutCacheTestCase
+from pacman_module.game import Actions, Directions
+from pacman_module.layout import (VISIBILITY_DIRECTIONS,
+                                  VISIBILITY_MATRIX_CACHE, Layout,
+                                  computeVisibility, getLayout)
+
+LAYOUTS = ("small", "medium", "large")
+SIZES = ((1, 1), (5, 3), (12, 9), (30, 17))
+
+
+def bruteForceRun(walls, x, y, direction):
+    """
+    Counts the free cells seen from (x, y) towards direction by walking
+    the ray cell by cell.
+    """
+    width, height = walls.shape
+    dx, dy = Actions._directions[direction]
+    run = 0
+    x, y = x + dx, y + dy
+    while 0 <= x < width and 0 <= y < height and not walls[x, y]:
+        run += 1
+        x, y = x + dx, y + dy
+    return run
+
+
+class VisibilityTest(LayoutCacheTestCase):
+    """
+    Compares the line-of-sight index with rays walked cell by cell.
+    """
+
+    def assertRunsMatch(self, walls):
+        runs = computeVisibility(walls)
+        width, height = walls.shape
+        self.assertEqual(runs.shape, (width, height, 4))
+        for x in range(width):
+            for y in range(height):
+                for i, direction in enumerate(VISIBILITY_DIRECTIONS):
+                    expected = 0 if walls[x, y] else \
+                        bruteForceRun(walls, x, y, direction)
+                    self.assertEqual(runs[x, y, i], expected,
+                                     (x, y, direction))
+
+    def test_random_walls(self):
+        rng = np.random.default_rng(0)
+        for width, height in SIZES:
+            for density in (0.0, 0.2, 0.5, 1.0):
+                self.assertRunsMatch(rng.random((width, height)) < density)
+
+    def test_layouts(self):
+        for name in LAYOUTS:
+            self.assertRunsMatch(getLayout(name).getWallArray())
+
+    def test_is_visible_from(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            walls = layout.getWallArray()
+            cells = layout.getFreeCells()
+            for pacman in cells:
+                for direction in VISIBILITY_DIRECTIONS:
+                    run = bruteForceRun(walls, pacman[0], pacman[1],
+                                        direction)
+                    dx, dy = Actions._directions[direction]
+                    visible = set((pacman[0] + k * dx, pacman[1] + k * dy)
+                                  for k in range(1, run + 1))
+                    for ghost in cells:
+                        self.assertEqual(
+                            layout.isVisibleFrom(ghost, pacman, direction),
+                            ghost in visible, (name, pacman, ghost))
+                self.assertFalse(layout.isVisibleFrom(
+                    cells[0], pacman, Directions.STOP))
+        self.assertIn(layout.contentHash, VISIBILITY_MATRIX_CACHE)
+
+    def test_ghosts_between_cells(self):
+        layout = Layout(("%%%%%%",
+                         "%P  %%",
+                         "%%%%%%"))
+        self.assertTrue(layout.isVisibleFrom((2.5, 1), (1, 1),
+                                             Directions.EAST))
+        self.assertTrue(layout.isVisibleFrom((3.5, 1), (1, 1),
+                                             Directions.EAST))
+        self.assertFalse(layout.isVisibleFrom((4, 1), (1, 1),
+                                              Directions.EAST))
+        self.assertFalse(layout.isVisibleFrom((2.5, 1), (1, 1),
+                                              Directions.WEST))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import numpy as np
+
+
+def held_karp(start_distances, distances):
+    """
+    Solves the open travelling salesman problem exactly by dynamic
+    programming over subsets, in O(2^n n^2) time and O(2^n n) memory.
+
+    Arguments:
+    ----------
+    - `start_distances`: length-n array of the distances from the start
+      to each of the n points to visit.
+    - `distances`: n x n array of the distances between the points.
+
+    Return:
+    -------
+    - The cost of the shortest path leaving the start and visiting every
+      point once (inf if there is none), and the list of point indices
+      in the order of that path.
+    """
+    start_distances = np.asarray(start_distances, dtype=float)
+    distances = np.asarray(distances, dtype=float)
+    n = len(start_distances)
+    if n == 0:
+        return 0, []
+    points = np.arange(n)
+    bits = 1 << points
+    # cost[mask, j]: shortest path from the start through the points of
+    # mask, ending at point j of mask
+    cost = np.full((1 << n, n), np.inf)
+    parent = np.full((1 << n, n), -1, dtype=int)
+    cost[bits, points] = start_distances
+    # Row j of cost[previous] + distances.T adds distances[k, j] to the
+    # cost of ending at k before going to j
+    to_point = distances.T
+    for mask in range(1, 1 << n):
+        members = (mask & bits) != 0
+        if members.sum() < 2:
+            continue
+        previous = mask ^ bits[members]
+        totals = cost[previous] + to_point[members]
+        best = totals.argmin(axis=1)
+        cost[mask, members] = totals[np.arange(len(best)), best]
+        parent[mask, members] = best
+
+    full = (1 << n) - 1
+    last = int(cost[full].argmin())
+    total = cost[full, last]
+    order = []
+    mask = full
+    while last >= 0:
+        order.append(last)
+        mask, last = mask ^ (1 << last), parent[mask, last]
+    order.reverse()
+    return total, order
+
+
+def held_karp_states(n):
+    """
+    Returns the number of (subset, last point) states `held_karp` solves
+    for n points.
+    """
+    return n << (n - 1) if n > 0 else 0
+
+
+def shortest_path(layout, start, goal):
+    """
+    Returns a list of moves (`game.Directions`) along a shortest path
+    from cell `start` to cell `goal` of `layout`, following the maze
+    distances to `goal` (see `layout.Layout.getDistanceRow`).
+    """
+    indices = layout.getCellIndices()
+    successors = layout.getMoveTable().successors
+    to_goal = layout.getDistanceRow(indices[goal])
+    remaining = to_goal[indices[start]]
+    if remaining < 0:
+        raise Exception("No path from %s to %s" % (start, goal))
+    moves = []
+    cell = start
+    while cell != goal:
+        for action, next_cell in successors[cell]:
+            if to_goal[indices[next_cell]] == remaining - 1:
+                break
+        moves.append(action)
+        cell = next_cell
+        remaining -= 1
+    return moves
+
+
+def food_tour(layout, start, food):
+    """
+    Returns a shortest list of moves from cell `start` eating every cell
+    of `food`, found by `held_karp` over the maze distances of `layout`,
+    which are only computed from the food cells.
+    """
+    indices = layout.getCellIndices()
+    targets = [indices[f] for f in food]
+    rows = [layout.getDistanceRow(t) for t in targets]
+    between = np.array([row[targets] for row in rows],
+                       dtype=float).reshape(len(targets), len(targets))
+    between[between < 0] = np.inf
+    from_start = np.array([row[indices[start]] for row in rows], dtype=float)
+    from_start[from_start < 0] = np.inf
+    total, order = held_karp(from_start, between)
+    if total == np.inf:
+        raise Exception("Some food cannot be reached from %s" % (start,))
+    moves = []
+    cell = start
+    for i in order:
+        moves += shortest_path(layout, cell, food[i])
+        cell = food[i]
+    return moves
@@ -20,10 +20,13 @@ class PacmanAgent(Agent):
         if not legal:
             return Directions.STOP
 
+        # Observations are read-only: search on a private copy
+        state = state.deepCopy()
         scores = []
         for action in legal:
-            successor = state.generateSuccessor(0, action)
-            score, _ = self.minimax(successor, 1, 1)
+            state.apply(0, action)
+            score, _ = self.minimax(state, 1, 1)
+            state.undo()
             scores.append(score)
 
         best_score = max(scores)
@@ -53,8 +56,9 @@ class PacmanAgent(Agent):
             max_score = float("-inf")
             best_action = None
             for action in legal_moves:
-                successor = state.generateSuccessor(agent_index, action)
-                score, _ = self.minimax(successor, next_agent, next_depth)
+                state.apply(agent_index, action)
+                score, _ = self.minimax(state, next_agent, next_depth)
+                state.undo()
                 if score > max_score:
                     max_score = score
                     best_action = action
@@ -64,8 +68,9 @@ class PacmanAgent(Agent):
         min_score = float("inf")
         worst_action = None
         for action in legal_moves:
-            successor = state.generateSuccessor(agent_index, action)
-            score, _ = self.minimax(successor, next_agent, next_depth)
+            state.apply(agent_index, action)
+            score, _ = self.minimax(state, next_agent, next_depth)
+            state.undo()
             if score < min_score:
                 min_score = score
                 worst_action = action
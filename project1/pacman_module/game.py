@@ -23,6 +23,7 @@
 from .util import *
 import time
 import os
+import random
 import traceback
 import sys
 import pacman_module as pacmodule
@@ -91,6 +92,8 @@ class Configuration:
     horizontally and y increases vertically.  Therefore, north is the direction of increasing y, or (0,1).
     """
 
+    __slots__ = ('pos', 'direction', 'visible')
+
     def __init__(self, pos, direction, visible=True):
         self.pos = pos
         self.direction = direction
@@ -138,11 +141,34 @@ class Configuration:
         return Configuration((x + dx, y + dy), direction, self.visible)
 
 
+def _readOnly(self, *args):
+    raise AttributeError("'%s' object is read-only" % type(self).__name__)
+
+
+class ReadOnlyConfiguration(Configuration):
+    """
+    A copy of a Configuration whose attributes cannot be assigned.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, configuration):
+        object.__setattr__(self, 'pos', configuration.pos)
+        object.__setattr__(self, 'direction', configuration.direction)
+        object.__setattr__(self, 'visible', configuration.visible)
+
+    __setattr__ = _readOnly
+    __delattr__ = _readOnly
+
+
 class AgentState:
     """
     AgentStates hold the state of an agent (configuration, speed, scared, etc).
     """
 
+    __slots__ = ('start', 'configuration', 'agtType', 'isPacman',
+                 'scaredTimer', 'numCarrying', 'numReturned')
+
     def __init__(self, startConfiguration, agtType):
         self.start = startConfiguration
         self.configuration = startConfiguration
@@ -151,7 +177,6 @@ class AgentState:
         self.scaredTimer = 0
         self.numCarrying = 0
         self.numReturned = 0
-        
 
     def __str__(self):
         if self.isPacman:
@@ -189,6 +214,25 @@ class AgentState:
         return self.configuration.isVisible()
 
 
+class ReadOnlyAgentState(AgentState):
+    """
+    A copy of an AgentState whose attributes cannot be assigned. Its
+    copy() is an ordinary AgentState.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, agentState):
+        for name in AgentState.__slots__:
+            value = getattr(agentState, name)
+            if isinstance(value, Configuration):
+                value = ReadOnlyConfiguration(value)
+            object.__setattr__(self, name, value)
+
+    __setattr__ = _readOnly
+    __delattr__ = _readOnly
+
+
 class Grid:
     """
     A 2-dimensional array of objects backed by a list of lists.  Data is accessed
@@ -324,6 +368,190 @@ def reconstituteGrid(bitRep):
     width, height = bitRep[:2]
     return Grid(width, height, bitRepresentation=bitRep[2:])
 
+
+class BitGrid(Grid):
+    """
+    A boolean Grid backed by a single Python int bitmask, where cell (x, y)
+    is bit x * height + y. Data is still accessed via grid[x][y].
+
+    Copies share the (immutable) bitmask, so copying is O(1), and the hash,
+    count and asList results are cached until the grid is modified. Hashes
+    and equality are consistent with the list-backed Grid.
+    """
+
+    def __init__(self, width, height, initialValue=False, bits=None):
+        if initialValue not in [False, True]:
+            raise Exception('Grids can only contain booleans')
+        # Only used by the packBits inherited from Grid
+        self.CELLS_PER_INT = 30
+
+        self.width = width
+        self.height = height
+        if bits is None:
+            bits = (1 << (width * height)) - 1 if initialValue else 0
+        self._bits = bits
+        self._columns = None
+        self._hash = None
+        self._count = None
+        self._list = None
+
+    @classmethod
+    def fromGrid(cls, grid):
+        """
+        Builds a BitGrid with the same content as any boolean grid.
+        """
+        bits = 0
+        for x in range(grid.width):
+            for y in range(grid.height):
+                if grid[x][y]:
+                    bits |= 1 << (x * grid.height + y)
+        return cls(grid.width, grid.height, bits=bits)
+
+    def getBits(self):
+        return self._bits
+
+    def _setBit(self, x, y, value):
+        mask = 1 << (x * self.height + y)
+        if value:
+            bits = self._bits | mask
+        else:
+            bits = self._bits & ~mask
+        if bits != self._bits:
+            self._bits = bits
+            self._hash = None
+            self._count = None
+            self._list = None
+
+    def __getitem__(self, x):
+        if x < 0:
+            x += self.width
+        if not 0 <= x < self.width:
+            raise IndexError('BitGrid column index out of range')
+        if self._columns is None:
+            self._columns = [None] * self.width
+        column = self._columns[x]
+        if column is None:
+            column = self._columns[x] = _BitGridColumn(self, x)
+        return column
+
+    def __setitem__(self, x, column):
+        for y, value in enumerate(column):
+            self._setBit(x, y, value)
+
+    @property
+    def data(self):
+        """
+        A read-only snapshot of the content, as a tuple of columns: the
+        grid is modified with grid[x][y] = value.
+        """
+        return tuple(tuple(self[x][y] for y in range(self.height))
+                     for x in range(self.width))
+
+    def __str__(self):
+        out = [[str(self[x][y])[0] for x in range(self.width)]
+               for y in range(self.height)]
+        out.reverse()
+        return '\n'.join([''.join(x) for x in out])
+
+    def __eq__(self, other):
+        if other is None:
+            return False
+        if isinstance(other, BitGrid):
+            return (self._bits == other._bits and
+                    self.width == other.width and
+                    self.height == other.height)
+        return [list(column) for column in self.data] == other.data
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self._bits)
+        return self._hash
+
+    def copy(self):
+        g = BitGrid(self.width, self.height, bits=self._bits)
+        g._hash = self._hash
+        g._count = self._count
+        g._list = self._list
+        return g
+
+    def deepCopy(self):
+        return self.copy()
+
+    def shallowCopy(self):
+        return self.copy()
+
+    def count(self, item=True):
+        if self._count is None:
+            self._count = bin(self._bits).count('1')
+        if item:
+            return self._count
+        return self.width * self.height - self._count
+
+    def asList(self, key=True):
+        if not key:
+            full = (1 << (self.width * self.height)) - 1
+            return self._bitsToList(full & ~self._bits)
+        if self._list is None:
+            self._list = tuple(self._bitsToList(self._bits))
+        return list(self._list)
+
+    def _bitsToList(self, bits):
+        list = []
+        while bits:
+            lowest = bits & -bits
+            index = lowest.bit_length() - 1
+            list.append((index // self.height, index % self.height))
+            bits ^= lowest
+        return list
+
+
+class ReadOnlyBitGrid(BitGrid):
+    """
+    A BitGrid which cannot be modified. It shares the bitmask (and the
+    cached results) of the grid it is built from, and its copies are
+    ordinary BitGrids.
+    """
+
+    def __init__(self, grid):
+        BitGrid.__init__(self, grid.width, grid.height, bits=grid.getBits())
+        self._hash = grid._hash
+        self._count = grid._count
+        self._list = grid._list
+
+    def _setBit(self, x, y, value):
+        raise TypeError("'ReadOnlyBitGrid' object does not support item "
+                        "assignment")
+
+
+class _BitGridColumn:
+    """
+    A view on column x of a BitGrid, so that grid[x][y] keeps working.
+    """
+
+    def __init__(self, grid, x):
+        self._grid = grid
+        self._x = x
+        self._offset = x * grid.height
+
+    def __len__(self):
+        return self._grid.height
+
+    def __getitem__(self, y):
+        height = self._grid.height
+        if y < 0:
+            y += height
+        if not 0 <= y < height:
+            raise IndexError('BitGrid row index out of range')
+        return (self._grid._bits >> (self._offset + y)) & 1 == 1
+
+    def __setitem__(self, y, value):
+        height = self._grid.height
+        if y < 0:
+            y += height
+        if not 0 <= y < height:
+            raise IndexError('BitGrid row index out of range')
+        self._grid._setBit(self._x, y, value)
+
 ####################################
 # Parts you shouldn't have to read #
 ####################################
@@ -418,26 +646,121 @@ class Actions:
     getSuccessor = staticmethod(getSuccessor)
 
 
+class AgentStateView:
+    """
+    A read-only sequence of the agent states found at fixed indices of an
+    agent state list. It follows the list, so it can be cached and reused
+    while the agent states are replaced.
+    """
+
+    __slots__ = ('_agentStates', '_indices')
+
+    def __init__(self, agentStates, indices):
+        self._agentStates = agentStates
+        self._indices = indices
+
+    def __len__(self):
+        return len(self._indices)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._agentStates[j] for j in self._indices[i]]
+        return self._agentStates[self._indices[i]]
+
+    def __iter__(self):
+        agentStates = self._agentStates
+        for j in self._indices:
+            yield agentStates[j]
+
+
+ZOBRIST_TABLE_CACHE = {}
+
+
+def getZobristTable(width, height):
+    """
+    Returns the Zobrist table shared by all states on a board of this size.
+    """
+    if (width, height) not in ZOBRIST_TABLE_CACHE:
+        ZOBRIST_TABLE_CACHE[(width, height)] = ZobristTable(width, height)
+    return ZOBRIST_TABLE_CACHE[(width, height)]
+
+
+class ZobristTable:
+    """
+    Random 64-bit keys for the features of a game state (food bits,
+    capsules, pacman cell, ghost cell/direction/scared flag).
+
+    The key of a state is the XOR of the keys of its features, so it can be
+    updated in O(1) when a single feature changes. Keys are drawn lazily
+    from a private generator, which leaves the global random state alone.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self._random = random.Random(width * 65536 + height)
+        self._keys = {}
+
+    def key(self, feature):
+        k = self._keys.get(feature)
+        if k is None:
+            k = self._keys[feature] = self._random.getrandbits(64)
+        return k
+
+    def foodKey(self, x, y):
+        return self.key(x * self.height + y)
+
+    def capsuleKey(self, position):
+        return self.key(('capsule', position))
+
+    def agentKey(self, index, agentState):
+        if agentState.isPacman:
+            return self.key((0, agentState.configuration.pos))
+        if agentState.agtType == -1:
+            return 0
+        configuration = agentState.configuration
+        return self.key((index, configuration.pos, configuration.direction,
+                         agentState.scaredTimer > 0))
+
+
 class GameStateData:
     """
+    Agent states are shared with the predecessor and copied on write: the
+    rules must call `_ownAgentState` before modifying an agent state.
 
+    `variant` holds the rule variant of the game (see pacman.py), chosen
+    once when the game starts and shared by every successor.
     """
 
+    __slots__ = ('food', 'capsules', 'agentStates', 'layout', 'beliefStates',
+                 'score', 'scoreChange', '_eaten', '_foodEaten', '_foodAdded',
+                 '_capsuleEaten', '_agentMoved', '_lose', '_win',
+                 '_ownedAgents', '_ghostIndices', '_ghostStates',
+                 '_zobrist', '_zobristTable', 'variant')
+
     def __init__(self, prevState=None):
         """
         Generates a new data packet by copying information from its predecessor.
         """
+        self.beliefStates = None
+        self.variant = None
+        self._ownedAgents = 0
+        self._ghostStates = None
         if prevState is not None:
+            self.variant = prevState.variant
             self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
-            self.agentStates = self.copyAgentStates(prevState.agentStates)
+            self.capsules = list(prevState.capsules)
+            self.agentStates = list(prevState.agentStates)
+            if prevState._ownedAgents:
+                prevState._ownedAgents = 0
             self.layout = prevState.layout
-            self._eaten = prevState._eaten
+            self._eaten = list(prevState._eaten)
             self.score = prevState.score
-            try:
+            self._ghostIndices = prevState._ghostIndices
+            self._zobrist = prevState._zobrist
+            self._zobristTable = prevState._zobristTable
+            if prevState.beliefStates is not None:
                 self.beliefStates = np.copy(prevState.beliefStates)
-            except:
-                pass
 
         self._foodEaten = None
         self._foodAdded = None
@@ -450,17 +773,42 @@ class GameStateData:
     def deepCopy(self):
         state = GameStateData(self)
         state.food = self.food.deepCopy()
-        state.layout = self.layout.deepCopy()
+        state.agentStates = self.copyAgentStates(self.agentStates)
+        state._ownedAgents = (1 << len(state.agentStates)) - 1
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
         state._foodAdded = self._foodAdded
         state._capsuleEaten = self._capsuleEaten
-        try:
-            state.beliefStates = np.copy(self.beliefStates)
-        except:
-            pass
         return state
 
+    def snapshot(self, previous=None):
+        """
+        Returns a read-only copy of this state (see ReadOnlyGameStateData),
+        reusing the agent state wrappers of the previous snapshot for the
+        agent states which are still the same objects.
+        """
+        if self._ownedAgents:
+            # The snapshot shares the agent states: from now on, they are
+            # copied before being modified
+            self._ownedAgents = 0
+        return ReadOnlyGameStateData(self, previous)
+
+    def _ownAgentState(self, index):
+        """
+        Returns the agent state at index, first copying it if it is shared
+        with another state.
+        """
+        if not (self._ownedAgents >> index) & 1:
+            self.agentStates[index] = self.agentStates[index].copy()
+            self._ownedAgents |= 1 << index
+        return self.agentStates[index]
+
+    def getGhostStates(self):
+        if self._ghostStates is None:
+            self._ghostStates = AgentStateView(
+                self.agentStates, self._ghostIndices)
+        return self._ghostStates
+
     def copyAgentStates(self, agentStates):
         copiedStates = []
         for agentState in agentStates:
@@ -474,11 +822,14 @@ class GameStateData:
         if other is None:
             return False
         # TODO Check for type of other
-        if not self.agentStates == other.agentStates:
+        if self._zobrist != other._zobrist:
+            return False
+        # Snapshots hold tuples where ordinary states hold lists
+        if not tuple(self.agentStates) == tuple(other.agentStates):
             return False
         if not self.food == other.food:
             return False
-        if not self.capsules == other.capsules:
+        if not tuple(self.capsules) == tuple(other.capsules):
             return False
         if not self.score == other.score:
             return False
@@ -488,27 +839,25 @@ class GameStateData:
         """
         Allows states to be keys of dictionaries.
         """
-        for i, state in enumerate(self.agentStates):
-            try:
-                int(hash(state))
-            except TypeError as e:
-                print(e)
-                # hash(state)
-        return int(
-            (hash(
-                tuple(
-                    self.agentStates)) +
-                13 *
-                hash(
-                self.food) +
-                113 *
-                hash(
-                tuple(
-                    self.capsules)) +
-                7 *
-                hash(
-                self.score)) %
-            1048575)
+        return self._zobrist
+
+    def agentZobrist(self, index):
+        """
+        Returns the Zobrist key of the features of one agent.
+        """
+        return self._zobristTable.agentKey(index, self.agentStates[index])
+
+    def _initializeZobrist(self):
+        table = getZobristTable(self.layout.width, self.layout.height)
+        key = 0
+        for x, y in self.food.asList():
+            key ^= table.foodKey(x, y)
+        for position in self.capsules:
+            key ^= table.capsuleKey(position)
+        for index, agentState in enumerate(self.agentStates):
+            key ^= table.agentKey(index, agentState)
+        self._zobristTable = table
+        self._zobrist = key
 
     def __str__(self):
         width, height = self.layout.width, self.layout.height
@@ -564,19 +913,36 @@ class GameStateData:
             return '3'
         return 'E'
 
-    def initialize(self, layout, numGhostAgents, isGhostVisible=True, beliefStateAgent=None):
+    def initialize(
+            self,
+            layout,
+            numGhostAgents,
+            isGhostVisible=True,
+            beliefStateAgent=None,
+            rng=None):
         """
         Creates an initial game state from a layout array (see layout.py).
+
+        With a beliefStateAgent, ghosts start at random free cells: drawn
+        at once by layout.sampleFreeCells from the numpy Generator rng if
+        given, by the rejection sampling of getRandomLegalGhostPosition
+        otherwise, which seeded games have always relied on.
         """
 
         self.food = layout.food.copy()
         #self.capsules = []
-        self.capsules = layout.capsules[:]
+        self.capsules = list(layout.capsules)
         self.layout = layout
+        self.beliefStates = None
         self.score = 0
         self.scoreChange = 0
 
         self.agentStates = []
+        ghostStarts = None
+        if beliefStateAgent is not None and rng is not None:
+            ghostStarts = iter(layout.sampleFreeCells(
+                min(numGhostAgents, layout.getNumGhosts()),
+                [layout.pacPos], rng))
         numGhosts = 0
         for agtType, pos in layout.agentPositions:
             isPacman = agtType == 0 
@@ -587,7 +953,9 @@ class GameStateData:
                     numGhosts += 1
                     #If ghost is not visible, it is Project Part III
                     #Here we choose a random initial location
-                    if beliefStateAgent is not None:
+                    if ghostStarts is not None:
+                        pos = next(ghostStarts)
+                    elif beliefStateAgent is not None:
                         pos = layout.getRandomLegalGhostPosition()
             agt = AgentState(
                     Configuration(
@@ -608,6 +976,12 @@ class GameStateData:
                              -1)
             self.agentStates.append(agtState)
             self.beliefStates = [np.copy(uniformBelief) for _ in range(numGhosts)]
+        self._ownedAgents = (1 << len(self.agentStates)) - 1
+        self._ghostIndices = tuple(
+            i for i, agentState in enumerate(self.agentStates)
+            if i > 0 and agentState.agtType == 1)
+        self._ghostStates = None
+        self._initializeZobrist()
 
 
 try:
@@ -617,6 +991,57 @@ except BaseException:
     _BOINC_ENABLED = False
 
 
+class ReadOnlyGameStateData(GameStateData):
+    """
+    A snapshot of a GameStateData handed to agents as their observation.
+
+    It shares the layout, the food bitmask and the belief states of the
+    original, and holds read-only views of the agent states. Assigning
+    to it, to its agent states or to its food raises an exception instead
+    of corrupting the game.
+
+    Successors of a snapshot are writable GameStateData, but they share
+    the read-only views of the agents which did not move: like any shared
+    agent state, a view is only replaced by a writable copy when the
+    rules modify it (see GameStateData._ownAgentState). Deep copies hold
+    writable copies of every agent state.
+
+    Shared agent states are never modified (they are copied first), so
+    the view of an agent state found in the previous snapshot is reused:
+    only the agents which moved since get a new one.
+    """
+
+    __slots__ = ('_sources',)
+
+    def __init__(self, data, previous=None):
+        for name in GameStateData.__slots__:
+            object.__setattr__(self, name, getattr(data, name))
+        sources = tuple(data.agentStates)
+        agentStates = []
+        for i, agentState in enumerate(sources):
+            if (previous is not None and i < len(previous._sources) and
+                    previous._sources[i] is agentState):
+                agentStates.append(previous.agentStates[i])
+            else:
+                agentStates.append(ReadOnlyAgentState(agentState))
+        agentStates = tuple(agentStates)
+        object.__setattr__(self, '_sources', sources)
+        object.__setattr__(self, 'agentStates', agentStates)
+        object.__setattr__(self, '_ownedAgents', 0)
+        object.__setattr__(self, '_ghostStates', AgentStateView(
+            agentStates, data._ghostIndices))
+        object.__setattr__(self, 'food', ReadOnlyBitGrid(data.food))
+        object.__setattr__(self, 'capsules', tuple(data.capsules))
+        object.__setattr__(self, '_eaten', tuple(data._eaten))
+        if data.beliefStates is not None:
+            beliefStates = np.asarray(data.beliefStates).view()
+            beliefStates.flags.writeable = False
+            object.__setattr__(self, 'beliefStates', beliefStates)
+
+    __setattr__ = _readOnly
+    __delattr__ = _readOnly
+
+
 class Game:
     """
     The Game manages the control flow, soliciting actions from agents.
@@ -695,13 +1120,14 @@ class Game:
         totalExpandedNodes = 0
         if (expout > 0):
             pacmodule.pacman.GameState.setMaximumExpanded(expout)
+        observation = None
         while not self.gameOver:
             # Fetch the next agent
             agent = self.agents[agentIndex]
             move_time = 0
             skip_action = False
             # Generate an observation of the state
-            observation = self.state.deepCopy()
+            observation = self.state.snapshot(observation)
             # Solicit an action
             action = None
             self.mute(agentIndex)
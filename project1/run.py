@@ -3,7 +3,13 @@ import importlib
 import numpy as np
 import random
 
-from pacman_module.pacman import runGame
+from pacman_module.pacman import runGame, GameState, EXPLORED_MODES
+from pacman_module.mazeGenerator import (
+    MAZE_STYLES,
+    SWEEP_NUM_FOOD,
+    sweep,
+    printSweep,
+)
 from pacman_module.ghostAgents import (
     DumbyGhost,
     GreedyGhost,
@@ -59,24 +65,105 @@ if __name__ == '__main__':
         help='Seed for random number generator.',
     )
 
+    parser.add_argument(
+        '--explored',
+        choices=EXPLORED_MODES,
+        default='off',
+        help='Tracking of the states explored by the agents: '
+             'off, count only, or a bounded sample of recent states.',
+    )
+
+    parser.add_argument(
+        '--sweep',
+        type=int,
+        nargs='+',
+        default=None,
+        help='Play on generated square mazes of the given sizes instead, '
+             'reporting time, expanded nodes and peak memory per size.',
+    )
+
+    parser.add_argument(
+        '--nomemory',
+        action='store_true',
+        help='Skip the second, memory-traced game of each --sweep size.',
+    )
+
+    parser.add_argument(
+        '--mazestyle',
+        choices=MAZE_STYLES,
+        default='maze',
+        help='Style of the mazes generated for --sweep.',
+    )
+
+    parser.add_argument(
+        '--walldensity',
+        type=float,
+        default=0.3,
+        help='Probability of an inner wall in generated cave mazes.',
+    )
+
+    parser.add_argument(
+        '--loops',
+        type=float,
+        default=0.0,
+        help='Fraction of the inner walls removed from generated mazes.',
+    )
+
+    parser.add_argument(
+        '--nfood',
+        type=int,
+        default=SWEEP_NUM_FOOD,
+        help='Number of food dots in generated mazes.',
+    )
+
+    parser.add_argument(
+        '--ncapsules',
+        type=int,
+        default=0,
+        help='Number of capsules in generated mazes.',
+    )
+
     args = parser.parse_args()
 
-    if args.agent == 'humanagent' and args.nographics:
+    if args.agent == 'humanagent' and (args.nographics or args.sweep):
         raise ValueError("Human agent cannot play without graphics")
 
     random.seed(args.seed)
     np.random.seed(args.seed)
 
-    score, time, nodes = runGame(
-        layout_name=args.layout,
-        pacman=importlib.import_module(args.agent).PacmanAgent(),
-        ghosts=[GHOSTS[args.ghost](1)],
-        beliefstateagent=None,
-        displayGraphics=not args.nographics,
-        expout=0.0,
-        hiddenGhosts=False,
-    )
+    if args.sweep is not None:
+        def play(layout):
+            return runGame(
+                layout_name=layout,
+                pacman=importlib.import_module(args.agent).PacmanAgent(),
+                ghosts=[GHOSTS[args.ghost](1)],
+                beliefstateagent=None,
+                displayGraphics=False,
+                expout=0.0,
+            )
+
+        with GameState.trackExplored(args.explored):
+            printSweep(sweep(
+                args.sweep, play, memory=not args.nomemory,
+                style=args.mazestyle,
+                wallDensity=args.walldensity, loops=args.loops,
+                numFood=args.nfood, numCapsules=args.ncapsules,
+                numGhosts=1, seed=args.seed))
+        raise SystemExit
+
+    with GameState.trackExplored(args.explored):
+        score, time, nodes = runGame(
+            layout_name=args.layout,
+            pacman=importlib.import_module(args.agent).PacmanAgent(),
+            ghosts=[GHOSTS[args.ghost](1)],
+            beliefstateagent=None,
+            displayGraphics=not args.nographics,
+            expout=0.0,
+            hiddenGhosts=False,
+        )
 
     print(f"Score: {score}")
     print(f"Computation time: {time}")
     print(f"Expanded nodes: {nodes}")
+    if args.explored != 'off':
+        print(f"Explored states: {GameState.getExploredCount()}")
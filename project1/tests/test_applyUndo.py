@@ -0,0 +1,102 @@
+import random
+import unittest
+
+from helpers import LayoutCacheTestCase
+from pacman_module.layout import getLayout
+from pacman_module.pacman import GameState
+
+LAYOUTS = ("small_adv", "medium_adv", "large_adv")
+PLAYOUTS = 4
+MAX_TURNS = 200
+
+
+class ApplyUndoTest(LayoutCacheTestCase):
+    """
+    Plays random games, checking at every turn that apply gives the state
+    generateSuccessor returns for every legal action, and that undo
+    restores the original state.
+    """
+
+    def assertSameState(self, state, expected, context):
+        self.assertEqual(state, expected, context)
+        self.assertEqual(hash(state), hash(expected), context)
+        self.assertEqual(state.getScore(), expected.getScore(), context)
+        self.assertEqual(state.isWin(), expected.isWin(), context)
+        self.assertEqual(state.isLose(), expected.isLose(), context)
+        self.assertEqual(state.getFood(), expected.getFood(), context)
+        self.assertEqual(state.getCapsules(), expected.getCapsules(),
+                         context)
+        for i in range(expected.getNumAgents()):
+            agentState = state.data.agentStates[i]
+            expectedState = expected.data.agentStates[i]
+            self.assertEqual(agentState.configuration,
+                             expectedState.configuration, context)
+            self.assertEqual(agentState.scaredTimer,
+                             expectedState.scaredTimer, context)
+
+    def test_apply_matches_generate_successor(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            rng = random.Random(name)
+            for playout in range(PLAYOUTS):
+                state = GameState()
+                state.initialize(layout, layout.getNumGhosts())
+                numAgents = state.getNumAgents()
+                for turn in range(MAX_TURNS):
+                    if state.isWin() or state.isLose():
+                        break
+                    agent = turn % numAgents
+                    before = state.deepCopy()
+                    for action in state.getLegalActions(agent):
+                        context = "%s, playout %d, turn %d, %s" % (
+                            name, playout, turn, action)
+                        successor = state.generateSuccessor(agent, action)
+                        state.apply(agent, action)
+                        self.assertSameState(state, successor, context)
+                        state.undo()
+                        self.assertSameState(state, before, context)
+                    action = rng.choice(state.getLegalActions(agent))
+                    state = state.generateSuccessor(agent, action)
+
+    def test_undo_reverts_a_whole_game(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            rng = random.Random(name)
+            start = GameState()
+            start.initialize(layout, layout.getNumGhosts())
+            numAgents = start.getNumAgents()
+            state = start.deepCopy()
+            history = [state.deepCopy()]
+            for turn in range(MAX_TURNS):
+                if state.isWin() or state.isLose():
+                    break
+                agent = turn % numAgents
+                state.apply(agent, rng.choice(state.getLegalActions(agent)))
+                history.append(state.deepCopy())
+            history.pop()
+            while history:
+                state.undo()
+                self.assertSameState(state, history.pop(), name)
+            self.assertRaises(Exception, state.undo)
+
+    def test_apply_leaves_previous_results_untouched(self):
+        layout = getLayout(LAYOUTS[0])
+        state = GameState()
+        state.initialize(layout, 0)
+        food = state.getFood()
+        capsules = state.getCapsules()
+        expectedFood = food.copy()
+        expectedCapsules = list(capsules)
+        rng = random.Random(0)
+        for turn in range(MAX_TURNS):
+            if state.isWin() or state.isLose():
+                break
+            agent = turn % state.getNumAgents()
+            state.apply(agent, rng.choice(state.getLegalActions(agent)))
+        self.assertNotEqual(state.getFood(), expectedFood)
+        self.assertEqual(food, expectedFood)
+        self.assertEqual(capsules, expectedCapsules)
+
+
+if __name__ == '__main__':
+    unittest.main()
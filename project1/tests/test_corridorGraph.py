@@ -0,0 +1,96 @@
+import unittest
+
+from helpers import LayoutCacheTestCase
+from pacman_module.game import Actions
+from pacman_module.layout import CorridorGraph, Layout, getLayout
+from pacman_module.mazeGenerator import generateMaze
+
+LAYOUTS = ("small_adv", "medium_adv", "large_adv")
+# A loop without any junction, next to a dead end
+LOOP = ("%%%%%%%",
+        "%   %P%",
+        "% % % %",
+        "%   % %",
+        "%%%%%%%")
+
+
+def sampleLayouts():
+    layouts = [getLayout(name) for name in LAYOUTS]
+    layouts.append(Layout(LOOP))
+    for seed in range(3):
+        layouts.append(generateMaze(15, 11, loops=0.2, numFood=4,
+                                    numCapsules=1, seed=seed))
+        layouts.append(generateMaze(12, 9, 'cave', numFood=3, seed=seed))
+    return layouts
+
+
+class CorridorGraphTest(LayoutCacheTestCase):
+    """
+    Checks the structure of corridor graphs, and their distances against
+    the maze distances of the grid.
+    """
+
+    def assertGraphCoversMaze(self, layout):
+        graph = layout.getCorridorGraph()
+        successors = layout.getMoveTable().successors
+        keyCells = set(layout.food.asList()) | set(layout.capsules)
+        for cell in layout.getFreeCells():
+            if len(successors[cell]) != 2 or cell in keyCells:
+                self.assertIn(cell, graph.nodeIndex)
+            if cell in graph.nodeIndex:
+                self.assertIsNone(graph.getCorridor(cell))
+                continue
+            corridor, offset = graph.getCorridor(cell)
+            self.assertEqual(graph.corridors[corridor][2][offset], cell)
+        self.assertEqual(list(graph.nodes), sorted(
+            graph.nodeIndex, key=graph.nodeIndex.get))
+        moves = 0
+        for index, (start, end, cells) in enumerate(graph.corridors):
+            self.assertIn(start, graph.nodeIndex)
+            self.assertIn(end, graph.nodeIndex)
+            for cell in cells[1:-1]:
+                self.assertNotIn(cell, graph.nodeIndex)
+            for cell, next in zip(cells, cells[1:]):
+                self.assertIn(next, [c for _, c in successors[cell]])
+            length = len(cells) - 1
+            direction = Actions.vectorToDirection(
+                (cells[1][0] - start[0], cells[1][1] - start[1]))
+            self.assertIn((index, end, length, direction),
+                          graph.edges[start])
+            back = Actions.vectorToDirection(
+                (cells[-2][0] - end[0], cells[-2][1] - end[1]))
+            self.assertIn((index, start, length, back), graph.edges[end])
+            moves += length
+        # Every move between two cells is in exactly one corridor
+        self.assertEqual(
+            moves, sum(len(s) for s in successors.values()) // 2)
+
+    def test_structure(self):
+        for layout in sampleLayouts():
+            self.assertGraphCoversMaze(layout)
+
+    def test_distances(self):
+        for layout in sampleLayouts():
+            graph = layout.getCorridorGraph()
+            cells = layout.getFreeCells()
+            for a in cells[::3]:
+                for b in cells:
+                    self.assertEqual(graph.distance(a, b),
+                                     layout.mazeDistance(a, b), (a, b))
+
+    def test_compression(self):
+        layout = generateMaze(41, 41, seed=0, numFood=5)
+        graph = layout.getCorridorGraph()
+        self.assertLess(len(graph.nodes) * 2, len(layout.getFreeCells()))
+        self.assertIs(layout.getCorridorGraph(), graph)
+
+    def test_key_cells(self):
+        layout = Layout(LOOP)
+        graph = CorridorGraph(layout.getMoveTable(), [(2, 3)])
+        self.assertIn((2, 3), graph.nodeIndex)
+        self.assertEqual(len(graph.nodes), 3)
+        self.assertEqual(graph.distance((1, 1), (5, 1)), float('inf'))
+
+
+if __name__ == '__main__':
+    unittest.main()
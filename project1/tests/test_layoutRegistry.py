@@ -0,0 +1,109 @@
+import gc
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pacman_module import layout as layoutModule
+from pacman_module.layout import Layout, LayoutRegistry, getLayout
+
+LAYOUT = ("%%%%%%%",
+          "%P  .o%",
+          "% %%% %",
+          "%.  G %",
+          "%%%%%%%")
+
+
+class LayoutRegistryTest(unittest.TestCase):
+    """
+    Checks how the registry finds, loads and compiles layout files.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.layouts = os.path.join(self.directory.name, 'layouts')
+        self.cache = os.path.join(self.directory.name, 'cache')
+        os.mkdir(self.layouts)
+        self.write('test.lay', LAYOUT)
+        patcher = mock.patch.object(layoutModule, 'CACHE_DIRECTORY',
+                                    self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+
+    def write(self, name, text):
+        with open(os.path.join(self.layouts, name), 'w') as f:
+            f.write('\n'.join(text) + '\n')
+
+    def test_names(self):
+        registry = LayoutRegistry([self.layouts])
+        path = os.path.join(self.layouts, 'test.lay')
+        self.assertEqual(registry.resolve('test'), path)
+        self.assertEqual(registry.resolve('test.lay'), path)
+        self.assertIsNone(registry.resolve('missing'))
+        self.assertIsNone(registry.getLayout('missing'))
+        layout = registry.getLayout('test')
+        self.assertIs(layout, Layout(LAYOUT))
+        self.assertIs(registry.getLayout('test.lay'), layout)
+        # Bare names do not depend on the working directory
+        os.chdir(self.directory.name)
+        self.assertIsNone(registry.resolve('layouts'))
+        self.assertEqual(registry.resolve('test'), path)
+
+    def test_paths(self):
+        registry = LayoutRegistry([])
+        path = os.path.join(self.layouts, 'test.lay')
+        self.assertEqual(registry.resolve(path), path)
+        self.assertEqual(registry.resolve(path[:-len('.lay')]), path)
+        os.chdir(self.directory.name)
+        self.assertEqual(registry.resolve(os.path.join('layouts', 'test')),
+                         os.path.realpath(path))
+        self.assertIsNone(registry.resolve('test'))
+
+    def test_shipped_layouts(self):
+        self.assertIsNotNone(getLayout('small_adv'))
+        os.chdir(self.directory.name)
+        self.assertIs(getLayout('small_adv'),
+                      layoutModule.LAYOUT_REGISTRY.load(
+                          os.path.join(layoutModule.LAYOUT_DIRECTORY,
+                                       'small_adv.lay')))
+
+    def test_files_are_read_once(self):
+        registry = LayoutRegistry([self.layouts])
+        with mock.patch.object(layoutModule, 'open', create=True,
+                               wraps=open) as opened:
+            layout = registry.getLayout('test')
+            for name in ('test', 'test.lay',
+                         os.path.join(self.layouts, 'test.lay')):
+                self.assertIs(registry.getLayout(name), layout)
+        self.assertEqual(opened.call_count, 2)  # The text and its copy
+
+    def test_compiled_copies(self):
+        text = LAYOUT[:1] + ("%P   o%",) + LAYOUT[2:]
+        self.write('compiled.lay', text)
+        registry = LayoutRegistry([self.layouts])
+        layout = registry.getLayout('compiled')
+        expected = (str(layout), layout.food, layout.capsules,
+                    layout.agentPositions, layout.numGhosts)
+        compiled = os.path.join(self.cache, layout.contentHash + '.layc')
+        self.assertTrue(os.path.isfile(compiled))
+        # Nothing is written next to the layout files
+        self.assertEqual(sorted(os.listdir(self.layouts)),
+                         ['compiled.lay', 'test.lay'])
+        contentHash = layout.contentHash
+        del layout, registry
+        gc.collect()
+        self.assertNotIn(contentHash, layoutModule.LAYOUT_CACHE)
+        # A new process would rebuild the layout from the compiled copy
+        with mock.patch.object(Layout, 'processLayoutText',
+                               side_effect=AssertionError):
+            layout = LayoutRegistry([self.layouts]).getLayout('compiled')
+        self.assertEqual((str(layout), layout.food, layout.capsules,
+                          layout.agentPositions, layout.numGhosts),
+                         expected)
+        self.assertEqual(layout.pacPos, (1, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
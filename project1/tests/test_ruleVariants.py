@@ -0,0 +1,72 @@
+import unittest
+
+from pacman_module.game import Directions
+from pacman_module.layout import Layout
+from pacman_module.pacman import (BeliefStateRules, ClassicChaseRules,
+                                  ClassicGameRules, GameState)
+
+LAYOUT = ("%%%%%%%%%",
+          "%Po G   %",
+          "% %%%%% %",
+          "%       %",
+          "%%%%%%%%%")
+
+
+class RuleVariantTest(unittest.TestCase):
+    """
+    Checks that the rule variant chosen when the game starts is carried by
+    every successor and decides how ghosts move.
+    """
+
+    def newState(self, variant=None):
+        state = GameState()
+        state.initialize(Layout(LAYOUT), 1, variant=variant)
+        return state
+
+    def test_variant_selection(self):
+        self.assertIs(ClassicGameRules.getVariant(None), ClassicChaseRules)
+        self.assertIs(ClassicGameRules.getVariant(object()),
+                      BeliefStateRules)
+        self.assertIs(self.newState().data.variant, ClassicChaseRules)
+
+    def test_successors_share_the_variant(self):
+        for variant in (ClassicChaseRules, BeliefStateRules):
+            state = self.newState(variant)
+            for agent in (0, 1, 0, 1):
+                state = state.generateSuccessor(
+                    agent, state.getLegalActions(agent)[0])
+                self.assertIs(state.data.variant, variant)
+            self.assertIs(state.deepCopy().data.variant, variant)
+            self.assertIs(state.snapshot().data.variant, variant)
+
+    def test_classic_ghosts_do_not_turn_around(self):
+        state = self.newState(ClassicChaseRules)
+        self.assertEqual(state.getLegalActions(1),
+                         [Directions.EAST, Directions.WEST])
+        state = state.generateSuccessor(1, Directions.EAST)
+        self.assertEqual(state.getLegalActions(1), [Directions.EAST])
+
+    def test_belief_state_ghosts_turn_around(self):
+        state = self.newState(BeliefStateRules)
+        state = state.generateSuccessor(1, Directions.EAST)
+        self.assertEqual(state.getLegalActions(1),
+                         [Directions.EAST, Directions.WEST])
+
+    def test_scared_ghosts_slow_down_and_respawn(self):
+        state = self.newState(ClassicChaseRules)
+        state = state.generateSuccessor(0, Directions.EAST)
+        self.assertTrue(state.getGhostState(1).scaredTimer > 0)
+        state = state.generateSuccessor(1, Directions.WEST)
+        self.assertEqual(state.getGhostPosition(1), (3.5, 3))
+        state = state.generateSuccessor(0, Directions.STOP)
+        state = state.generateSuccessor(1, Directions.WEST)
+        score = state.getScore()
+        state = state.generateSuccessor(0, Directions.EAST)
+        self.assertEqual(state.getGhostPosition(1), (4, 3))
+        self.assertEqual(state.getGhostState(1).scaredTimer, 0)
+        self.assertEqual(state.getScore(), score + 200 - 1)
+        self.assertFalse(state.isWin() or state.isLose())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,90 +12,678 @@
 # Pieter Abbeel (pabbeel@cs.berkeley.edu).
 
 
-from .util import manhattanDistance
-from .game import Grid
+from .util import manhattanDistance, nearestPoint
+from .game import BitGrid, ReadOnlyBitGrid, Directions, Actions
 import os
 import random
-from functools import reduce
+import hashlib
+import heapq
+import weakref
+from collections import OrderedDict
+import numpy as np
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import shortest_path
+    _SCIPY_ENABLED = True
+except ImportError:
+    _SCIPY_ENABLED = False
 
 VISIBILITY_MATRIX_CACHE = {}
+LAYOUT_CACHE = weakref.WeakValueDictionary()
+LAYOUT_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'layouts')
+# Where per-layout tables are stored between runs, by content hash
+CACHE_DIRECTORY = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or
+    os.path.join(os.path.expanduser('~'), '.cache'), 'pacman')
+# Content hashes of the layouts loaded from files, the only ones whose
+# tables are worth storing between runs
+FILE_LAYOUT_HASHES = set()
+# Largest distance table stored in CACHE_DIRECTORY
+DISTANCE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# Largest layout, in free cells, whose distance table is built: the
+# table grows with the square of the cell count, and takes about a
+# second per two million entries without scipy. Larger layouts compute
+# their distances one source cell at a time (see Layout.getDistanceRow).
+DISTANCE_TABLE_MAX_CELLS = 10000 if _SCIPY_ENABLED else 2000
+# Memory of the rows computed on demand kept by a layout without a table
+DISTANCE_ROWS_MAX_BYTES = 64 * 1024 * 1024
+# Number of table entries computed at once by scipy
+DISTANCE_BLOCK_SIZE = 1 << 22
+
+
+def bitGridToArray(grid):
+    """
+    Returns the content of a BitGrid as a (width, height) boolean array,
+    unpacking its bitmask at once rather than cell by cell.
+    """
+    size = grid.width * grid.height
+    bits = np.frombuffer(grid.getBits().to_bytes((size + 7) // 8, 'little'),
+                         dtype=np.uint8)
+    return np.unpackbits(bits, count=size, bitorder='little').reshape(
+        grid.width, grid.height).astype(bool)
+
+
+def getContentHash(layoutText):
+    """
+    Returns a hash of a layout text which is stable across processes.
+    """
+    return hashlib.sha1('\n'.join(layoutText).encode()).hexdigest()
+
+
+class MoveTable:
+    """
+    The legal moves of every free cell of a layout, computed once.
+
+    For a cell (x, y):
+      neighborMask[cell] has bit i set when the i-th direction of
+        Actions._directionsAsList is not blocked by a wall;
+      legalActions[cell] is what Actions.getPossibleActions returns there
+        (same order, STOP included);
+      successors[cell] lists the (action, nextCell) pairs of real moves.
+    ghostActions[cell, direction] holds the classic ghost moves of an
+    agent heading in direction: no STOP, and no turning around unless
+    the cell is a dead end.
+    """
+
+    def __init__(self, walls):
+        """
+        walls is the (width, height) boolean array of the walls.
+        """
+        self.neighborMask = {}
+        self.legalActions = {}
+        self.successors = {}
+        self.ghostActions = {}
+        width, height = walls.shape
+        walls = walls.tolist()
+        directions = [d for d, _ in Actions._directionsAsList]
+        for x in range(width):
+            for y in range(height):
+                if walls[x][y]:
+                    continue
+                cell = (x, y)
+                mask = 0
+                legal = []
+                successors = []
+                for i, (direction, (dx, dy)) in enumerate(
+                        Actions._directionsAsList):
+                    nx, ny = x + dx, y + dy
+                    if nx < 0 or nx >= width or ny < 0 or ny >= height \
+                            or walls[nx][ny]:
+                        continue
+                    mask |= 1 << i
+                    legal.append(direction)
+                    if direction != Directions.STOP:
+                        successors.append((direction, (nx, ny)))
+                self.neighborMask[cell] = mask
+                self.legalActions[cell] = tuple(legal)
+                self.successors[cell] = tuple(successors)
+                moves = [a for a, _ in successors]
+                for heading in directions:
+                    reverse = Directions.REVERSE[heading]
+                    if reverse in moves and len(moves) > 1:
+                        actions = tuple(a for a in moves if a != reverse)
+                    else:
+                        actions = tuple(moves)
+                    self.ghostActions[cell, heading] = actions
+
+
+class CorridorGraph:
+    """
+    The maze of a layout compressed into a graph whose nodes are the
+    junctions, dead ends and cells listed in keyCells (typically food and
+    capsules), and whose edges are the corridors of cells with exactly
+    two exits running between them.
+
+      nodes is the tuple of node cells, nodeIndex maps them to indices;
+      corridors[i] is the (start, end, cells) of corridor i, cells being
+        its path from node start to node end, both included, so that its
+        length is len(cells) - 1;
+      edges[node] lists the (corridor, otherEnd, length, direction)
+        leaving node, direction being the first move along the corridor;
+      location[cell] is the (corridor, offset) of every cell which is not
+        a node, offset being its distance from the start of the corridor.
+
+    A loop without any junction gets one of its cells as a node.
+    """
+
+    def __init__(self, moveTable, keyCells=()):
+        successors = moveTable.successors
+        keyCells = set(keyCells)
+        nodes = [cell for cell in sorted(successors)
+                 if len(successors[cell]) != 2 or cell in keyCells]
+        self.nodeIndex = {}
+        self.corridors = []
+        self.edges = {}
+        self.location = {}
+        walked = set()
+        pending = set(successors)
+        while True:
+            for node in nodes[len(self.nodeIndex):]:
+                self.nodeIndex[node] = len(self.nodeIndex)
+                self.edges[node] = []
+                pending.discard(node)
+            for node in nodes:
+                for direction, cell in successors[node]:
+                    if (node, cell) not in walked:
+                        self._walk(successors, node, direction, cell, walked,
+                                   pending)
+            if not pending:
+                break
+            # Only loops of corridor cells are left
+            nodes.append(min(pending))
+        self.nodes = tuple(nodes)
+        self.corridors = tuple(self.corridors)
+        self.edges = dict((node, tuple(edges))
+                          for node, edges in self.edges.items())
+
+    def _walk(self, successors, start, direction, cell, walked, pending):
+        index = len(self.corridors)
+        cells = [start, cell]
+        while cell not in self.nodeIndex:
+            self.location[cell] = (index, len(cells) - 1)
+            pending.discard(cell)
+            previous = cells[-2]
+            cell = [c for _, c in successors[cell] if c != previous][0]
+            cells.append(cell)
+        walked.add((start, cells[1]))
+        walked.add((cell, cells[-2]))
+        length = len(cells) - 1
+        back = Actions.vectorToDirection(
+            (cells[-2][0] - cell[0], cells[-2][1] - cell[1]))
+        self.corridors.append((start, cell, tuple(cells)))
+        self.edges[start].append((index, cell, length, direction))
+        self.edges[cell].append((index, start, length, back))
+
+    def getCorridor(self, cell):
+        """
+        Returns the (corridor, offset) of a cell which is not a node, or
+        None for nodes.
+        """
+        return self.location.get(cell)
+
+    def _anchors(self, cell):
+        """
+        Returns the (node, distance) pairs through which paths from cell
+        enter the graph.
+        """
+        if cell in self.nodeIndex:
+            return [(cell, 0)]
+        corridor, offset = self.location[cell]
+        start, end, cells = self.corridors[corridor]
+        return [(start, offset), (end, len(cells) - 1 - offset)]
+
+    def distance(self, a, b):
+        """
+        Returns the maze distance between free cells a and b, searching
+        the graph rather than the grid.
+        """
+        best = float('inf')
+        locationA, locationB = self.location.get(a), self.location.get(b)
+        if a == b:
+            return 0
+        if locationA is not None and locationB is not None and \
+                locationA[0] == locationB[0]:
+            best = abs(locationA[1] - locationB[1])
+        targets = {}
+        for node, cost in self._anchors(b):
+            targets[node] = min(cost, targets.get(node, cost))
+        frontier = [(cost, node) for node, cost in self._anchors(a)]
+        heapq.heapify(frontier)
+        done = set()
+        while frontier and frontier[0][0] < best:
+            cost, node = heapq.heappop(frontier)
+            if node in done:
+                continue
+            done.add(node)
+            if node in targets:
+                best = min(best, cost + targets[node])
+            for _, other, length, _ in self.edges[node]:
+                if other not in done:
+                    heapq.heappush(frontier, (cost + length, other))
+        return best
+
+
+VISIBILITY_DIRECTIONS = (Directions.NORTH, Directions.SOUTH,
+                         Directions.EAST, Directions.WEST)
+VISIBILITY_INDEX = dict((d, i) for i, d in enumerate(VISIBILITY_DIRECTIONS))
+
+
+def computeVisibility(walls):
+    """
+    Returns the (width, height, 4) array of line-of-sight runs of a
+    (width, height) wall array: entry [x, y, i] of a free cell is the
+    number of free cells seen from (x, y) towards VISIBILITY_DIRECTIONS[i]
+    before the next wall.
+    """
+    width, height = walls.shape
+    xs = np.arange(width)[:, None]
+    ys = np.arange(height)[None, :]
+    # Index of the nearest wall on each side of every cell
+    east = np.minimum.accumulate(
+        np.where(walls, xs, width)[::-1], axis=0)[::-1]
+    west = np.maximum.accumulate(np.where(walls, xs, -1), axis=0)
+    north = np.minimum.accumulate(
+        np.where(walls, ys, height)[:, ::-1], axis=1)[:, ::-1]
+    south = np.maximum.accumulate(np.where(walls, ys, -1), axis=1)
+    runs = np.stack([north - ys - 1, ys - south - 1,
+                     east - xs - 1, xs - west - 1], axis=-1)
+    runs[walls] = 0
+    runs = runs.astype(np.int16)
+    runs.flags.writeable = False
+    return runs
+
+
+class DistanceTableTooLarge(Exception):
+    """
+    Raised when a layout has more free cells than DISTANCE_TABLE_MAX_CELLS
+    and thus gets no distance table.
+    """
+
+
+def getNeighborIndices(layout):
+    """
+    Returns, for each free cell of the layout, the list of the indices
+    of the free cells one move away.
+    """
+    indices = layout.getCellIndices()
+    successors = layout.getMoveTable().successors
+    return [[indices[next] for _, next in successors[cell]]
+            for cell in layout.getFreeCells()]
+
+
+def computeDistanceRow(layout, source):
+    """
+    Runs a breadth-first search from the free cell of index source and
+    returns the read-only int32 array of its maze distances to every free
+    cell, with -1 for the cells which are not connected to it.
+    """
+    neighbors = layout.getDerived('neighborIndices', getNeighborIndices)
+    row = [-1] * len(neighbors)
+    row[source] = 0
+    frontier = [source]
+    distance = 0
+    while frontier:
+        distance += 1
+        nextFrontier = []
+        for i in frontier:
+            for j in neighbors[i]:
+                if row[j] < 0:
+                    row[j] = distance
+                    nextFrontier.append(j)
+        frontier = nextFrontier
+    row = np.array(row, dtype=np.int32)
+    row.flags.writeable = False
+    return row
+
+
+def computeDistanceTable(layout):
+    """
+    Runs a breadth-first search from every free cell of the layout and
+    returns the int16 matrix of maze distances between free cells, with
+    -1 for pairs which are not connected. The searches run in scipy when
+    it is installed, and in Python otherwise. Raises DistanceTableTooLarge
+    beyond DISTANCE_TABLE_MAX_CELLS free cells.
+    """
+    n = len(layout.getFreeCells())
+    if n > DISTANCE_TABLE_MAX_CELLS:
+        raise DistanceTableTooLarge(
+            "Layout too large for a distance table: %d cells" % n)
+    distances = np.empty((n, n), dtype=np.int16)
+    if _SCIPY_ENABLED:
+        neighbors = layout.getDerived('neighborIndices', getNeighborIndices)
+        sources = [i for i in range(n) for _ in neighbors[i]]
+        targets = [j for row in neighbors for j in row]
+        graph = csr_matrix((np.ones(len(sources), dtype=np.int8),
+                            (sources, targets)), shape=(n, n))
+        step = max(1, DISTANCE_BLOCK_SIZE // n)
+        for first in range(0, n, step):
+            rows = np.arange(first, min(n, first + step))
+            block = shortest_path(graph, unweighted=True, indices=rows)
+            block[np.isinf(block)] = -1
+            distances[first:first + step] = block
+        return distances
+    for source in range(n):
+        distances[source] = computeDistanceRow(layout, source)
+    return distances
+
+
+def loadDistanceTable(layout):
+    """
+    Returns the distance table of the layout, memory-mapped from
+    CACHE_DIRECTORY when it was computed by an earlier run, and computed
+    then saved there otherwise. Only the tables of layouts loaded from
+    files, up to DISTANCE_CACHE_MAX_BYTES, are stored.
+    """
+    n = len(layout.getFreeCells())
+    if (layout.contentHash not in FILE_LAYOUT_HASHES or
+            n * n * 2 > DISTANCE_CACHE_MAX_BYTES):
+        table = computeDistanceTable(layout)
+        table.flags.writeable = False
+        return table
+    path = os.path.join(CACHE_DIRECTORY,
+                        layout.contentHash + '.distances.npy')
+    try:
+        table = np.load(path, mmap_mode='r')
+        if table.dtype == np.int16 and table.shape == (n, n):
+            return table.view(np.ndarray)
+    except (OSError, ValueError):
+        pass
+    table = computeDistanceTable(layout)
+    table.flags.writeable = False
+    try:
+        os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+        temporary = '%s.%d.tmp' % (path, os.getpid())
+        with open(temporary, 'wb') as f:
+            np.save(f, table)
+        os.replace(temporary, path)
+    except OSError:
+        pass  # The cache is only an optimization
+    return table
 
 
 class Layout:
     """
     A Layout manages the static information about the game board.
+
+    Layouts are immutable and interned by content hash: building a Layout
+    from a text already in use returns the same instance, so all states,
+    observations and copies of a game share one. Data derived from the
+    board is computed on first use and attached with getDerived.
     """
 
-    def __init__(self, layoutText):
+    def __new__(cls, layoutText, compiled=None):
+        """
+        compiled optionally holds the arrays of getCompiledArrays() for
+        this text, which are then used instead of parsing it.
+        """
+        layoutText = tuple(layoutText)
+        contentHash = getContentHash(layoutText)
+        layout = LAYOUT_CACHE.get(contentHash)
+        if layout is None:
+            layout = object.__new__(cls)
+            layout._build(layoutText, contentHash, compiled)
+            LAYOUT_CACHE[contentHash] = layout
+        return layout
+
+    def _build(self, layoutText, contentHash, compiled):
         self.width = len(layoutText[0])
         self.height = len(layoutText)
-        self.walls = Grid(self.width, self.height, False)
-        self.food = Grid(self.width, self.height, False)
-        self.capsules = []
-        self.agentPositions = []
-        self.numGhosts = 0
-        self.processLayoutText(layoutText)
+        if compiled is None:
+            self.walls = BitGrid(self.width, self.height, False)
+            self.food = BitGrid(self.width, self.height, False)
+            self.capsules = []
+            self.agentPositions = []
+            self.numGhosts = 0
+            self.processLayoutText(layoutText)
+        else:
+            self.processCompiledArrays(compiled)
         self.layoutText = layoutText
+        self.contentHash = contentHash
         self.totalFood = len(self.food.asList())
-        # self.initializeVisibilityMatrix()
+        self.walls = ReadOnlyBitGrid(self.walls)
+        self.food = ReadOnlyBitGrid(self.food)
+        self.capsules = tuple(self.capsules)
+        self.agentPositions = tuple(self.agentPositions)
+        self._derived = {}
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("Layout objects are immutable")
+        object.__setattr__(self, name, value)
+
+    def __reduce__(self):
+        return (Layout, (self.layoutText,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def getCompiledArrays(self):
+        """
+        Returns the parsed content of this layout as a dictionary of
+        arrays, from which processCompiledArrays rebuilds it.
+        """
+        pacPos = getattr(self, 'pacPos', (-1, -1))
+        return {
+            'contentHash': np.array(self.contentHash),
+            'walls': self.getWallArray(),
+            'food': bitGridToArray(self.food),
+            'capsules': np.array(self.capsules, dtype=int).reshape(-1, 2),
+            'agentPositions': np.array(
+                [(agtType, x, y) for agtType, (x, y) in self.agentPositions],
+                dtype=int).reshape(-1, 3),
+            'pacPos': np.array(pacPos, dtype=int)}
+
+    def processCompiledArrays(self, compiled):
+        def toBitGrid(array):
+            bits = np.packbits(array.ravel(), bitorder='little').tobytes()
+            return BitGrid(self.width, self.height,
+                           bits=int.from_bytes(bits, 'little'))
+        self.walls = toBitGrid(compiled['walls'])
+        self.food = toBitGrid(compiled['food'])
+        self.capsules = [(int(x), int(y)) for x, y in compiled['capsules']]
+        self.agentPositions = [(int(agtType), (int(x), int(y)))
+                               for agtType, x, y in compiled['agentPositions']]
+        self.numGhosts = sum(1 for agtType, _ in self.agentPositions
+                             if agtType != 0)
+        x, y = compiled['pacPos']
+        if x >= 0:
+            self.pacPos = (int(x), int(y))
+
+    def getDerived(self, name, factory):
+        """
+        Returns the data called name derived from this layout, computing
+        it as factory(self) on first use.
+        """
+        value = self._derived.get(name)
+        if value is None:
+            value = self._derived[name] = factory(self)
+        return value
+
+    def getWallArray(self):
+        """
+        Returns the walls as a read-only (width, height) boolean array.
+        """
+        def build(layout):
+            walls = bitGridToArray(layout.walls)
+            walls.flags.writeable = False
+            return walls
+        return self.getDerived('wallArray', build)
+
+    def getFreeCells(self):
+        """
+        Returns the tuple of the cells which are not walls, in x, y order.
+        """
+        return self.getDerived('freeCells', lambda layout: tuple(
+            (x, y) for x, y in np.argwhere(~layout.getWallArray()).tolist()))
+
+    def getCellIndices(self):
+        """
+        Returns a dictionary mapping each free cell to its index in
+        getFreeCells().
+        """
+        return self.getDerived('cellIndices', lambda layout: dict(
+            (cell, i) for i, cell in enumerate(layout.getFreeCells())))
+
+    def getDistanceTable(self):
+        """
+        Returns the read-only int16 matrix of maze distances between the
+        free cells, indexed as getCellIndices(), with -1 for cells which
+        are not connected. It is cached on disk (see loadDistanceTable).
+        Raises DistanceTableTooLarge for layouts of more than
+        DISTANCE_TABLE_MAX_CELLS free cells, which only have rows (see
+        getDistanceRow).
+        """
+        return self.getDerived('distanceTable', loadDistanceTable)
+
+    def hasDistanceTable(self):
+        """
+        Tells whether this layout is small enough for getDistanceTable.
+        """
+        return len(self.getFreeCells()) <= DISTANCE_TABLE_MAX_CELLS
+
+    def getDistanceRow(self, index):
+        """
+        Returns the read-only array of maze distances from the free cell
+        of index index to every free cell, -1 for the cells which are not
+        connected to it. It is getDistanceTable()[index] when the layout
+        has a table. Otherwise each row is computed by its own breadth-first
+        search (see computeDistanceRow) on first use, and the most recently
+        used rows are kept, up to DISTANCE_ROWS_MAX_BYTES.
+        """
+        if self.hasDistanceTable():
+            return self.getDistanceTable()[index]
+        rows = self.getDerived('distanceRows', lambda layout: OrderedDict())
+        row = rows.get(index)
+        if row is None:
+            row = rows[index] = computeDistanceRow(self, index)
+            while len(rows) > 1 and \
+                    len(rows) * row.nbytes > DISTANCE_ROWS_MAX_BYTES:
+                rows.popitem(last=False)
+        else:
+            rows.move_to_end(index)
+        return row
+
+    def mazeDistance(self, a, b):
+        """
+        Returns the length of a shortest path between positions a and b
+        which avoids walls, or inf if there is none. Positions in between
+        grid points are rounded to the nearest one.
+        """
+        indices = self.getCellIndices()
+        i = indices.get(a)
+        if i is None:
+            i = indices.get(nearestPoint(a))
+        j = indices.get(b)
+        if j is None:
+            j = indices.get(nearestPoint(b))
+        if i is None or j is None:
+            position = a if i is None else b
+            raise Exception("%s is not a free cell" % str(position))
+        distance = self.getDistanceRow(i)[j]
+        if distance < 0:
+            return float('inf')
+        return int(distance)
 
     def getNumGhosts(self):
         return self.numGhosts
 
     def initializeVisibilityMatrix(self):
-        global VISIBILITY_MATRIX_CACHE
-        if reduce(str.__add__, self.layoutText) not in VISIBILITY_MATRIX_CACHE:
-            from .game import Directions
-            vecs = [(-0.5, 0), (0.5, 0), (0, -0.5), (0, 0.5)]
-            dirs = [
-                Directions.NORTH,
-                Directions.SOUTH,
-                Directions.WEST,
-                Directions.EAST]
-            vis = Grid(self.width,
-                       self.height,
-                       {Directions.NORTH: set(),
-                        Directions.SOUTH: set(),
-                        Directions.EAST: set(),
-                        Directions.WEST: set(),
-                        Directions.STOP: set()})
-            for x in range(self.width):
-                for y in range(self.height):
-                    if not self.walls[x][y]:
-                        for vec, direction in zip(vecs, dirs):
-                            dx, dy = vec
-                            nextx, nexty = x + dx, y + dy
-                            while (nextx + nexty) != int(nextx) + \
-                                    int(nexty) or not self.walls[int(nextx)][int(nexty)]:
-                                vis[x][y][direction].add((nextx, nexty))
-                                nextx, nexty = x + dx, y + dy
-            self.visibility = vis
-            VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)] = vis
-        else:
-            self.visibility = VISIBILITY_MATRIX_CACHE[reduce(
-                str.__add__, self.layoutText)]
+        """
+        Attaches the line-of-sight index of computeVisibility to this
+        layout, sharing it through VISIBILITY_MATRIX_CACHE.
+        """
+        if self.contentHash not in VISIBILITY_MATRIX_CACHE:
+            VISIBILITY_MATRIX_CACHE[self.contentHash] = computeVisibility(
+                self.getWallArray())
+        self._derived['visibility'] = VISIBILITY_MATRIX_CACHE[
+            self.contentHash]
+
+    def getMoveTable(self):
+        """
+        Returns the MoveTable of this layout, built on first use.
+        """
+        table = self._derived.get('moveTable')
+        if table is None:
+            table = self._derived['moveTable'] = MoveTable(
+                self.getWallArray())
+        return table
+
+    def getCorridorGraph(self):
+        """
+        Returns the CorridorGraph of this layout, whose nodes include the
+        cells holding food or a capsule at the start of the game.
+        """
+        return self.getDerived('corridorGraph', lambda layout: CorridorGraph(
+            layout.getMoveTable(),
+            layout.food.asList() + list(layout.capsules)))
 
     def isWall(self, pos):
         x, col = pos
         return self.walls[x][col]
 
+    def sampleFreeCells(self, k=1, exclude=(), rng=None):
+        """
+        Returns a list of k distinct free cells drawn uniformly at random
+        among those not in exclude, in O(k + len(exclude)) time. Draws
+        come from the numpy Generator rng if given, from the random module
+        otherwise, though not in the same sequence as the rejection
+        sampling of getRandomLegalPosition.
+        """
+        cells = self.getFreeCells()
+        indices = self.getCellIndices()
+        randrange = random.randrange if rng is None else rng.integers
+        # Partial Fisher-Yates shuffle of the free cells, storing only the
+        # positions which differ from the identity
+        values, positions = {}, {}
+        size = len(cells)
+
+        def moveToEnd(position):
+            last = size - 1
+            value, lastValue = values.get(position, position), \
+                values.get(last, last)
+            values[position], values[last] = lastValue, value
+            positions[lastValue], positions[value] = position, last
+            return value
+
+        for cell in set(exclude):
+            index = indices.get(cell)
+            if index is not None:
+                moveToEnd(positions.get(index, index))
+                size -= 1
+        if k > size:
+            raise Exception("Cannot sample %d distinct cells out of %d"
+                            % (k, size))
+        sample = []
+        for _ in range(k):
+            sample.append(cells[moveToEnd(int(randrange(size)))])
+            size -= 1
+        return sample
+
+    def getUnreachableFood(self):
+        """
+        Returns the positions of the food which Pacman cannot reach from
+        its start, none if the layout has no Pacman.
+        """
+        start = getattr(self, 'pacPos', None)
+        if start is None:
+            return []
+        successors = self.getMoveTable().successors
+        seen = {start}
+        pending = [start]
+        while pending:
+            for _, cell in successors[pending.pop()]:
+                if cell not in seen:
+                    seen.add(cell)
+                    pending.append(cell)
+        return [food for food in self.food.asList() if food not in seen]
+
+    # getRandomLegalPosition and getRandomLegalGhostPosition keep drawing
+    # from the random module exactly as they always did, so that seeded
+    # games stay reproducible: new code should use sampleFreeCells, as
+    # GameStateData.initialize does when given a numpy Generator
+
     def getRandomLegalPosition(self):
-        x = random.choice(list(range(1,self.width)))
-        y = random.choice(list(range(1,self.height)))
+        x = random.choice(range(1, self.width))
+        y = random.choice(range(1, self.height))
         while self.isWall((x, y)):
-            x = random.choice(list(range(1,self.width)))
-            y = random.choice(list(range(1,self.height)))
-        #print(x,y)
+            x = random.choice(range(1, self.width))
+            y = random.choice(range(1, self.height))
         return (x, y)
 
     def getPacmanPosition(self): return self.pacPos
 
     def getRandomLegalGhostPosition(self):
-        x = random.choice(list(range(self.width-1)))
-        y = random.choice(list(range(self.height-1)))
-        while self.isWall((x, y)) or (x,y) == self.pacPos:
-            x = random.choice(list(range(self.width-1)))
-            y = random.choice(list(range(self.height-1)))
+        x = random.choice(range(self.width - 1))
+        y = random.choice(range(self.height - 1))
+        while self.isWall((x, y)) or (x, y) == self.pacPos:
+            x = random.choice(range(self.width - 1))
+            y = random.choice(range(self.height - 1))
         return (x, y)
 
     def getRandomCorner(self):
@@ -110,14 +698,115 @@ class Layout:
         return pos
 
     def isVisibleFrom(self, ghostPos, pacPos, pacDirection):
-        row, col = [int(x) for x in pacPos]
-        return ghostPos in self.visibility[row][col][pacDirection]
+        """
+        Tells whether a ghost at ghostPos is in the line of sight of
+        Pacman at pacPos looking towards pacDirection: on the same row or
+        column, ahead of Pacman and in front of the next wall.
+        """
+        if pacDirection not in VISIBILITY_INDEX:
+            return False
+        if 'visibility' not in self._derived:
+            self.initializeVisibilityMatrix()
+        x, y = [int(c) for c in pacPos]
+        dx, dy = Actions._directions[pacDirection]
+        offsetX, offsetY = ghostPos[0] - x, ghostPos[1] - y
+        if offsetX * dy != offsetY * dx:
+            return False
+        ahead = offsetX * dx + offsetY * dy
+        run = self._derived['visibility'][x, y, VISIBILITY_INDEX[pacDirection]]
+        return 0 < ahead <= run + 0.5 and (2 * ahead) % 1 == 0
 
     def __str__(self):
         return "\n".join(self.layoutText)
 
     def deepCopy(self):
-        return Layout(self.layoutText[:])
+        return self
+
+    # Transforms: each returns a new Layout built in memory
+
+    def thickenBorders(self, thickness):
+        """
+        Returns this layout surrounded by walls thickness cells thick,
+        counting the existing border as the first one.
+        """
+        if thickness <= 1:
+            return self
+        pad = thickness - 1
+        fullRow = '%' * (self.width + 2 * pad)
+        return Layout([fullRow] * pad +
+                      ['%' * pad + row + '%' * pad
+                       for row in self.layoutText] +
+                      [fullRow] * pad)
+
+    def mirror(self, horizontal=True):
+        """
+        Returns this layout flipped left to right, or top to bottom when
+        horizontal is False.
+        """
+        if horizontal:
+            return Layout([row[::-1] for row in self.layoutText])
+        return Layout(self.layoutText[::-1])
+
+    def crop(self, x, y, width, height):
+        """
+        Returns the width x height part of this layout whose bottom left
+        cell is (x, y), enclosed in walls. Agents, food and capsules
+        outside of it are dropped.
+        """
+        if x < 0 or y < 0 or x + width > self.width or \
+                y + height > self.height or width < 1 or height < 1:
+            raise Exception("Cannot crop %dx%d at (%d, %d) from a %dx%d "
+                            "layout" % (width, height, x, y, self.width,
+                                        self.height))
+        top = self.height - y - height
+        rows = [row[x:x + width] for row in self.layoutText[top:top + height]]
+        fullRow = '%' * (width + 2)
+        return Layout([fullRow] + ['%' + row + '%' for row in rows] +
+                      [fullRow])
+
+    def tile(self, columns, rows):
+        """
+        Returns columns x rows copies of this layout side by side, without
+        the border walls between them. Ghosts are copied too, but Pacman
+        is only kept in the top left copy. Raises an exception if Pacman
+        cannot reach all the food of the result.
+        """
+        if columns < 1 or rows < 1:
+            raise Exception("Cannot tile a layout %dx%d times"
+                            % (columns, rows))
+        text = self.layoutText
+        border = text[0] + text[-1] + ''.join(row[0] + row[-1]
+                                              for row in text)
+        if self.width < 3 or self.height < 3 or border.strip('%'):
+            raise Exception("Cannot tile a layout which is not enclosed "
+                            "in walls")
+        inner = [row[1:-1] for row in text[1:-1]]
+        blank = [row.replace('P', ' ') for row in inner]
+        tiled = [row + blankRow * (columns - 1)
+                 for row, blankRow in zip(inner, blank)]
+        tiled += [row * columns for row in blank] * (rows - 1)
+        fullRow = '%' * (columns * (self.width - 2) + 2)
+        layout = Layout([fullRow] + ['%' + row + '%' for row in tiled] +
+                        [fullRow])
+        unreachable = layout.getUnreachableFood()
+        if unreachable:
+            raise Exception("Pacman cannot reach %d food dots of the %dx%d "
+                            "tiling" % (len(unreachable), columns, rows))
+        return layout
+
+    def thinFood(self, fraction, seed=None):
+        """
+        Returns this layout with only a random fraction of its food left.
+        """
+        food = [(row, col) for row, line in enumerate(self.layoutText)
+                for col, char in enumerate(line) if char == '.']
+        rng = np.random.default_rng(seed)
+        removed = rng.permutation(len(food))[int(round(fraction * len(food))):]
+        rows = [list(line) for line in self.layoutText]
+        for i in removed:
+            row, col = food[i]
+            rows[row][col] = ' '
+        return Layout([''.join(row) for row in rows])
 
     def processLayoutText(self, layoutText):
         """
@@ -158,28 +847,100 @@ class Layout:
             self.numGhosts += 1
 
 
-def getLayout(name, back=2):
-    if name.endswith('.lay'):
-        layout = tryToLoad('pacman_module/layouts/' + name)
-        if layout is None:
-            layout = tryToLoad(name)
-    else:
-        layout = tryToLoad('pacman_module/layouts/' + name + '.lay')
-        if layout is None:
-            layout = tryToLoad(name + '.lay')
-    if layout is None and back >= 0:
-        curdir = os.path.abspath('.')
-        os.chdir('..')
-        layout = getLayout(name, back - 1)
-        os.chdir(curdir)
-    return layout
+class LayoutRegistry:
+    """
+    Finds layout files by name in an explicit list of directories, or by
+    path, and loads each file once per process. Bare names never depend
+    on the working directory.
+
+    In CACHE_DIRECTORY it keeps a compiled copy (hash.layc, named after
+    the hash of the text) of the parsed walls, food, capsules and agent
+    positions of every layout file, which is reused for as long as a file
+    holds the same text.
+    """
+
+    def __init__(self, searchPath=(LAYOUT_DIRECTORY,)):
+        self.searchPath = list(searchPath)
+        self._byName = {}
+        self._byPath = {}
+
+    def addSearchPath(self, directory):
+        self.searchPath.append(os.path.abspath(directory))
+
+    def resolve(self, name):
+        """
+        Returns the path of the layout file called name, or None. Names
+        are looked up, with or without their .lay extension, in every
+        directory of the search path. Paths, which contain a directory
+        separator, are used as they are, relative ones being resolved
+        against the working directory.
+        """
+        fileName = name if name.endswith('.lay') else name + '.lay'
+        isPath = os.path.isabs(name) or os.sep in name or \
+            (os.altsep is not None and os.altsep in name)
+        if not isPath:
+            for directory in self.searchPath:
+                path = os.path.join(directory, fileName)
+                if os.path.isfile(path):
+                    return os.path.abspath(path)
+            return None
+        for path in (name, fileName):
+            if os.path.isfile(path):
+                return os.path.abspath(path)
+        return None
+
+    def getLayout(self, name):
+        if name not in self._byName:
+            path = self.resolve(name)
+            self._byName[name] = None if path is None else self.load(path)
+        return self._byName[name]
+
+    def load(self, path):
+        """
+        Returns the layout stored in the file at path.
+        """
+        if path not in self._byPath:
+            with open(path) as f:
+                layoutText = tuple(line.strip() for line in f)
+            contentHash = getContentHash(layoutText)
+            compiledPath = os.path.join(CACHE_DIRECTORY,
+                                        contentHash + '.layc')
+            compiled = self._loadCompiled(compiledPath, contentHash)
+            layout = Layout(layoutText, compiled)
+            FILE_LAYOUT_HASHES.add(contentHash)
+            if compiled is None:
+                self._saveCompiled(compiledPath, layout)
+            self._byPath[path] = layout
+        return self._byPath[path]
+
+    def _loadCompiled(self, compiledPath, contentHash):
+        try:
+            with np.load(compiledPath) as compiled:
+                if str(compiled['contentHash']) == contentHash:
+                    return dict(compiled)
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    def _saveCompiled(self, compiledPath, layout):
+        try:
+            os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+            temporary = '%s.%d.tmp' % (compiledPath, os.getpid())
+            with open(temporary, 'wb') as f:
+                np.savez(f, **layout.getCompiledArrays())
+            os.replace(temporary, compiledPath)
+        except OSError:
+            pass  # The compiled copy is only an optimization
+
+
+LAYOUT_REGISTRY = LayoutRegistry()
+
+
+def getLayout(name):
+    return LAYOUT_REGISTRY.getLayout(name)
 
 
 def tryToLoad(fullname):
-    if(not os.path.exists(fullname)):
+    if not os.path.isfile(fullname):
         return None
-    f = open(fullname)
-    try:
-        return Layout([line.strip() for line in f])
-    finally:
-        f.close()
+    return LAYOUT_REGISTRY.load(os.path.abspath(fullname))
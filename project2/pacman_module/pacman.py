@@ -43,6 +43,7 @@ from .game import GameStateData
 from .game import Game
 from .game import Directions
 from .game import Actions
+from .game import Configuration
 from .util import nearestPoint
 from .util import manhattanDistance
 from . import textDisplay, graphicsDisplay
@@ -53,12 +54,20 @@ import time
 import random
 import os
 import numpy as np
-from copy import deepcopy
+from collections import OrderedDict
+from contextlib import contextmanager
 
 ###################################################
 # YOUR INTERFACE TO THE PACMAN WORLD: A GameState #
 ###################################################
 
+# Exploration tracking modes, see `GameState.setExploredTracking`
+EXPLORED_OFF = 'off'
+EXPLORED_COUNT = 'count'
+EXPLORED_SAMPLE = 'sample'
+EXPLORED_MODES = [EXPLORED_OFF, EXPLORED_COUNT, EXPLORED_SAMPLE]
+EXPLORED_LIMIT = 10000  # Maximum number of states kept in sample mode
+
 
 class GameState:
     """
@@ -79,11 +88,18 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions
-    explored = set()
-    # static variable keeps track of number of calls of
-    # /!\ XXX: Do NOT modify this variable during get_action call.
-    # /!\ Otherwise, your project won't be graded
+    # static variables keep track of the states reached by generateSuccessor
+    # when exploration tracking is enabled (see `trackExplored`): the number
+    # of recorded states and a bounded sample of the most recent ones
+    exploredMode = EXPLORED_OFF
+    exploredLimit = EXPLORED_LIMIT
+    exploredCount = 0
+    explored = OrderedDict()
+    # static variable keeps track of the number of nodes expanded during
+    # the current move: by generatePacmanSuccessors, generateGhostSuccessors,
+    # and by agents searching their own states, through creditExpanded.
+    # /!\ XXX: Do NOT assign this variable during get_action call, only add
+    # /!\ to it with creditExpanded. Otherwise, your project won't be graded
     countExpanded = 0
     maximumExpanded = np.inf
 
@@ -93,9 +109,78 @@ class GameState:
     def setMaximumExpanded(m):
         GameState.maximumExpanded = m
 
+    def isExpansionBudgetExhausted():
+        """
+        Tells whether the node expansion budget of the current move is
+        spent, in which case generatePacmanSuccessors will not expand.
+        """
+        return GameState.countExpanded >= GameState.maximumExpanded
+
+    isExpansionBudgetExhausted = staticmethod(isExpansionBudgetExhausted)
+
+    def creditExpanded(cls, n):
+        """
+        Adds to the expansion count of the current move the n nodes an
+        agent expanded without generatePacmanSuccessors, e.g. in a search
+        over its own compact states. This is the only way agents may
+        change the count.
+        """
+        cls.countExpanded += n
+
+    creditExpanded = classmethod(creditExpanded)
+
+    def setExploredTracking(mode, limit=EXPLORED_LIMIT):
+        """
+        Sets how generateSuccessor records explored states:
+        - `EXPLORED_OFF`: nothing is recorded;
+        - `EXPLORED_COUNT`: only the number of recorded states is kept;
+        - `EXPLORED_SAMPLE`: the `limit` most recent states are also kept,
+          older ones are evicted.
+        """
+        if mode not in EXPLORED_MODES:
+            raise Exception("Unknown exploration tracking mode " + str(mode))
+        GameState.exploredMode = mode
+        GameState.exploredLimit = limit
+        while len(GameState.explored) > limit:
+            GameState.explored.popitem(last=False)
+    setExploredTracking = staticmethod(setExploredTracking)
+
+    @contextmanager
+    def trackExplored(mode=EXPLORED_SAMPLE, limit=EXPLORED_LIMIT):
+        """
+        Context manager enabling exploration tracking for its block.
+
+        Recorded states are reset on entry and kept after the block, the
+        previous tracking mode is restored on exit.
+        """
+        previous = (GameState.exploredMode, GameState.exploredLimit)
+        GameState.getAndResetExplored()
+        GameState.setExploredTracking(mode, limit)
+        try:
+            yield
+        finally:
+            GameState.setExploredTracking(*previous)
+    trackExplored = staticmethod(trackExplored)
+
+    def recordExplored(*states):
+        GameState.exploredCount += len(states)
+        if GameState.exploredMode == EXPLORED_SAMPLE:
+            explored = GameState.explored
+            for state in states:
+                explored[state] = None
+                explored.move_to_end(state)
+            while len(explored) > GameState.exploredLimit:
+                explored.popitem(last=False)
+    recordExplored = staticmethod(recordExplored)
+
+    def getExploredCount():
+        return GameState.exploredCount
+    getExploredCount = staticmethod(getExploredCount)
+
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
+        tmp = set(GameState.explored)
+        GameState.explored = OrderedDict()
+        GameState.exploredCount = 0
         return tmp
     getAndResetExplored = staticmethod(getAndResetExplored)
 
@@ -138,36 +223,118 @@ class GameState:
 
         # Copy current state
         state = GameState(self)
+        state._applyRules(agentIndex, action)
 
+        # Book keeping
+        if GameState.exploredMode != EXPLORED_OFF:
+            GameState.recordExplored(self, state)
+        return state
+
+    def apply(self, agentIndex, action):
+        """
+        Applies the action of the specified agent to this state in place.
+
+        This is the allocation-free counterpart of `generateSuccessor`: the
+        state is modified directly and everything needed to revert the move
+        (food and capsules eaten, score, Zobrist key, win/lose flags, agent
+        states) is pushed on an undo stack. Call `undo` to restore the
+        previous state.
+
+        Grids and lists previously returned by accessors are not modified,
+        but `getGhostState` results are the live agent states.
+        """
+        if self.isWin() or self.isLose():
+            raise Exception('Can\'t apply an action to a terminal state.')
+
+        data = self.data
+        self._undoStack.append((
+            data.agentStates[:],
+            data._ownedAgents,
+            data.food,
+            data.capsules,
+            data._eaten,
+            data.beliefStates,
+            data.score,
+            data.scoreChange,
+            data._zobrist,
+            data._win,
+            data._lose,
+            data._foodEaten,
+            data._foodAdded,
+            data._capsuleEaten,
+            data._agentMoved))
+
+        # Reset the per-move bookkeeping, as a fresh GameStateData would.
+        # Agent states are considered shared, so that modified ones are
+        # copied and the recorded ones stay intact.
+        data._ownedAgents = 0
+        data._eaten = data._eaten[:]
+        data._foodEaten = None
+        data._foodAdded = None
+        data._capsuleEaten = None
+        data._agentMoved = None
+        data.scoreChange = 0
+
+        self._applyRules(agentIndex, action)
+
+    def undo(self):
+        """
+        Reverts the last action applied with `apply`.
+        """
+        if not self._undoStack:
+            raise Exception('No applied action to undo.')
+
+        (agentStates, ownedAgents, food, capsules, eaten, beliefStates, score,
+         scoreChange, zobrist, win, lose, foodEaten, foodAdded, capsuleEaten,
+         agentMoved) = self._undoStack.pop()
+
+        data = self.data
+        data.agentStates[:] = agentStates
+        data._ownedAgents = ownedAgents
+        data.food = food
+        data.capsules = capsules
+        data._eaten = eaten
+        data.beliefStates = beliefStates
+        data.score = score
+        data.scoreChange = scoreChange
+        data._zobrist = zobrist
+        data._win = win
+        data._lose = lose
+        data._foodEaten = foodEaten
+        data._foodAdded = foodAdded
+        data._capsuleEaten = capsuleEaten
+        data._agentMoved = agentMoved
+
+    def _applyRules(self, agentIndex, action):
+        """
+        Lets the game rules modify this state to reflect the action.
+        """
         # Let agent's logic deal with its action's effects on the board
         if agentIndex == 0:  # Pacman is moving
-            if "beliefStates" not in dir(state.data):
-                state.data._eaten = [
-                    False for i in range(
-                        state.getNumAgents())]
-            PacmanRules.applyAction(state, action)
+            self.data.variant.pacmanMoved(self)
+            PacmanRules.applyAction(self, action)
         # A ghost is moving
-        elif state.data.agentStates[agentIndex].agtType > 0:
-            GhostRules.applyAction(state, action, agentIndex)
+        elif self.data.agentStates[agentIndex].agtType > 0:
+            GhostRules.applyAction(self, action, agentIndex)
         else:
             # Belief state replacement
-            state.data.beliefStates = action
+            self.data.beliefStates = action
 
         # Time passes
         if agentIndex == 0:
-            state.data.scoreChange += -TIME_PENALTY  # Penalty for waiting around
+            # Penalty for waiting around
+            self.data.scoreChange += -TIME_PENALTY
         else:
-            GhostRules.decrementTimer(state.data.agentStates[agentIndex])
+            oldKey = self.data.agentZobrist(agentIndex)
+            GhostRules.decrementTimer(self.data._ownAgentState(agentIndex))
+            self.data._zobrist ^= oldKey ^ self.data.agentZobrist(agentIndex)
 
         # Resolve multi-agent effects
-        GhostRules.checkDeath(state, agentIndex)
+        GhostRules.checkDeath(self, agentIndex)
 
         # Book keeping
-        state.data._agentMoved = agentIndex
-        state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
-        return state
+        self.data._agentMoved = agentIndex
+        self.data.score += self.data.scoreChange
 
     def getLegalPacmanActions(self):
         return self.getLegalActions(0)
@@ -213,8 +380,19 @@ class GameState:
         return self.data.agentStates[0].getPosition()
 
     def getGhostStates(self):
-        return list(filter(lambda x: x.agtType ==
-                           1, self.data.agentStates[1:]))
+        return self.data.getGhostStates()
+
+    def getVisibleGhosts(self):
+        """
+        Returns the states of the ghosts in Pacman's line of sight.
+        """
+        pacman = self.data.agentStates[0].configuration
+        layout = self.data.layout
+        return [ghost for ghost in self.getGhostStates()
+                if ghost.configuration is not None and
+                layout.isVisibleFrom(ghost.configuration.getPosition(),
+                                     pacman.getPosition(),
+                                     pacman.getDirection())]
 
     def getGhostState(self, agentIndex):
         if agentIndex == 0 or agentIndex >= self.getNumAgents():
@@ -282,6 +460,13 @@ class GameState:
         """
         return self.data.food
 
+    def getLayout(self):
+        """
+        Returns the layout.Layout of the game, read-only, whose tables
+        (free cells, moves, maze distances) searches may use.
+        """
+        return self.data.layout
+
     def getWalls(self):
         """
         Returns a Grid of boolean wall indicator variables.
@@ -319,12 +504,26 @@ class GameState:
             self.data = GameStateData(prevState.data)
         else:
             self.data = GameStateData()
+        self._undoStack = []
 
     def deepCopy(self):
         state = GameState(self)
         state.data = self.data.deepCopy()
         return state
 
+    def snapshot(self, previous=None):
+        """
+        Returns a read-only copy of this state, cheap enough to be handed
+        to an agent every turn. Its successors are writable states, which
+        share the read-only views of the agents they did not move.
+        previous is an optional earlier snapshot of the same game, whose
+        views of the agent states which did not change are reused.
+        """
+        state = GameState()
+        state.data = self.data.snapshot(
+            None if previous is None else previous.data)
+        return state
+
     def __eq__(self, other):
         """
         Allows two states to be compared.
@@ -347,16 +546,24 @@ class GameState:
             numGhostAgents=1000,
             hiddenGhosts=False,
             edibleGhosts=False,
-            beliefStateAgent=None):
+            beliefStateAgent=None,
+            variant=None,
+            rng=None):
         """
         Creates an initial game state from a layout array (see layout.py).
+        rng is an optional numpy Generator drawing the random ghost starts
+        (see GameStateData.initialize).
         """
         self.data.initialize(
             layout,
             numGhostAgents,
             isGhostVisible=not hiddenGhosts,
             edibleGhosts=edibleGhosts,
-            beliefStateAgent=beliefStateAgent)
+            beliefStateAgent=beliefStateAgent,
+            rng=rng)
+        if variant is None:
+            variant = ClassicGameRules.getVariant(beliefStateAgent)
+        self.data.variant = variant
 
 ############################################################################
 #                     THE HIDDEN SECRETS OF PACMAN                         #
@@ -391,7 +598,8 @@ class ClassicGameRules:
             hiddenGhosts=False,
             edibleGhosts=False,
             startingIndex=0,
-            oracleBeliefStateAgent=None):
+            oracleBeliefStateAgent=None,
+            rng=None):
 
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()] + \
             ([beliefStateAgent] if beliefStateAgent is not None else [])
@@ -401,7 +609,9 @@ class ClassicGameRules:
             len(ghostAgents),
             hiddenGhosts=hiddenGhosts,
             edibleGhosts=edibleGhosts,
-            beliefStateAgent=beliefStateAgent)
+            beliefStateAgent=beliefStateAgent,
+            variant=ClassicGameRules.getVariant(beliefStateAgent),
+            rng=rng)
         game = Game(agents,
                     display,
                     self,
@@ -413,6 +623,16 @@ class ClassicGameRules:
         self.quiet = quiet
         return game
 
+    def getVariant(beliefStateAgent):
+        """
+        Returns the rule variant of a game: hidden edible ghosts when a
+        belief state agent takes part in it, the classic chase otherwise.
+        """
+        if beliefStateAgent is not None:
+            return HiddenEdibleRules
+        return ClassicChaseRules
+    getVariant = staticmethod(getVariant)
+
     def process(self, state, game):
         """
         Checks to see whether it is time to end the game.
@@ -468,9 +688,11 @@ class PacmanRules:
         """
         Returns a list of possible actions.
         """
-        return Actions.getPossibleActions(
-            state.getPacmanState().configuration,
-            state.data.layout.walls)
+        conf = state.getPacmanState().configuration
+        actions = state.data.layout.getMoveTable().legalActions.get(conf.pos)
+        if actions is not None:
+            return list(actions)
+        return Actions.getPossibleActions(conf, state.data.layout.walls)
     getLegalActions = staticmethod(getLegalActions)
 
     def applyAction(state, action):
@@ -481,12 +703,14 @@ class PacmanRules:
         if action not in legal:
             raise Exception("Illegal action " + str(action))
 
-        pacmanState = state.data.agentStates[0]
+        pacmanState = state.data._ownAgentState(0)
+        oldKey = state.data.agentZobrist(0)
 
         # Update Configuration
         vector = Actions.directionToVector(action, PacmanRules.PACMAN_SPEED)
         pacmanState.configuration = pacmanState.configuration.generateSuccessor(
             vector)
+        state.data._zobrist ^= oldKey ^ state.data.agentZobrist(0)
 
         # Eat
         next = pacmanState.configuration.getPosition()
@@ -503,6 +727,7 @@ class PacmanRules:
             state.data.scoreChange += 10
             state.data.food = state.data.food.copy()
             state.data.food[x][y] = False
+            state.data._zobrist ^= state.data._zobristTable.foodKey(x, y)
             state.data._foodEaten = position
             # TODO: cache numFood?
             numFood = state.getNumFood()
@@ -512,11 +737,16 @@ class PacmanRules:
         # Eat capsule
         if(position in state.getCapsules()):
             state.data.scoreChange -= 5
-            state.data.capsules.remove(position)
+            state.data.capsules = [
+                c for c in state.data.capsules if c != position]
             state.data._capsuleEaten = position
+            state.data._zobrist ^= state.data._zobristTable.capsuleKey(
+                position)
             # Reset all ghosts' scared timers
             for index in range(1, len(state.data.agentStates)):
-                state.data.agentStates[index].scaredTimer = SCARED_TIME
+                oldKey = state.data.agentZobrist(index)
+                state.data._ownAgentState(index).scaredTimer = SCARED_TIME
+                state.data._zobrist ^= oldKey ^ state.data.agentZobrist(index)
     consume = staticmethod(consume)
 
 
@@ -532,17 +762,8 @@ class GhostRules:
         reach a dead end, but can turn 90 degrees at intersections.
         """
         conf = state.getGhostState(ghostIndex).configuration
-        possibleActions = Actions.getPossibleActions(
-            conf, state.data.layout.walls)
-        reverse = Actions.reverseDirection(conf.direction)
-        if Directions.STOP in possibleActions and "beliefStates" not in dir(
-                state.data):
-            possibleActions.remove(Directions.STOP)
-        if "beliefStates" not in dir(
-                state.data) and reverse in possibleActions and len(possibleActions) > 1:
-            possibleActions.remove(reverse)
-
-        return possibleActions
+        return state.data.variant.getGhostActions(
+            state.data.layout, conf.pos, conf.direction)
     getLegalActions = staticmethod(getLegalActions)
 
     def getLegalActionsAtPositionAndDirection(
@@ -551,18 +772,10 @@ class GhostRules:
         Ghosts cannot stop, and cannot turn around unless they
         reach a dead end, but can turn 90 degrees at intersections.
         """
-        conf = deepcopy(state.getGhostState(ghostIndex).configuration)
-        conf.pos = position
-        conf.direction = direction
-        possibleActions = Actions.getPossibleActions(
-            conf, state.data.layout.walls)
-        reverse = Actions.reverseDirection(conf.direction)
+        possibleActions = state.data.variant.getGhostActions(
+            state.data.layout, position, direction)
         if Directions.STOP in possibleActions:
             possibleActions.remove(Directions.STOP)
-        if "beliefStates" not in dir(
-                state.data) and reverse in possibleActions and len(possibleActions) > 1:
-            possibleActions.remove(reverse)
-
         return possibleActions
     getLegalActionsAtPositionAndDirection = staticmethod(
         getLegalActionsAtPositionAndDirection)
@@ -573,20 +786,23 @@ class GhostRules:
         if action not in legal:
             raise Exception("Illegal ghost action " + str(action))
 
-        ghostState = state.data.agentStates[ghostIndex]
-        speed = GhostRules.GHOST_SPEED
-        if ghostState.scaredTimer > 0 and "beliefStates" not in dir(state.data):
-            speed /= 2.0
+        ghostState = state.data._ownAgentState(ghostIndex)
+        speed = state.data.variant.getGhostSpeed(ghostState)
         vector = Actions.directionToVector(action, speed)
+        oldKey = state.data.agentZobrist(ghostIndex)
         ghostState.configuration = ghostState.configuration.generateSuccessor(
             vector)
+        state.data._zobrist ^= oldKey ^ state.data.agentZobrist(ghostIndex)
     applyAction = staticmethod(applyAction)
 
     def decrementTimer(ghostState):
         timer = ghostState.scaredTimer
         if timer == 1:
-            ghostState.configuration.pos = nearestPoint(
-                ghostState.configuration.pos)
+            configuration = ghostState.configuration
+            ghostState.configuration = Configuration(
+                nearestPoint(configuration.pos),
+                configuration.direction,
+                configuration.visible)
         ghostState.scaredTimer = max(0, timer - 1)
     decrementTimer = staticmethod(decrementTimer)
 
@@ -608,22 +824,11 @@ class GhostRules:
 
     def collide(state, ghostState, agentIndex):
         if ghostState.scaredTimer > 0:
+            ghostState = state.data._ownAgentState(agentIndex)
+            oldKey = state.data.agentZobrist(agentIndex)
             state.data.scoreChange += 200
-            GhostRules.placeGhost(
-                state,
-                ghostState,
-                agentIndex,
-                delete="beliefStates" in dir(
-                    state.data))
-            state.data._eaten[agentIndex] = True
-            if "beliefStates" not in dir(state.data):
-                ghostState.scaredTimer = 0
-            else:
-                if np.all(state.data._eaten[1:]) and not state.data._lose:
-                    state.data.scoreChange += 500
-                    state.data._win = True
-            # Added for first-person
-
+            state.data.variant.ghostEaten(state, ghostState, agentIndex)
+            state.data._zobrist ^= oldKey ^ state.data.agentZobrist(agentIndex)
         else:
             if not state.data._win:
                 state.data.scoreChange -= 500
@@ -640,11 +845,83 @@ class GhostRules:
         if not delete:
             ghostState.configuration = ghostState.start
         else:
-            voidConfiguration = deepcopy(ghostState.start)
-            voidConfiguration.pos = (-10, -10)
-            ghostState.configuration = voidConfiguration
+            start = ghostState.start
+            ghostState.configuration = Configuration(
+                (-10, -10), start.direction, start.visible)
     placeGhost = staticmethod(placeGhost)
 
+
+class ClassicChaseRules:
+    """
+    The classic chase: ghosts cannot stop, cannot turn around unless they
+    reach a dead end, slow down while scared and respawn when eaten.
+    """
+
+    def getGhostActions(layout, position, direction):
+        actions = layout.getMoveTable().ghostActions.get(
+            (position, direction))
+        if actions is not None:
+            return list(actions)
+        possibleActions = Actions.getPossibleActions(
+            Configuration(position, direction), layout.walls)
+        reverse = Actions.reverseDirection(direction)
+        if Directions.STOP in possibleActions:
+            possibleActions.remove(Directions.STOP)
+        if reverse in possibleActions and len(possibleActions) > 1:
+            possibleActions.remove(reverse)
+        return possibleActions
+    getGhostActions = staticmethod(getGhostActions)
+
+    def getGhostSpeed(ghostState):
+        if ghostState.scaredTimer > 0:
+            return GhostRules.GHOST_SPEED / 2.0
+        return GhostRules.GHOST_SPEED
+    getGhostSpeed = staticmethod(getGhostSpeed)
+
+    def pacmanMoved(state):
+        state.data._eaten = [False for i in range(state.getNumAgents())]
+    pacmanMoved = staticmethod(pacmanMoved)
+
+    def ghostEaten(state, ghostState, agentIndex):
+        GhostRules.placeGhost(state, ghostState, agentIndex)
+        # Added for first-person
+        state.data._eaten[agentIndex] = True
+        ghostState.scaredTimer = 0
+    ghostEaten = staticmethod(ghostEaten)
+
+
+class HiddenEdibleRules:
+    """
+    The hidden edible ghosts game, played against a belief state agent:
+    ghosts wander freely at full speed and leave the board when eaten.
+    Pacman wins once every ghost has been eaten.
+    """
+
+    def getGhostActions(layout, position, direction):
+        actions = layout.getMoveTable().legalActions.get(position)
+        if actions is not None:
+            return list(actions)
+        return Actions.getPossibleActions(
+            Configuration(position, direction), layout.walls)
+    getGhostActions = staticmethod(getGhostActions)
+
+    def getGhostSpeed(ghostState):
+        return GhostRules.GHOST_SPEED
+    getGhostSpeed = staticmethod(getGhostSpeed)
+
+    def pacmanMoved(state):
+        pass
+    pacmanMoved = staticmethod(pacmanMoved)
+
+    def ghostEaten(state, ghostState, agentIndex):
+        GhostRules.placeGhost(state, ghostState, agentIndex, delete=True)
+        # Added for first-person
+        state.data._eaten[agentIndex] = True
+        if np.all(state.data._eaten[1:]) and not state.data._lose:
+            state.data.scoreChange += 500
+            state.data._win = True
+    ghostEaten = staticmethod(ghostEaten)
+
 #############################
 # FRAMEWORK TO START A GAME #
 #############################
@@ -982,12 +1259,16 @@ def runGame(
         hiddenGhosts=False,
         edibleGhosts=False,
         startingIndex=0,
-        oracleBeliefStateAgent=None):
+        oracleBeliefStateAgent=None,
+        rng=None):
     display = graphicsDisplay.PacmanGraphics(
         1.0, frameTime=0.1) if displayGraphics else textDisplay.NullGraphics()
     import __main__
     __main__.__dict__['_display'] = display
-    lay = layout.getLayout(layout_name)
+    if isinstance(layout_name, layout.Layout):
+        lay = layout_name
+    else:
+        lay = layout.getLayout(layout_name)
 
     rules = ClassicGameRules(expout)
     game = rules.newGame(
@@ -1001,5 +1282,6 @@ def runGame(
         hiddenGhosts=hiddenGhosts,
         edibleGhosts=edibleGhosts,
         startingIndex=startingIndex,
-        oracleBeliefStateAgent=oracleBeliefStateAgent)
+        oracleBeliefStateAgent=oracleBeliefStateAgent,
+        rng=rng)
     return game.run()
@@ -2,7 +2,9 @@ import importlib
 import os
 from argparse import ArgumentParser, ArgumentTypeError
 import random
-from pacman_module.pacman import runGame
+from pacman_module.pacman import runGame, GameState, EXPLORED_MODES
+from pacman_module.mazeGenerator import MAZE_STYLES, SWEEP_NUM_FOOD, \
+    sweep, printSweep
 from pacman_module.ghostAgents import\
     ConfusedGhost, AfraidGhost, ScaredGhost
 import numpy as np
@@ -91,6 +93,12 @@ if __name__ == '__main__':
         '--oraclebsagentfile',
         help='Python file containing a `BeliefStateAgent` class to which bsagentfile will be compared.',
         default=None)
+    parser.add_argument(
+        '--samplestarts',
+        help='Draw the random ghost starts of belief state games with '
+             'layout.sampleFreeCells, from a numpy Generator seeded by '
+             '--seed, instead of the legacy rejection sampling.',
+        action="store_true")
     parser.add_argument(
         '--edibleghosts',
         help='Whether the ghost can be eaten.',
@@ -106,6 +114,40 @@ if __name__ == '__main__':
         help='The variance of the sensor estimates.',
         default=1.0,
         type=float)
+    parser.add_argument(
+        '--explored',
+        help='Tracking of the states explored by the agents: '
+             'off, count only, or a bounded sample of recent states.',
+        choices=EXPLORED_MODES, default="off")
+    parser.add_argument(
+        '--sweep',
+        help='Play on generated square mazes of the given sizes instead, '
+             'reporting time, expanded nodes and peak memory per size.',
+        type=int, nargs='+', default=None)
+    parser.add_argument(
+        '--nomemory',
+        help='Skip the second, memory-traced game of each --sweep size.',
+        action="store_true")
+    parser.add_argument(
+        '--mazestyle',
+        help='Style of the mazes generated for --sweep.',
+        choices=MAZE_STYLES, default="maze")
+    parser.add_argument(
+        '--walldensity',
+        help='Probability of an inner wall in generated cave mazes.',
+        type=float, default=0.3)
+    parser.add_argument(
+        '--loops',
+        help='Fraction of the inner walls removed from generated mazes.',
+        type=float, default=0.0)
+    parser.add_argument(
+        '--nfood',
+        help='Number of food dots in generated mazes.',
+        type=int, default=SWEEP_NUM_FOOD)
+    parser.add_argument(
+        '--ncapsules',
+        help='Number of capsules in generated mazes.',
+        type=int, default=0)
 
     args = parser.parse_args()
 
@@ -113,7 +155,8 @@ if __name__ == '__main__':
         np.random.seed(args.seed)
         random.seed(args.seed)
 
-    if (args.agentfile == "humanagent.py" and args.silentdisplay):
+    if (args.agentfile == "humanagent.py" and
+            (args.silentdisplay or args.sweep is not None)):
         print("Human agent cannot play without graphical display")
         exit()
     agent = load_agent_from_file(args.agentfile, "PacmanAgent")(args)
@@ -135,14 +178,49 @@ if __name__ == '__main__':
     if args.oraclebsagentfile is not None:
         oraclebsagt = load_agent_from_file(
             args.oraclebsagentfile, "BeliefStateAgent")(args)
-    total_score, total_computation_time, _ = runGame(
-        layout, agent, gagts, bsagt, not args.silentdisplay, expout=0,
-        hiddenGhosts=args.hiddenghosts, edibleGhosts=args.edibleghosts,
-        startingIndex=startingIndex, oracleBeliefStateAgent=oraclebsagt)
+    if args.sweep is not None:
+        def play(layout):
+            agent = load_agent_from_file(args.agentfile, "PacmanAgent")(args)
+            gagts = [gagt(i + 1, args) for i in range(nghosts)]
+            bsagt = None
+            if args.bsagentfile is not None:
+                bsagt = load_agent_from_file(
+                    args.bsagentfile, "BeliefStateAgent")(args)
+            # Drawn from np.random, so that the replay of the game under
+            # tracemalloc starts its ghosts at the same cells
+            rng = None
+            if args.samplestarts:
+                rng = np.random.default_rng(np.random.randint(2**32))
+            return runGame(
+                layout, agent, gagts, bsagt, False, expout=0,
+                hiddenGhosts=args.hiddenghosts,
+                edibleGhosts=args.edibleghosts,
+                startingIndex=startingIndex, rng=rng)
+        with GameState.trackExplored(args.explored):
+            printSweep(sweep(
+                args.sweep, play, memory=not args.nomemory,
+                style=args.mazestyle,
+                wallDensity=args.walldensity, loops=args.loops,
+                numFood=args.nfood, numCapsules=args.ncapsules,
+                numGhosts=max(nghosts, 0),
+                seed=args.seed if args.seed >= 0 else None))
+        exit()
+    rng = None
+    if args.samplestarts:
+        rng = np.random.default_rng(args.seed if args.seed >= 0 else None)
+    with GameState.trackExplored(args.explored):
+        total_score, total_computation_time, _ = runGame(
+            layout, agent, gagts, bsagt, not args.silentdisplay, expout=0,
+            hiddenGhosts=args.hiddenghosts, edibleGhosts=args.edibleghosts,
+            startingIndex=startingIndex, oracleBeliefStateAgent=oraclebsagt,
+            rng=rng)
 
     print(f"Total score : {total_score}")
     print(f"Total computation time (seconds) : {total_computation_time}")
-    f = open("temp", "w+")
+    if args.explored != "off":
+        print(f"Total explored states : {GameState.getExploredCount()}")
+    f = open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp"),
+             "w+")
     s, c = total_score, total_computation_time
     f.write(str(s) + ";" + str(c))
     f.close()
@@ -0,0 +1,23 @@
+"""
+Base test case of the tests loading layouts.
+"""
+import tempfile
+import unittest
+from unittest import mock
+
+from pacman_module import layout as layoutModule
+
+
+class LayoutCacheTestCase(unittest.TestCase):
+    """
+    Test case keeping the compiled layouts and distance tables its tests
+    save in a temporary CACHE_DIRECTORY, rather than in that of the user.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        patcher = mock.patch.object(layoutModule, 'CACHE_DIRECTORY',
+                                    directory.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(directory.cleanup)
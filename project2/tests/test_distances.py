@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from collections import deque
+from unittest import mock
+
+import numpy as np
+
+from helpers import LayoutCacheTestCase
+from pacman_module import layout as layoutModule
+from pacman_module.game import Actions
+from pacman_module.layout import DistanceTableTooLarge, Layout, getLayout
+
+LAYOUTS = ("large_filter", "large_filter_walls")
+# Two rooms which are not connected
+ROOMS = ("%%%%%%%%",
+         "%P . % %",
+         "% %% % %",
+         "%  % % %",
+         "%%%%%%%%")
+
+
+def bfsDistances(layout, source):
+    distances = {source: 0}
+    frontier = deque([source])
+    while frontier:
+        cell = frontier.popleft()
+        for next in Actions.getLegalNeighbors(cell, layout.walls):
+            if next not in distances:
+                distances[next] = distances[cell] + 1
+                frontier.append(next)
+    return distances
+
+
+class DistanceTableTest(LayoutCacheTestCase):
+    """
+    Compares the maze distances of layouts with breadth-first searches.
+    """
+
+    def assertDistancesMatch(self, layout):
+        cells = layout.getFreeCells()
+        indices = layout.getCellIndices()
+        for source in cells:
+            distances = bfsDistances(layout, source)
+            row = layout.getDistanceRow(indices[source])
+            self.assertFalse(row.flags.writeable)
+            for target in cells:
+                expected = distances.get(target, float('inf'))
+                self.assertEqual(layout.mazeDistance(source, target),
+                                 expected, (source, target))
+                self.assertEqual(row[indices[target]],
+                                 -1 if expected == float('inf')
+                                 else expected)
+
+    def test_table_matches_bfs(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            self.assertTrue(layout.hasDistanceTable())
+            self.assertDistancesMatch(layout)
+            table = layout.getDistanceTable()
+            self.assertEqual(table.dtype, np.int16)
+            self.assertFalse(table.flags.writeable)
+
+    def test_disconnected_cells(self):
+        layout = Layout(ROOMS)
+        self.assertEqual(layout.mazeDistance((1, 3), (6, 1)), float('inf'))
+        self.assertEqual(layout.mazeDistance((1, 3), (3.4, 3)), 2)
+        self.assertDistancesMatch(layout)
+        self.assertRaises(Exception, layout.mazeDistance, (0, 0), (1, 1))
+
+    def test_rows_without_table(self):
+        layout = Layout(tuple(line + "%" for line in ROOMS))
+        rowBytes = 4 * len(layout.getFreeCells())
+        with mock.patch.object(layoutModule, 'DISTANCE_TABLE_MAX_CELLS', 10), \
+                mock.patch.object(layoutModule, 'DISTANCE_ROWS_MAX_BYTES',
+                                  4 * rowBytes):
+            self.assertFalse(layout.hasDistanceTable())
+            self.assertRaises(DistanceTableTooLarge, layout.getDistanceTable)
+            self.assertDistancesMatch(layout)
+            # Only the most recently used rows are kept
+            self.assertEqual(len(layout._derived['distanceRows']), 4)
+
+    def test_disk_cache(self):
+        layout = Layout(tuple(line + "%" for line in ROOMS) + ("%" * 9,))
+        path = layout.contentHash + '.distances.npy'
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.multiple(layoutModule, CACHE_DIRECTORY=directory,
+                                     FILE_LAYOUT_HASHES={layout.contentHash}):
+                table = layoutModule.loadDistanceTable(layout)
+                self.assertTrue(os.path.exists(os.path.join(directory, path)))
+                # The second load maps the saved table
+                with mock.patch.object(layoutModule, 'computeDistanceTable',
+                                       side_effect=AssertionError):
+                    loaded = layoutModule.loadDistanceTable(layout)
+                np.testing.assert_array_equal(loaded, table)
+                self.assertFalse(loaded.flags.writeable)
+                del loaded
+
+
+if __name__ == '__main__':
+    unittest.main()
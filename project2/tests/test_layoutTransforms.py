@@ -0,0 +1,113 @@
+import os
+import unittest
+
+from helpers import LayoutCacheTestCase
+from pacman_module.layout import LAYOUT_DIRECTORY, Layout, getLayout
+
+LAYOUTS = ("large_filter", "large_filter_walls")
+
+
+def cells(layout):
+    """
+    Returns the content of every cell of a layout, by position.
+    """
+    maxY = layout.height - 1
+    return dict(((x, y), layout.layoutText[maxY - y][x])
+                for x in range(layout.width) for y in range(layout.height))
+
+
+class LayoutTransformTest(LayoutCacheTestCase):
+    """
+    Checks the layouts built by the in-memory transforms cell by cell.
+    """
+
+    def test_thicken_borders(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            self.assertIs(layout.thickenBorders(1), layout)
+            thick = layout.thickenBorders(3)
+            self.assertEqual((thick.width, thick.height),
+                             (layout.width + 4, layout.height + 4))
+            content = cells(thick)
+            for (x, y), char in content.items():
+                inside = 2 <= x < layout.width + 2 and \
+                    2 <= y < layout.height + 2
+                expected = cells(layout)[x - 2, y - 2] if inside else '%'
+                self.assertEqual(char, expected, (x, y))
+            self.assertEqual(thick.food.count(), layout.food.count())
+            self.assertEqual(len(thick.getFreeCells()),
+                             len(layout.getFreeCells()))
+
+    def test_mirror(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            for horizontal in (True, False):
+                mirrored = layout.mirror(horizontal)
+                self.assertIs(mirrored.mirror(horizontal), layout)
+                for (x, y), char in cells(layout).items():
+                    position = (layout.width - 1 - x, y) if horizontal \
+                        else (x, layout.height - 1 - y)
+                    self.assertEqual(cells(mirrored)[position], char)
+
+    def test_crop(self):
+        layout = getLayout(LAYOUTS[-1])
+        cropped = layout.crop(2, 1, 5, 4)
+        self.assertEqual((cropped.width, cropped.height), (7, 6))
+        content = cells(layout)
+        for (x, y), char in cells(cropped).items():
+            if 1 <= x <= 5 and 1 <= y <= 4:
+                self.assertEqual(char, content[x + 1, y], (x, y))
+            else:
+                self.assertEqual(char, '%', (x, y))
+        self.assertIs(layout.crop(0, 0, layout.width, layout.height),
+                      layout.thickenBorders(2))
+        for x, y, width, height in ((-1, 0, 3, 3), (0, 0, 0, 3),
+                                    (layout.width - 2, 0, 3, 3)):
+            self.assertRaises(Exception, layout.crop, x, y, width, height)
+
+    def test_tile(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            tiled = layout.tile(3, 2)
+            self.assertEqual(
+                (tiled.width, tiled.height),
+                (3 * (layout.width - 2) + 2, 2 * (layout.height - 2) + 2))
+            self.assertEqual(tiled.food.count(), 6 * layout.food.count())
+            self.assertEqual(len(tiled.capsules), 6 * len(layout.capsules))
+            self.assertEqual(tiled.getNumGhosts(),
+                             6 * layout.getNumGhosts())
+            self.assertEqual(str(tiled).count('P'), 1)
+            self.assertEqual(tiled.getUnreachableFood(), [])
+            self.assertIs(layout.tile(1, 1), layout)
+        self.assertRaises(Exception, layout.tile, 0, 1)
+        unbordered = Layout(("% %",
+                             "%P%",
+                             "%%%"))
+        self.assertRaises(Exception, unbordered.tile, 2, 2)
+        # Food behind the walls of the right copy cannot be reached
+        walled = Layout(("%%%%",
+                         "%P%%",
+                         "%%.%",
+                         "%%%%"))
+        self.assertRaises(Exception, walled.tile, 2, 1)
+
+    def test_thin_food(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            food = set(layout.food.asList())
+            thinned = layout.thinFood(0.5, seed=0)
+            self.assertEqual(thinned.food.count(), round(0.5 * len(food)))
+            self.assertTrue(set(thinned.food.asList()) <= food)
+            self.assertEqual(thinned.walls, layout.walls)
+            self.assertIs(layout.thinFood(0.5, seed=0), thinned)
+            self.assertIs(layout.thinFood(1.0), layout)
+            self.assertEqual(layout.thinFood(0.0).food.count(), 0)
+
+    def test_no_files_written(self):
+        before = sorted(os.listdir(LAYOUT_DIRECTORY))
+        getLayout(LAYOUTS[0]).thickenBorders(4).mirror().thinFood(0.5)
+        self.assertEqual(sorted(os.listdir(LAYOUT_DIRECTORY)), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
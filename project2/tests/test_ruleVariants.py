@@ -0,0 +1,74 @@
+import unittest
+
+from pacman_module.game import Directions
+from pacman_module.layout import Layout
+from pacman_module.pacman import (ClassicChaseRules, ClassicGameRules,
+                                  GameState, HiddenEdibleRules)
+
+LAYOUT = ("%%%%%%%%%",
+          "%P  G  G%",
+          "% %%%%% %",
+          "%       %",
+          "%%%%%%%%%")
+
+
+class RuleVariantTest(unittest.TestCase):
+    """
+    Checks that the rule variant chosen when the game starts is carried by
+    every successor and decides how ghosts move and get eaten.
+    """
+
+    def newState(self, variant=None, edibleGhosts=False):
+        state = GameState()
+        state.initialize(Layout(LAYOUT), 2, edibleGhosts=edibleGhosts,
+                         variant=variant)
+        return state
+
+    def test_variant_selection(self):
+        self.assertIs(ClassicGameRules.getVariant(None), ClassicChaseRules)
+        self.assertIs(ClassicGameRules.getVariant(object()),
+                      HiddenEdibleRules)
+        self.assertIs(self.newState().data.variant, ClassicChaseRules)
+
+    def test_successors_share_the_variant(self):
+        for variant in (ClassicChaseRules, HiddenEdibleRules):
+            state = self.newState(variant)
+            for agent in (1, 2, 1, 2):
+                state = state.generateSuccessor(
+                    agent, state.getLegalActions(agent)[0])
+                self.assertIs(state.data.variant, variant)
+            self.assertIs(state.deepCopy().data.variant, variant)
+            self.assertIs(state.snapshot().data.variant, variant)
+
+    def test_classic_ghosts_do_not_turn_around(self):
+        state = self.newState(ClassicChaseRules)
+        state = state.generateSuccessor(1, Directions.EAST)
+        self.assertEqual(state.getLegalActions(1), [Directions.EAST])
+
+    def test_hidden_edible_ghosts_wander(self):
+        state = self.newState(HiddenEdibleRules, edibleGhosts=True)
+        state = state.generateSuccessor(1, Directions.EAST)
+        self.assertEqual(state.getGhostPosition(1), (5, 3))
+        self.assertEqual(sorted(state.getLegalActions(1)),
+                         sorted([Directions.EAST, Directions.WEST,
+                                 Directions.STOP]))
+
+    def test_hidden_edible_ghosts_leave_when_eaten(self):
+        state = self.newState(HiddenEdibleRules, edibleGhosts=True)
+        state = state.generateSuccessor(1, Directions.WEST)
+        state = state.generateSuccessor(1, Directions.WEST)
+        score = state.getScore()
+        state = state.generateSuccessor(0, Directions.EAST)
+        self.assertEqual(state.getGhostPosition(1), (-10, -10))
+        self.assertEqual(state.getScore(), score + 200 - 1)
+        self.assertFalse(state.isWin())
+        state = state.generateSuccessor(2, Directions.WEST)
+        for _ in range(2):
+            state = state.generateSuccessor(2, Directions.WEST)
+            state = state.generateSuccessor(0, Directions.EAST)
+        self.assertEqual(state.getGhostPosition(2), (-10, -10))
+        self.assertTrue(state.isWin())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import random
+import unittest
+from collections import Counter
+
+import numpy as np
+
+from helpers import LayoutCacheTestCase
+from pacman_module.layout import getLayout
+from pacman_module.mazeGenerator import generateMaze
+from pacman_module.pacman import GameState
+
+LAYOUTS = ("large_filter", "large_filter_walls")
+DRAWS = 20000
+
+
+def legacyGhostPosition(layout):
+    """
+    The rejection sampling getRandomLegalGhostPosition always used.
+    """
+    x = random.choice(list(range(layout.width - 1)))
+    y = random.choice(list(range(layout.height - 1)))
+    while layout.isWall((x, y)) or (x, y) == layout.pacPos:
+        x = random.choice(list(range(layout.width - 1)))
+        y = random.choice(list(range(layout.height - 1)))
+    return (x, y)
+
+
+def legacyPosition(layout):
+    x = random.choice(list(range(1, layout.width)))
+    y = random.choice(list(range(1, layout.height)))
+    while layout.isWall((x, y)):
+        x = random.choice(list(range(1, layout.width)))
+        y = random.choice(list(range(1, layout.height)))
+    return (x, y)
+
+
+class SamplingTest(LayoutCacheTestCase):
+    """
+    Checks the free cells drawn by sampleFreeCells, and that the legacy
+    samplers keep their draws.
+    """
+
+    def test_samples(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            free = set(layout.getFreeCells())
+            exclude = sorted(free)[::2] + [(0, 0)]
+            for k in range(len(free) - len(exclude) + 2):
+                sample = layout.sampleFreeCells(k, exclude)
+                self.assertEqual(len(sample), k)
+                self.assertEqual(len(set(sample)), k)
+                self.assertTrue(set(sample) <= free - set(exclude))
+            self.assertRaises(Exception, layout.sampleFreeCells,
+                              len(free) - len(exclude) + 2, exclude)
+            self.assertEqual(
+                sorted(layout.sampleFreeCells(len(free))), sorted(free))
+
+    def test_uniform(self):
+        layout = getLayout(LAYOUTS[0])
+        free = layout.getFreeCells()
+        excluded = free[0]
+        rng = np.random.default_rng(0)
+        counts = Counter()
+        for _ in range(DRAWS):
+            counts.update(layout.sampleFreeCells(2, [excluded], rng))
+        self.assertNotIn(excluded, counts)
+        expected = 2.0 * DRAWS / (len(free) - 1)
+        # Each count is within five standard deviations of its mean
+        for cell in free[1:]:
+            self.assertLess(abs(counts[cell] - expected),
+                            5 * expected ** 0.5)
+
+    def test_generators(self):
+        layout = getLayout(LAYOUTS[-1])
+        samples = [layout.sampleFreeCells(5, rng=np.random.default_rng(3))
+                   for _ in range(2)]
+        self.assertEqual(samples[0], samples[1])
+        random.seed(3)
+        first = layout.sampleFreeCells(5)
+        random.seed(3)
+        self.assertEqual(layout.sampleFreeCells(5), first)
+
+    def test_legacy_draws(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            random.seed(name)
+            expected = [legacyGhostPosition(layout) for _ in range(20)] + \
+                [legacyPosition(layout) for _ in range(20)]
+            random.seed(name)
+            self.assertEqual(
+                [layout.getRandomLegalGhostPosition() for _ in range(20)] +
+                [layout.getRandomLegalPosition() for _ in range(20)],
+                expected)
+
+    def test_seeded_ghost_starts(self):
+        layout = generateMaze(15, 9, numGhosts=3, seed=0)
+        random.seed(7)
+        expected = [legacyGhostPosition(layout)
+                    for _ in range(layout.getNumGhosts())]
+        random.seed(7)
+        state = GameState()
+        state.initialize(layout, layout.getNumGhosts(),
+                         beliefStateAgent=object())
+        self.assertEqual(state.getGhostPositions(), expected)
+
+    def test_generator_ghost_starts(self):
+        layout = generateMaze(15, 9, numGhosts=3, seed=0)
+        free = set(layout.getFreeCells()) - {layout.pacPos}
+        starts = []
+        for _ in range(2):
+            state = GameState()
+            state.initialize(layout, layout.getNumGhosts(),
+                             beliefStateAgent=object(),
+                             rng=np.random.default_rng(7))
+            starts.append(state.getGhostPositions())
+        self.assertEqual(starts[0], starts[1])
+        self.assertEqual(len(set(starts[0])), layout.getNumGhosts())
+        self.assertTrue(set(starts[0]) <= free)
+
+
+if __name__ == '__main__':
+    unittest.main()
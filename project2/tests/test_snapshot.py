@@ -0,0 +1,95 @@
+import random
+import unittest
+
+from pacman_module.game import Directions, ReadOnlyAgentState
+from pacman_module.layout import Layout
+from pacman_module.pacman import GameState
+
+LAYOUT = ("%%%%%%%%%",
+          "%Po.  G %",
+          "% %%.%% %",
+          "%G  .  .%",
+          "%%%%%%%%%")
+TURNS = 30
+
+
+class SnapshotTest(unittest.TestCase):
+    """
+    Checks that snapshots are equal to the state they are taken from,
+    cannot be modified, and are not affected by the game going on.
+    """
+
+    def setUp(self):
+        self.state = GameState()
+        self.state.initialize(Layout(LAYOUT), 2)
+
+    def test_snapshot_cannot_be_modified(self):
+        snapshot = self.state.snapshot()
+        data = snapshot.data
+        pacmanState = snapshot.getPacmanState()
+
+        def assignFood():
+            snapshot.getFood()[1][1] = True
+
+        def assignTimer():
+            snapshot.getGhostState(1).scaredTimer = 10
+
+        def assignPosition():
+            pacmanState.configuration.pos = (1, 1)
+
+        def assignScore():
+            data.score = 1000
+
+        for assign in (assignFood, assignTimer, assignPosition,
+                       assignScore):
+            self.assertRaises((AttributeError, TypeError), assign)
+        self.assertRaises(AttributeError,
+                          lambda: snapshot.getCapsules().append((1, 1)))
+        self.assertEqual(snapshot, self.state)
+
+    def test_snapshots_follow_the_game(self):
+        rng = random.Random(0)
+        state = self.state
+        previous = None
+        for turn in range(TURNS):
+            if state.isWin() or state.isLose():
+                break
+            snapshot = state.snapshot(previous)
+            copy = state.deepCopy()
+            self.assertEqual(snapshot, state)
+            self.assertEqual(hash(snapshot), hash(state))
+            if previous is not None:
+                for i, agentState in enumerate(snapshot.data.agentStates):
+                    # Only the views of agents which moved are rebuilt
+                    moved = state.data.agentStates[i] is not sources[i]
+                    self.assertEqual(
+                        agentState is not previous.data.agentStates[i],
+                        moved)
+            agent = turn % state.getNumAgents()
+            action = rng.choice(state.getLegalActions(agent))
+            # The successors of a snapshot are those of the state
+            self.assertEqual(snapshot.generateSuccessor(agent, action),
+                             state.generateSuccessor(agent, action))
+            sources = list(state.data.agentStates)
+            state.apply(agent, action)
+            self.assertEqual(snapshot, copy)
+            previous = snapshot
+
+    def test_successors_are_writable(self):
+        snapshot = self.state.snapshot()
+        successor = snapshot.generateSuccessor(0, Directions.SOUTH)
+        successor.apply(1, successor.getLegalActions(1)[0])
+        self.assertEqual(snapshot, self.state)
+        # The ghost which did not move keeps its read-only view
+        self.assertIsInstance(successor.data.agentStates[2],
+                              ReadOnlyAgentState)
+        copy = snapshot.deepCopy()
+        for agentState in copy.data.agentStates:
+            self.assertNotIsInstance(agentState, ReadOnlyAgentState)
+        copy.data.agentStates[1].scaredTimer = 10
+        copy.getFood()[1][1] = True
+        self.assertEqual(snapshot, self.state)
+
+
+if __name__ == '__main__':
+    unittest.main()
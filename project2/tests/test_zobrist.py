@@ -0,0 +1,80 @@
+import random
+import unittest
+
+from helpers import LayoutCacheTestCase
+from pacman_module.layout import getLayout
+from pacman_module.pacman import GameState
+
+LAYOUTS = ("large_filter", "large_filter_walls")
+PLAYOUTS = 4
+MAX_TURNS = 200
+DEPTH = 6
+
+
+def recomputedKey(state):
+    copy = state.deepCopy()
+    copy.data._initializeZobrist()
+    return copy.data._zobrist
+
+
+class ZobristTest(LayoutCacheTestCase):
+    """
+    Checks the incrementally updated Zobrist keys against keys computed
+    from scratch.
+    """
+
+    def test_incremental_key_matches_recomputed_key(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            rng = random.Random(name)
+            for playout in range(PLAYOUTS):
+                state = GameState()
+                state.initialize(layout, layout.getNumGhosts())
+                numAgents = state.getNumAgents()
+                for turn in range(MAX_TURNS):
+                    if state.isWin() or state.isLose():
+                        break
+                    agent = turn % numAgents
+                    for action in state.getLegalActions(agent):
+                        successor = state.generateSuccessor(agent, action)
+                        self.assertEqual(
+                            successor.data._zobrist, recomputedKey(successor),
+                            "%s, playout %d, turn %d, %s" % (
+                                name, playout, turn, action))
+                    action = rng.choice(state.getLegalActions(agent))
+                    state = state.generateSuccessor(agent, action)
+
+    def test_transpositions_have_equal_keys(self):
+        for name in LAYOUTS:
+            layout = getLayout(name)
+            start = GameState()
+            start.initialize(layout, 0)
+            states = {}
+            frontier = [start]
+            for depth in range(DEPTH):
+                successors = []
+                for state in frontier:
+                    for successor, _ in state.generatePacmanSuccessors():
+                        key = (successor.getPacmanState().configuration,
+                               successor.getFood().getBits(),
+                               tuple(successor.getCapsules()),
+                               successor.getScore())
+                        if key in states:
+                            self.assertEqual(successor, states[key], name)
+                            self.assertEqual(hash(successor),
+                                             hash(states[key]), name)
+                        else:
+                            states[key] = successor
+                            if not successor.isWin():
+                                successors.append(successor)
+                frontier = successors
+            # The key ignores the score and Pacman's direction, but no two
+            # different positions or food sets should collide
+            keys = set(hash(state) for state in states.values())
+            features = set((configuration.getPosition(), food, capsules)
+                           for configuration, food, capsules, _ in states)
+            self.assertEqual(len(keys), len(features), name)
+
+
+if __name__ == '__main__':
+    unittest.main()